@@ -1,18 +1,21 @@
 import sys
 import os
+import threading
 import numpy as np
 import logging
 import matplotlib
 import matplotlib.pyplot as plt
-from PyQt6.QtCore import Qt
-from pyscurve import ScurvePlanner
-from pyscurve.trajectory import PlanningError
+from PyQt6.QtCore import Qt, QObject, QThread, pyqtSignal, pyqtSlot
+from pyscurve import ScurvePlanner, TrajectoryStats
+from pyscurve.trajectory import PlanningError, JERK_ID
+from pyscurve.sampling import sample_times
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QSlider, QDoubleSpinBox, QPushButton, QHBoxLayout, QSpacerItem, QSizePolicy, QGridLayout
 )
 import matplotlib.ticker as ticker
 from matplotlib.ticker import FuncFormatter
+from matplotlib.transforms import blended_transform_factory
 
 
 matplotlib.use('Agg')
@@ -38,8 +41,74 @@ plt.rcParams.update({
     "text.color": text_color
 })
 
+def nice_step(raw_step):
+    """Smallest 1, 2, 2.5 or 5 times a power of ten which is not below raw_step."""
+    if raw_step <= 0:
+        return 1.0
+    magnitude = 10 ** np.floor(np.log10(raw_step))
+    for m in (1, 2, 2.5, 5, 10):
+        if m * magnitude >= raw_step * (1 - 1e-9):
+            return m * magnitude
+
+
+def snapped_ticks(min_val, max_val, num_ticks):
+    """About num_ticks evenly spaced ticks on a nice step which cover [min_val, max_val]."""
+    step = nice_step((max_val - min_val) / num_ticks or abs(max_val) / num_ticks)
+    return np.arange(np.floor(min_val / step) * step, np.ceil(max_val / step) * step + step / 2, step)
+
+
+def update_grid_lines(ax, grid_lines, ticks, horizontal):
+    """Move pooled grid lines to ticks, creating missing lines and hiding spare ones."""
+    make_line = ax.axhline if horizontal else ax.axvline
+    while len(grid_lines) < len(ticks):
+        grid_lines.append(make_line(0, linestyle="--", linewidth=0.3, color="darkgray", alpha=0.3))
+    for line, tick in zip(grid_lines, ticks):
+        if horizontal:
+            line.set_ydata([tick, tick])
+        else:
+            line.set_xdata([tick, tick])
+        line.set_visible(True)
+    for line in grid_lines[len(ticks):]:
+        line.set_visible(False)
+
+
+class PlanningWorker(QObject):
+    """
+    Runs profile computations on its own thread. Only the latest submitted
+    parameter set is kept while a computation is running, stale ones are dropped.
+    """
+    finished = pyqtSignal(object)
+    _wake = pyqtSignal()
+
+    def __init__(self, compute):
+        super().__init__()
+        self._compute = compute
+        self._lock = threading.Lock()
+        self._pending = None
+        self._busy = False
+
+    def submit(self, params):
+        """Queue params for computation. Can be called from any thread."""
+        with self._lock:
+            self._pending = params
+            if self._busy:
+                return
+            self._busy = True
+        self._wake.emit()
+
+    @pyqtSlot()
+    def run(self):
+        while True:
+            with self._lock:
+                params, self._pending = self._pending, None
+                if params is None:
+                    self._busy = False
+                    return
+            self.finished.emit(self._compute(params))
+
+
 class TrajectoryPlanner(QWidget):
-    def __init__(self):
+    def __init__(self, threaded=True, blit=True):
         super().__init__()
 
         self.setWindowTitle("Motion Profile Editor")
@@ -48,8 +117,8 @@ class TrajectoryPlanner(QWidget):
         # Apply dark/light mode theme to the entire GUI
         self.setStyleSheet(f"background-color: {bg_color}; color: {text_color};")
 
-        # Initialize S-curve planner
-        self.p = ScurvePlanner()
+        # Initialize S-curve planner, caching plans of revisited slider values
+        self.p = ScurvePlanner(cache_size=4096)
         
         # Default Parameters
         self.default_q0, self.default_q1 = 0, 90
@@ -96,7 +165,7 @@ class TrajectoryPlanner(QWidget):
         self.position_line, = self.ax_position.plot(self.time, np.zeros_like(self.time), label="Position", color='#bf5af2')
         self.speed_line, = self.ax_speed.plot(self.time, np.zeros_like(self.time), label="Velocity", color='#0b84ff')
         self.accel_line, = self.ax_accel.plot(self.time, np.zeros_like(self.time), label="Acceleration", color='#ff453a')
-        self.jerk_line, = self.ax_jerk.plot(self.time, np.zeros_like(self.time), label="Jerk", color='#ff9f0b')
+        self.jerk_line, = self.ax_jerk.plot(self.time, np.zeros_like(self.time), label="Jerk", color='#ff9f0b', drawstyle="steps-post")
 
         self.ax_position.legend(facecolor=bg_color, edgecolor=text_color)
         self.ax_speed.legend(facecolor=bg_color, edgecolor=text_color)
@@ -309,185 +378,113 @@ class TrajectoryPlanner(QWidget):
 
         self.setLayout(main_layout)
 
+        # Redraw only the data lines through blitting while the axis limits stay the same
+        self.blit = blit
+        if self.blit:
+            self.init_blit()
+
+        # Plan and sample on a worker thread, the GUI thread only applies results
+        self.threaded = threaded
+        if self.threaded:
+            self.planning_thread = QThread(self)
+            self.planning_worker = PlanningWorker(self.compute_profile)
+            self.planning_worker.moveToThread(self.planning_thread)
+            self.planning_worker._wake.connect(self.planning_worker.run)
+            self.planning_worker.finished.connect(self.apply_profile)
+            self.planning_thread.start()
+
         # Initial plot update
         self.update_plot()
 
     def update_plot(self):
         # Get values from UI
-        self.q0 = self.inputs[3].value()
-        self.q1 = self.inputs[4].value()
-        self.v0 = self.inputs[5].value()
-        self.v1 = self.inputs[6].value()
-        self.v_max = self.inputs[0].value()
-        self.a_max = self.inputs[1].value()
-        self.j_max = self.inputs[2].value()
+        params = (self.inputs[3].value(),  # Initial position
+                  self.inputs[4].value(),  # Target position
+                  self.inputs[5].value(),  # Initial velocity
+                  self.inputs[6].value(),  # Final velocity
+                  self.inputs[0].value(),  # Velocity limit
+                  self.inputs[1].value(),  # Acceleration limit
+                  self.inputs[2].value())  # Jerk limit
+
+        if self.threaded:
+            # Only the latest parameters are kept while the worker is busy
+            self.planning_worker.submit(params)
+        else:
+            self.apply_profile(self.compute_profile(params))
+
+    def compute_profile(self, params):
+        """Plan and sample the trajectory. Runs on the planning thread, so it must not touch widgets or artists."""
+        q0, q1, v0, v1, v_max, a_max, j_max = params
+        result = {"params": params, "error": None}
 
         try:
             # Plan trajectory
             tr = self.p.plan_trajectory(
-                [self.q0], [self.q1], [self.v0], [self.v1], self.v_max, self.a_max, self.j_max
+                [q0], [q1], [v0], [v1], v_max, a_max, j_max
             )
-            timesteps = 1000
-            new_time = np.linspace(0, max(tr.time), timesteps)
-            profiles = np.array([tr(t) for t in new_time])
-
-            # Compute Jerk (numerical derivative of acceleration)
-            jerk_values = np.gradient(profiles[:, 0, 0], new_time)  # d(Acceleration)/dt
-
-
-            # Define important y-tick positions
-            position_ticks = [self.q0, self.q1]  # Min/Max position
-            velocity_ticks = [0, self.v_max] if (self.q0 - self.q1) < 0 else [-self.v_max, 0] # Min/Max velocity
-            acceleration_ticks = [self.a_max, -self.a_max]  # Min/Max acceleration
-            jerk_ticks = [self.j_max, -self.j_max]  # Min/Max jerk
-
-            # Function to add padding
-            def add_padding(tick_values, padding_factor=0.15):
-                """Adds padding to the y-axis limits while preserving auto ticks."""
-                min_val, max_val = min(tick_values), max(tick_values)
-                padding = (max_val - min_val) * padding_factor  # 10% extra space
-                return min_val - padding, max_val + padding
-
-            for ax, manual_ticks in zip(
-                [self.ax_position, self.ax_speed, self.ax_accel, self.ax_jerk],
-                [position_ticks, velocity_ticks, acceleration_ticks, jerk_ticks]
-            ):
-                # Remove previously added grid lines if they exist
-                if hasattr(ax, "custom_grid_lines"):
-                    for line in ax.custom_grid_lines:
-                        line.remove()  # Properly remove the old grid lines
-                ax.custom_grid_lines = []  # Reset the list
-
-                # Disable default grid
-                ax.grid(False)
-
-                min_val, max_val = min(manual_ticks), max(manual_ticks)
-                computed_ticks = np.linspace(min_val, max_val, num=6)
-
-                ax.set_yticks(computed_ticks)
-                ax.set_ylim(add_padding(computed_ticks))
-
-                # Ensure minor ticks are used but not excessive
-                # ax.yaxis.set_minor_locator(ticker.AutoMinorLocator(n=2))
-
-                # Draw new manual grid lines
-                for tick in computed_ticks:
-                    line_alpha = 0.9 if tick in manual_ticks else 0.3  # Min/max values are stronger
-                    line_color = "lightgray" if tick in manual_ticks else "darkgray"
-                    line_thickness = 0.5 if tick in manual_ticks else 0.3
-                    line = ax.axhline(y=tick, linestyle="--", linewidth=line_thickness, color=line_color, alpha=line_alpha)
-                    ax.custom_grid_lines.append(line)  # Store reference for future removal
-
-            # Compute statistics
-            estimationErrorPercentage = 0.001
-            total_time = max(tr.time)
-            time_step = new_time[1] - new_time[0]
-            max_velocity_time = np.sum(profiles[:, 0, 1] >= self.v_max - (estimationErrorPercentage * self.v_max)) * time_step
-            max_acceleration_time = np.sum(profiles[:, 0, 0] >= self.a_max - (estimationErrorPercentage * self.a_max)) * time_step
-            min_acceleration_time = np.sum(profiles[:, 0, 0] <= -self.a_max + (estimationErrorPercentage * self.a_max)) * time_step
-            max_jerk_time = np.sum(jerk_values >= self.j_max - (estimationErrorPercentage * self.j_max)) * time_step
-            min_jerk_time = np.sum(jerk_values <= -self.j_max + (estimationErrorPercentage * self.j_max)) * time_step
-            
-            # Compute percentages
-            max_velocity_percent = (max_velocity_time / total_time) * 100
-            max_acceleration_percent = (max_acceleration_time / total_time) * 100
-            min_acceleration_percent = (min_acceleration_time / total_time) * 100
-            max_jerk_percent = (max_jerk_time / total_time) * 100
-            min_jerk_percent = (min_jerk_time / total_time) * 100
-            
-            
-            
-            
-            
-            def nice_ticks(data_max, num_ticks=18):
-                """Compute a 'nice' tick interval ensuring total_time is included, while preventing excessive tick density."""
-                
-                raw_interval = data_max / (num_ticks - 1)
-                
-                # Determine base spacing
-                if raw_interval <= 0.5:
-                    nice_interval = 0.5  # 0.5ms spacing
-                elif raw_interval <= 1:
-                    nice_interval = 1  # 1ms spacing
-                elif raw_interval <= 2:
-                    nice_interval = 2  # 2ms spacing
-                elif raw_interval <= 5:
-                    nice_interval = 5  # 5ms spacing
-                else:
-                    nice_interval = round(raw_interval / 10) * 10  # Default rounding to nearest 10ms
-
-                # Generate tick values
-                ticks = np.arange(0, data_max, nice_interval)
+            # Exact phase boundaries plus points where the profiles curve
+            new_time = sample_times(tr, t0=0, t_end=max(tr.time))
+            profiles = tr(new_time, jerk=True)
 
-                # # Reduce tick density further if more than 30 ticks are generated
-                # if len(ticks) > 30:
-                #     nice_interval = 5 if nice_interval == 1 else nice_interval  # Switch to 5ms if we were using 1ms
-                #     ticks = np.arange(0, data_max, nice_interval)
+            # Exact jerk from the planner, piecewise constant between phases
+            jerk_values = profiles[:, 0, JERK_ID]
 
-                # Ensure total_time is explicitly included
-                if total_time * 1000 not in ticks:
-                    ticks = np.append(ticks, total_time * 1000)
-
-                return np.unique(ticks)  # Ensure unique values
-
-
-            # Compute x-ticks in milliseconds and convert to seconds
-            x_ticks = nice_ticks(total_time * 1000) / 1000  
+            # Compute statistics from the phase durations, exact and independent of the sample grid
+            stats = TrajectoryStats(tr.plans[0], q0, q1, v0, v1, v_max, a_max, j_max)
+            total_time = max(tr.time)
+            max_velocity_time = stats.time_at_max_velocity
+            max_acceleration_time = stats.time_at_max_acceleration
+            min_acceleration_time = stats.time_at_max_deceleration
+            max_jerk_time = stats.time_at_max_jerk
+            min_jerk_time = stats.time_at_min_jerk
 
-            # Define a function to format x-ticks as milliseconds
-            def format_ms(x, _):
-                """Format x-ticks: Hide only the tick right before total_time, 2 decimals for total_time, 1 decimal for others."""
-                sorted_ticks = np.sort(x_ticks)  # Ensure sorted ticks
-                if len(sorted_ticks) > 1:
-                    tick_before_total_time = sorted_ticks[np.where(sorted_ticks < total_time)[0][-1]]  # Get the closest tick before total_time
-                else:
-                    tick_before_total_time = None  # Fallback
+            # Compute percentages
+            max_velocity_percent = stats.percent(max_velocity_time)
+            max_acceleration_percent = stats.percent(max_acceleration_time)
+            min_acceleration_percent = stats.percent(min_acceleration_time)
+            max_jerk_percent = stats.percent(max_jerk_time)
+            min_jerk_percent = stats.percent(min_jerk_time)
+
+            result.update(
+                time=new_time,
+                profiles=profiles,
+                jerk=jerk_values,
+                total_time=total_time,
+                statistics=(max_velocity_time, max_velocity_percent,
+                            max_acceleration_time, max_acceleration_percent,
+                            min_acceleration_time, min_acceleration_percent,
+                            max_jerk_time, max_jerk_percent,
+                            min_jerk_time, min_jerk_percent),
+            )
 
-                if np.isclose(x, total_time, atol=1e-6):  # Highlight total_time with 2 decimals
-                    return f"{x * 1000:.2f}"
-                elif tick_before_total_time is not None and np.isclose(x, tick_before_total_time, atol=1e-6):
-                    return ""  # Hide only the tick immediately before total_time
-                return f"{x * 1000:.1f}"  # 1 decimal for other ticks
-            
-            
-            # Apply new x-ticks and formatting
-            for ax in [self.ax_position, self.ax_speed, self.ax_accel, self.ax_jerk]:
-                if hasattr(ax, "custom_x_grid_lines"):
-                    for line in ax.custom_x_grid_lines:
-                        line.remove()
-                ax.custom_x_grid_lines = []  # Reset the list
-
-                ax.set_xticks(x_ticks)
-                ax.xaxis.set_major_formatter(FuncFormatter(format_ms))
-
-                # Draw new manual grid lines for x-axis
-                for tick in x_ticks:
-                    line_alpha = 0.9 if tick == total_time else 0.3  # Highlight final tick
-                    line_color = "lightgray" if tick == total_time else "darkgray"
-                    line_thickness = 0.5 if tick == total_time else 0.3
-                    line = ax.axvline(x=tick, linestyle="--", linewidth=line_thickness, color=line_color, alpha=line_alpha)
-                    ax.custom_x_grid_lines.append(line)
-                    
-        
-        
-            # Update plots
-            self.position_line.set_xdata(new_time)
-            self.position_line.set_ydata(profiles[:, 0, 2])  # Position
+        except Exception as e:
+            result["error"] = e
 
-            self.speed_line.set_xdata(new_time)
-            self.speed_line.set_ydata(profiles[:, 0, 1])  # Speed
+        return result
 
-            self.accel_line.set_xdata(new_time)
-            self.accel_line.set_ydata(profiles[:, 0, 0])  # Acceleration
+    def apply_profile(self, result):
+        """Apply a finished planning result to the plots and statistics. Runs on the GUI thread."""
+        self.q0, self.q1, self.v0, self.v1, self.v_max, self.a_max, self.j_max = result["params"]
 
-            self.jerk_line.set_xdata(new_time)
-            self.jerk_line.set_ydata(jerk_values)  # Jerk
+        try:
+            if result["error"] is not None:
+                raise result["error"]
+
+            new_time = result["time"]
+            profiles = result["profiles"]
+            jerk_values = result["jerk"]
+            total_time = result["total_time"]
+            (max_velocity_time, max_velocity_percent,
+             max_acceleration_time, max_acceleration_percent,
+             min_acceleration_time, min_acceleration_percent,
+             max_jerk_time, max_jerk_percent,
+             min_jerk_time, min_jerk_percent) = result["statistics"]
+
+            if self.blit:
+                self.render_blit(new_time, profiles, jerk_values, total_time)
+            else:
+                self.render_full(new_time, profiles, jerk_values, total_time)
 
-            # Adjust axes
-            for ax in [self.ax_position, self.ax_speed, self.ax_accel, self.ax_jerk]:
-                ax.relim()
-                ax.autoscale_view()
-                
             leftAlignPadding = 18;
 
             self.statistics_label.setText(f"""
@@ -495,7 +492,7 @@ class TrajectoryPlanner(QWidget):
                 
                 {"Time at Max Vel:".ljust(leftAlignPadding)} {max_velocity_time * 1000:>6.2f} ms ({max_velocity_percent:>4.2f}%)
                 {"Time at Max Accel:".ljust(leftAlignPadding)} {max_acceleration_time * 1000:>6.2f} ms ({max_acceleration_percent:>4.2f}%)
-                {"Time at Max Accel:".ljust(leftAlignPadding)} {min_acceleration_time * 1000:>6.2f} ms ({min_acceleration_percent:>4.2f}%)
+                {"Time at Min Accel:".ljust(leftAlignPadding)} {min_acceleration_time * 1000:>6.2f} ms ({min_acceleration_percent:>4.2f}%)
                 {"Time at Max Jerk:".ljust(leftAlignPadding)} {max_jerk_time * 1000:>6.2f} ms ({max_jerk_percent:>4.2f}%)
                 {"Time at Min Jerk:".ljust(leftAlignPadding)} {min_jerk_time * 1000:>6.2f} ms ({min_jerk_percent:>4.2f}%)
             """)
@@ -508,9 +505,243 @@ class TrajectoryPlanner(QWidget):
             self.warning_label.setText(f"Warning: {str(e)}")
             self.warning_label.setStyleSheet("color: red; font-weight: bold;")
 
+            # Keep the last blitted frame, the full path redraws as it always did
+            if not self.blit:
+                self.canvas.draw()
+
+    def render_full(self, new_time, profiles, jerk_values, total_time):
+        """Rebuild ticks, formatters and grid lines, then redraw the whole figure."""
+        # Define important y-tick positions
+        position_ticks = [self.q0, self.q1]  # Min/Max position
+        velocity_ticks = [0, self.v_max] if (self.q0 - self.q1) < 0 else [-self.v_max, 0] # Min/Max velocity
+        acceleration_ticks = [self.a_max, -self.a_max]  # Min/Max acceleration
+        jerk_ticks = [self.j_max, -self.j_max]  # Min/Max jerk
+
+        # Function to add padding
+        def add_padding(tick_values, padding_factor=0.15):
+            """Adds padding to the y-axis limits while preserving auto ticks."""
+            min_val, max_val = min(tick_values), max(tick_values)
+            padding = (max_val - min_val) * padding_factor  # 10% extra space
+            return min_val - padding, max_val + padding
+
+        for ax, manual_ticks in zip(
+            [self.ax_position, self.ax_speed, self.ax_accel, self.ax_jerk],
+            [position_ticks, velocity_ticks, acceleration_ticks, jerk_ticks]
+        ):
+            # Remove previously added grid lines if they exist
+            if hasattr(ax, "custom_grid_lines"):
+                for line in ax.custom_grid_lines:
+                    line.remove()  # Properly remove the old grid lines
+            ax.custom_grid_lines = []  # Reset the list
+
+            # Disable default grid
+            ax.grid(False)
+
+            min_val, max_val = min(manual_ticks), max(manual_ticks)
+            computed_ticks = np.linspace(min_val, max_val, num=6)
+
+            ax.set_yticks(computed_ticks)
+            ax.set_ylim(add_padding(computed_ticks))
+
+            # Ensure minor ticks are used but not excessive
+            # ax.yaxis.set_minor_locator(ticker.AutoMinorLocator(n=2))
+
+            # Draw new manual grid lines
+            for tick in computed_ticks:
+                line_alpha = 0.9 if tick in manual_ticks else 0.3  # Min/max values are stronger
+                line_color = "lightgray" if tick in manual_ticks else "darkgray"
+                line_thickness = 0.5 if tick in manual_ticks else 0.3
+                line = ax.axhline(y=tick, linestyle="--", linewidth=line_thickness, color=line_color, alpha=line_alpha)
+                ax.custom_grid_lines.append(line)  # Store reference for future removal
+
+        def nice_ticks(data_max, num_ticks=18):
+            """Compute a 'nice' tick interval ensuring total_time is included, while preventing excessive tick density."""
+                
+            raw_interval = data_max / (num_ticks - 1)
+                
+            # Determine base spacing
+            if raw_interval <= 0.5:
+                nice_interval = 0.5  # 0.5ms spacing
+            elif raw_interval <= 1:
+                nice_interval = 1  # 1ms spacing
+            elif raw_interval <= 2:
+                nice_interval = 2  # 2ms spacing
+            elif raw_interval <= 5:
+                nice_interval = 5  # 5ms spacing
+            else:
+                nice_interval = round(raw_interval / 10) * 10  # Default rounding to nearest 10ms
+
+            # Generate tick values
+            ticks = np.arange(0, data_max, nice_interval)
+
+            # # Reduce tick density further if more than 30 ticks are generated
+            # if len(ticks) > 30:
+            #     nice_interval = 5 if nice_interval == 1 else nice_interval  # Switch to 5ms if we were using 1ms
+            #     ticks = np.arange(0, data_max, nice_interval)
+
+            # Ensure total_time is explicitly included
+            if total_time * 1000 not in ticks:
+                ticks = np.append(ticks, total_time * 1000)
+
+            return np.unique(ticks)  # Ensure unique values
+
+
+        # Compute x-ticks in milliseconds and convert to seconds
+        x_ticks = nice_ticks(total_time * 1000) / 1000  
+
+        # Define a function to format x-ticks as milliseconds
+        def format_ms(x, _):
+            """Format x-ticks: Hide only the tick right before total_time, 2 decimals for total_time, 1 decimal for others."""
+            sorted_ticks = np.sort(x_ticks)  # Ensure sorted ticks
+            if len(sorted_ticks) > 1:
+                tick_before_total_time = sorted_ticks[np.where(sorted_ticks < total_time)[0][-1]]  # Get the closest tick before total_time
+            else:
+                tick_before_total_time = None  # Fallback
+
+            if np.isclose(x, total_time, atol=1e-6):  # Highlight total_time with 2 decimals
+                return f"{x * 1000:.2f}"
+            elif tick_before_total_time is not None and np.isclose(x, tick_before_total_time, atol=1e-6):
+                return ""  # Hide only the tick immediately before total_time
+            return f"{x * 1000:.1f}"  # 1 decimal for other ticks
+            
+            
+        # Apply new x-ticks and formatting
+        for ax in [self.ax_position, self.ax_speed, self.ax_accel, self.ax_jerk]:
+            if hasattr(ax, "custom_x_grid_lines"):
+                for line in ax.custom_x_grid_lines:
+                    line.remove()
+            ax.custom_x_grid_lines = []  # Reset the list
+
+            ax.set_xticks(x_ticks)
+            ax.xaxis.set_major_formatter(FuncFormatter(format_ms))
+
+            # Draw new manual grid lines for x-axis
+            for tick in x_ticks:
+                line_alpha = 0.9 if tick == total_time else 0.3  # Highlight final tick
+                line_color = "lightgray" if tick == total_time else "darkgray"
+                line_thickness = 0.5 if tick == total_time else 0.3
+                line = ax.axvline(x=tick, linestyle="--", linewidth=line_thickness, color=line_color, alpha=line_alpha)
+                ax.custom_x_grid_lines.append(line)
+                    
+        
+        
+        # Update plots
+        self.position_line.set_xdata(new_time)
+        self.position_line.set_ydata(profiles[:, 0, 2])  # Position
+
+        self.speed_line.set_xdata(new_time)
+        self.speed_line.set_ydata(profiles[:, 0, 1])  # Speed
+
+        self.accel_line.set_xdata(new_time)
+        self.accel_line.set_ydata(profiles[:, 0, 0])  # Acceleration
+
+        self.jerk_line.set_xdata(new_time)
+        self.jerk_line.set_ydata(jerk_values)  # Jerk
+
+        # Adjust axes
+        for ax in [self.ax_position, self.ax_speed, self.ax_accel, self.ax_jerk]:
+            ax.relim()
+            ax.autoscale_view()
+
         # Redraw
         self.canvas.draw()
+
+    def init_blit(self):
+        """Create the reusable artists of the blitted redraw path."""
+        self.axes = [self.ax_position, self.ax_speed, self.ax_accel, self.ax_jerk]
+        self.data_lines = [self.position_line, self.speed_line, self.accel_line, self.jerk_line]
+
+        # Min/max limit lines and the total time marker move on every frame
+        self.limit_lines = [
+            [ax.axhline(y=0, linestyle="--", linewidth=0.5, color="lightgray", alpha=0.9, animated=True) for _ in range(2)]
+            for ax in self.axes
+        ]
+        self.total_time_lines = [
+            ax.axvline(x=0, linestyle="--", linewidth=0.5, color="lightgray", alpha=0.9, animated=True)
+            for ax in self.axes
+        ]
+        self.total_time_text = self.ax_position.text(
+            0, 1.0, "", transform=blended_transform_factory(self.ax_position.transData, self.ax_position.transAxes),
+            ha="center", va="bottom", color=text_color, fontsize=9, animated=True
+        )
+        for line in self.data_lines:
+            line.set_animated(True)
+
+        self.animated_artists = self.data_lines + sum(self.limit_lines, []) + self.total_time_lines + [self.total_time_text]
+
+        # Grid lines at the regular ticks only move when the axis limits change
+        self.y_grid_lines = [[] for _ in self.axes]
+        self.x_grid_lines = [[] for _ in self.axes]
+
+        for ax in self.axes:
+            ax.grid(False)
+            ax.xaxis.set_major_formatter(FuncFormatter(lambda x, _: f"{x * 1000:.1f}"))
+
+        self.blit_frame = None
+        self.blit_background = None
+        self.canvas.mpl_connect("draw_event", self.on_draw)
+
+    def on_draw(self, event):
+        """Cache the static background after every full draw and put the animated artists back on it."""
+        self.blit_background = self.canvas.copy_from_bbox(self.fig.bbox)
+        for artist in self.animated_artists:
+            self.fig.draw_artist(artist)
+
+    def render_blit(self, new_time, profiles, jerk_values, total_time):
+        """Update the data and limit artists and blit them, redrawing everything only if the axis limits change."""
+        manual_ticks = [
+            [self.q0, self.q1],  # Min/Max position
+            [0, self.v_max] if (self.q0 - self.q1) < 0 else [-self.v_max, 0],  # Min/Max velocity
+            [self.a_max, -self.a_max],  # Min/Max acceleration
+            [self.j_max, -self.j_max],  # Min/Max jerk
+        ]
+
+        # Limits snap to nice tick steps, so small changes keep the cached background valid
+        y_ticks = [snapped_ticks(min(ticks), max(ticks), 5) for ticks in manual_ticks]
+        x_ticks = snapped_ticks(0, total_time, 17)
+        frame = (tuple(x_ticks),) + tuple(tuple(ticks) for ticks in y_ticks)
+
+        for line, data in zip(self.data_lines, [profiles[:, 0, 2], profiles[:, 0, 1], profiles[:, 0, 0], jerk_values]):
+            line.set_data(new_time, data)
+
+        for lines, ticks in zip(self.limit_lines, manual_ticks):
+            for line, tick in zip(lines, ticks):
+                line.set_ydata([tick, tick])
+
+        for line in self.total_time_lines:
+            line.set_xdata([total_time, total_time])
+        self.total_time_text.set_x(total_time)
+        self.total_time_text.set_text(f"{total_time * 1000:.2f}")
+
+        if frame != self.blit_frame or self.blit_background is None:
+            self.blit_frame = frame
+
+            for ax, ticks, grid_lines in zip(self.axes, y_ticks, self.y_grid_lines):
+                padding = (ticks[-1] - ticks[0]) * 0.15
+                ax.set_yticks(ticks)
+                ax.set_ylim(ticks[0] - padding, ticks[-1] + padding)
+                update_grid_lines(ax, grid_lines, ticks, horizontal=True)
+
+            span = x_ticks[-1]
+            self.ax_jerk.set_xticks(x_ticks)
+            self.ax_jerk.set_xlim(-0.05 * span, 1.05 * span)
+            for ax, grid_lines in zip(self.axes, self.x_grid_lines):
+                update_grid_lines(ax, grid_lines, x_ticks, horizontal=False)
+
+            # Full redraw, on_draw caches the new background
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self.blit_background)
+            for artist in self.animated_artists:
+                self.fig.draw_artist(artist)
+            self.canvas.blit(self.fig.bbox)
         
+    def closeEvent(self, event):
+        if self.threaded:
+            self.planning_thread.quit()
+            self.planning_thread.wait()
+        super().closeEvent(event)
+
     def showEvent(self, event):
         super().showEvent(event)
         self.resize(self.width() + 1, self.height() + 1)
@@ -0,0 +1,797 @@
+import math
+import time
+import numpy as np
+from .trajectory import EPSILON, PLAN_DTYPE
+from .trajectory import STATUS_OK, STATUS_INFEASIBLE, STATUS_SEARCH_FAILED
+from .trajectory import STATUS_INVALID
+from .instrumentation import BRANCH_V_MAX_REACHED, BRANCH_V_MAX_NOT_REACHED
+from .instrumentation import BRANCH_SEARCH, BRANCH_FIXED_TIME
+from .instrumentation import BRANCH_FIXED_TIME_SEARCH, BRANCH_ONE_SIDED
+from .instrumentation import BRANCH_INFEASIBLE
+from .constant_time_optimizer import fixed_time_profile
+
+
+# Search tolerances: absolute time error (s) and profile evaluations per move
+SEARCH_DT_THRESH = 1e-9
+SEARCH_MAX_ITER = 200
+
+# Relative accuracy of the largest valid acceleration of moves without a
+# fixed time, the profile stays valid and is at most this much slower
+SEARCH_A_RTOL = 1e-3
+
+# Step of the golden section search for the window of valid accelerations
+GOLDEN = (3 - math.sqrt(5))/2
+
+# Up to this many moves are planned with the scalar closed forms of
+# plan_move, array operations only pay off for more
+SMALL_BATCH = 16
+
+
+def sign_transforms(q0, q1, v0, v1, v_max, a_max, j_max):
+    """
+    Sign transforms for being able to calculate trajectories with q1 < q0.
+    Works elementwise on arrays.
+
+    Look at 'Trajectory planning for automatic machines and robots(2008)'
+    """
+    s = np.sign(q1-q0)
+    vs1 = (s+1)/2
+    vs2 = (s-1)/2
+
+    return (s*q0, s*q1, s*v0, s*v1,
+            vs1*v_max - vs2*v_max,
+            vs1*a_max - vs2*a_max,
+            vs1*j_max - vs2*j_max)
+
+
+def check_possibility(q0, q1, v0, v1, a_max, j_max):
+    """
+    Returns boolean array which tells whether each trajectory is feasible
+    """
+    dv = np.abs(v1 - v0)
+    dq = np.abs(q1 - q0)
+
+    time_to_reach_max_a = a_max/j_max
+    time_to_set_speeds = np.sqrt(dv/j_max)
+
+    return np.where(time_to_reach_max_a <= time_to_set_speeds,
+                    dq > 0.5*(v0 + v1)*(time_to_reach_max_a + dv/a_max),
+                    dq > time_to_set_speeds*(v0 + v1))
+
+
+def maximum_speed_reached(q0, q1, v0, v1, v_max, a_max, j_max):
+    """
+    Array version of the 'maximum speed reached' closed form, page 79 of
+        'Trajectory planning for automatic machines and robots(2008)'
+
+    Returns Tj1, Ta, Tj2, Td, Tv and a mask of moves the profile is valid for
+    """
+    # Acceleration period
+    a_not_reached = (v_max-v0)*j_max < a_max**2
+    Tj1 = np.where(a_not_reached, np.sqrt((v_max-v0)/j_max), a_max/j_max)
+    Ta = np.where(a_not_reached, 2*Tj1, Tj1 + (v_max-v0)/a_max)
+
+    # Deceleration period
+    a_min_not_reached = (v_max-v1)*j_max < a_max**2
+    Tj2 = np.where(a_min_not_reached, np.sqrt((v_max-v1)/j_max), a_max/j_max)
+    Td = np.where(a_min_not_reached, 2*Tj2, Tj2 + (v_max-v1)/a_max)
+
+    Tv = (q1-q0)/v_max - (Ta/2)*(1+v0/v_max)-(Td/2)*(1+v1/v_max)
+
+    return Tj1, Ta, Tj2, Td, Tv, Tv >= 0
+
+
+def maximum_speed_not_reached(q0, q1, v0, v1, a_max, j_max):
+    """
+    Array version of the 'maximum speed not reached' closed form, page 79 of
+        'Trajectory planning for automatic machines and robots(2008)'
+
+    Returns Tj1, Ta, Tj2, Td, Tv and a mask of moves the profile is valid for
+    """
+    # Assuming that a_max/a_min is reached
+    Tj = a_max/j_max
+
+    v = (a_max**2)/j_max
+    delta = ((a_max**4)/(j_max**2)) + 2*((v0**2)+(v1**2)) +\
+        a_max*(4*(q1-q0)-2*(a_max/j_max)*(v0+v1))
+
+    Ta = (v - 2*v0 + np.sqrt(delta))/(2*a_max)
+    Td = (v - 2*v1 + np.sqrt(delta))/(2*a_max)
+
+    valid = (Ta - 2*Tj >= EPSILON) & (Td - 2*Tj >= EPSILON)
+
+    return Tj, Ta, Tj, Td, np.zeros_like(Ta), valid
+
+
+def one_sided_profile(q0, q1, v0, v1, a_max, j_max):
+    """
+    Array version of the profiles with only an acceleration (v1 > v0) or
+        only a deceleration (v0 > v1) period, page 80 of
+        'Trajectory planning for automatic machines and robots(2008)'.
+        They are used if even decreased accelerations give Ta < 0 or Td < 0.
+
+    Returns Tj1, Ta, Tj2, Td, Tv and a mask of moves the profile is valid for
+    """
+    h = q1 - q0
+    vs = v1 + v0
+    dv = v1 - v0
+    accelerate = dv > 0
+
+    # Both periods last 2*h/(v1 + v0), the jerk phases take Tj of them
+    T = 2*h/vs
+    Tj = (j_max*h - np.sqrt(j_max*(j_max*(h**2) - np.abs(dv)*(vs**2))))/\
+        (j_max*vs)
+
+    zero = np.zeros_like(T)
+    Tj1 = np.where(accelerate, Tj, zero)
+    Ta = np.where(accelerate, T, zero)
+    Tj2 = np.where(accelerate, zero, Tj)
+    Td = np.where(accelerate, zero, T)
+
+    valid = (dv != 0) & (Tj >= 0) & (T >= 2*Tj) & (j_max*Tj <= a_max)
+
+    return Tj1, Ta, Tj2, Td, zero, valid
+
+
+def _refine(residual, idx, lo, hi, r_lo, r_hi, r_min, r_max, res,
+            iterations, max_iter, rtol=0):
+    """
+    Illinois variant of regula falsi between lo (residual >= 0) and hi
+        (residual < 0 or no valid profile). Bisects while the residual at hi
+        is unknown. Profiles of the points moving lo are stored into res.
+        Elements also stop once the bracket is narrower than rtol*hi.
+
+    Returns mask of idx elements which converged to r_min <= r <= r_max
+    """
+    converged = np.zeros(len(idx), dtype=bool)
+    pos = np.arange(len(idx))
+    side = np.zeros(len(lo), dtype=np.int8)
+
+    while len(idx):
+        l, h, fl, fh = lo[idx], hi[idx], r_lo[idx], r_hi[idx]
+        x = (l + h)/2
+        secant = np.isfinite(fh) & (fl > fh)
+        x[secant] = (l + fl*(h - l)/(fl - fh))[secant]
+
+        p, r = residual(idx, x)
+        hit = (r >= r_min) & (r <= r_max)
+        upper = r >= 0
+        res[:, idx[upper | hit]] = p[:, upper | hit]
+        converged[pos[hit]] = True
+
+        # Halve the residual of the end point which is kept twice in a row
+        r_hi[idx[upper & (side[idx] == 1)]] /= 2
+        r_lo[idx[~upper & (side[idx] == -1)]] /= 2
+
+        lo[idx[upper]] = x[upper]
+        r_lo[idx[upper]] = r[upper]
+        side[idx[upper]] = 1
+        hi[idx[~upper]] = x[~upper]
+        r_hi[idx[~upper]] = r[~upper]
+        side[idx[~upper]] = -1
+
+        width = np.abs(hi[idx] - lo[idx])
+        stop = hit | (iterations[idx] >= max_iter) |\
+            (width <= np.maximum(4*np.spacing(hi[idx]), rtol*np.abs(hi[idx])))
+        idx = idx[~stop]
+        pos = pos[~stop]
+
+    return converged
+
+
+def _window(residual, idx, lo, hi, r_lo, r_hi, a_max, res, found,
+            iterations, max_iter):
+    """
+    Golden section search for the maximum of the residual, which is
+        negative at lo and below its value at hi = 2*lo. The maximum lies
+        between lo and min(2*hi, a_max), the search stops at the first
+        point with residual >= 0. It becomes lo, with its profile stored
+        into res, and hi the closest point above it with a negative
+        residual (whose residual may be unknown).
+    """
+    a, c, r_c = lo[idx], hi[idx], r_hi[idx]
+    b = np.minimum(2*c, a_max[idx])
+    while True:
+        keep = (iterations[idx] < max_iter) &\
+            (b - a > np.maximum(4*np.spacing(b), SEARCH_A_RTOL*b))
+        idx, a, b, c, r_c = [x[keep] for x in (idx, a, b, c, r_c)]
+        if not len(idx):
+            return
+
+        right = b - c > c - a
+        x = np.where(right, c + GOLDEN*(b - c), c - GOLDEN*(c - a))
+        p, r = residual(idx, x)
+
+        ok = r >= 0
+        j = idx[ok]
+        res[:, j] = p[:, ok]
+        found[j] = True
+        lo[j], r_lo[j] = x[ok], r[ok]
+        above = c[ok] > x[ok]
+        hi[j] = np.where(above, c[ok], b[ok])
+        r_hi[j] = np.where(above, r_c[ok], np.nan)
+
+        # Keep the better of x and c inside the bracket
+        better = r > r_c
+        upper = x > c
+        a, b = (np.where(better, np.where(upper, c, a),
+                         np.where(upper, a, x)),
+                np.where(better, np.where(upper, b, c),
+                         np.where(upper, x, b)))
+        c = np.where(better, x, c)
+        r_c = np.where(better, r, r_c)
+
+        idx, a, b, c, r_c = [y[~ok] for y in (idx, a, b, c, r_c)]
+
+
+def search_planning(q0, q1, v0, v1, a_max, j_max, T=None,
+                    dt_thresh=SEARCH_DT_THRESH, max_iter=SEARCH_MAX_ITER,
+                    v_max=None):
+    """
+    Searches for the maximum acceleration which makes the 'maximum speed not
+        reached' profile valid. Without T the largest valid acceleration not
+        above a_max is found; with T the acceleration which makes the
+        profile last T (within dt_thresh) is found. Without T the
+        acceleration is only refined to SEARCH_A_RTOL.
+
+    The acceleration is bracketed by halving it, or with a golden section
+        search where halving steps over the window of valid accelerations,
+        and the bracket is then narrowed with regula falsi, so every move
+        needs a few dozen profile evaluations at most. If v_max is given,
+        profiles whose peak speed exceeds it are not reported as found.
+
+    Returns array with shape (5, n) of Tj1, Ta, Tj2, Td, Tv, a mask of moves
+        a profile was found for and the number of profile evaluations used
+        for each move
+    """
+    n = len(q0)
+    res = np.zeros((5, n))
+    found = np.zeros(n, dtype=bool)
+    iterations = np.zeros(n, dtype=np.int32)
+
+    def margin(idx, a):
+        """
+        Profile for acceleration a and how far it is from being invalid
+        """
+        iterations[idx] += 1
+        Tj1, Ta, Tj2, Td, Tv, _ = maximum_speed_not_reached(
+            q0[idx], q1[idx], v0[idx], v1[idx], a, j_max[idx])
+        r = np.minimum(Ta, Td) - 2*Tj1 - EPSILON
+        return np.asarray((Tj1, Ta, Tj2, Td, Tv)), r
+
+    def excess_time(idx, a):
+        """
+        Profile for acceleration a and how much longer than T it lasts
+        """
+        p, r = margin(idx, a)
+        return p, np.where(r >= 0, p[1] + p[3] + p[4] - T[idx], np.nan)
+
+    # Largest valid acceleration lies in [lo, hi): halve a_max until the
+    # profile becomes valid. Profiles are only valid within a window of
+    # accelerations, if the margin falls again halving stepped over it and
+    # the window is searched for around the peak of the margin
+    lo = np.array(a_max, dtype=np.float64)
+    hi = np.full(n, np.inf)
+    r_lo = np.zeros(n)
+    r_hi = np.full(n, np.nan)
+    peak = np.zeros(n, dtype=bool)
+    idx = np.arange(n)
+    while len(idx):
+        p, r = margin(idx, lo[idx])
+        ok = r >= 0
+        res[:, idx[ok]] = p[:, ok]
+        r_lo[idx[ok]] = r[ok]
+        found[idx[ok]] = True
+
+        fell = ~ok & (np.where(np.isnan(r), -np.inf, r) < r_hi[idx])
+        peak[idx[fell]] = True
+
+        r, idx = r[~ok & ~fell], idx[~ok & ~fell]
+        hi[idx] = lo[idx]
+        r_hi[idx] = r
+        lo[idx] /= 2
+        idx = idx[(lo[idx] > EPSILON) & (iterations[idx] < max_iter)]
+
+    _window(margin, np.flatnonzero(peak), lo, hi, r_lo, r_hi, a_max, res,
+            found, iterations, max_iter)
+
+    idx = np.flatnonzero(found & np.isfinite(hi) & (r_lo > dt_thresh))
+    _refine(margin, idx, lo, hi, r_lo, r_hi, 0, dt_thresh, res,
+            iterations, max_iter, rtol=SEARCH_A_RTOL if T is None else 0)
+
+    if T is None:
+        return res, _below(res, v0, v_max, j_max, found), iterations
+
+    # Fixed time: the fastest valid profile must not be longer than T.
+    # Decreasing acceleration makes the profile longer, so halve it until
+    # the profile lasts at least T and refine between the two
+    fast = lo
+    r_fast = res[1] + res[3] + res[4] - T
+    found &= r_fast <= dt_thresh
+    done = found & (r_fast >= -dt_thresh)
+
+    slow = lo.copy()
+    r_slow = np.full(n, np.nan)
+    edge = np.zeros(n, dtype=bool)
+    idx = np.flatnonzero(found & ~done)
+    while len(idx):
+        slow[idx] /= 2
+        p, r = excess_time(idx, slow[idx])
+
+        hit = np.abs(r) <= dt_thresh
+        res[:, idx[hit]] = p[:, hit]
+        done[idx[hit]] = True
+        r_slow[idx] = r
+
+        shorter = r < -dt_thresh
+        fast[idx[shorter]] = slow[idx[shorter]]
+        r_fast[idx[shorter]] = r[shorter]
+
+        # The profile is only valid down to some acceleration, halving may
+        # step past it. The slowest valid profile is searched for below
+        invalid = np.isnan(r)
+        edge[idx[invalid]] = True
+
+        exhausted = (slow[idx] <= EPSILON) | (iterations[idx] >= max_iter)
+        found[idx[~hit & ~(r > dt_thresh) & ~invalid &
+                  (exhausted | ~shorter)]] = False
+        idx = idx[shorter & ~exhausted]
+
+    # Narrow down the lowest valid acceleration between fast (valid) and
+    # slow (invalid), the move can last T if its profile is long enough
+    idx = np.flatnonzero(edge)
+    if len(idx):
+        a_lo, a_hi = fast.copy(), slow.copy()
+        _, m_lo = margin(idx, a_lo[idx])
+        r_lo, r_hi = np.zeros(n), np.full(n, np.nan)
+        r_lo[idx] = m_lo
+        _refine(margin, idx, a_lo, a_hi, r_lo, r_hi, 0, dt_thresh, res,
+                iterations, max_iter)
+
+        p, r = excess_time(idx, a_lo[idx])
+        hit = np.abs(r) <= dt_thresh
+        res[:, idx[hit]] = p[:, hit]
+        done[idx[hit]] = True
+
+        longer = r > dt_thresh
+        slow[idx[longer]] = a_lo[idx[longer]]
+        r_slow[idx[longer]] = r[longer]
+        found[idx[~hit & ~longer]] = False
+
+    idx = np.flatnonzero(found & ~done)
+    converged = _refine(excess_time, idx, slow, fast, r_slow, r_fast,
+                        -dt_thresh, dt_thresh, res, iterations, max_iter)
+    found[idx[~converged]] = False
+
+    return res, _below(res, v0, v_max, j_max, found), iterations
+
+
+def _below(res, v0, v_max, j_max, found):
+    """
+    Clears found of the search results whose peak speed exceeds v_max
+    """
+    if v_max is None:
+        return found
+
+    Tj1, Ta = res[0], res[1]
+    v_lim = v0 + (Ta - Tj1)*j_max*Tj1
+    return found & (v_lim <= v_max)
+
+
+def plan_batch(q0, q1, v0, v1, v_max, a_max, j_max, T=None,
+               dt_thresh=SEARCH_DT_THRESH, max_iter=SEARCH_MAX_ITER,
+               details=None):
+    """
+    Plans many independent 1-D moves at once.
+
+    All arguments are broadcast against each other, so limits can be given
+    either per move or as scalars. If T is given every move is fitted into
+    time T (like ScurvePlanner.plan_trajectory with t=...) within
+    dt_thresh seconds, preferably by lowering its cruise speed (see
+    pyscurve.constant_time_optimizer), otherwise by searching for a lower
+    acceleration.
+
+    Returns structured array of PLAN_DTYPE with the broadcast shape. Moves
+    that could not be planned have zero durations and non-zero status:
+        STATUS_INFEASIBLE    --- move is not feasible with the given limits,
+                                 also if it starts or ends faster than v_max
+        STATUS_SEARCH_FAILED --- no appropriate a_max was found
+        STATUS_INVALID       --- non-finite input or non-positive limit
+    The iterations field holds the number of search evaluations per move.
+
+    If a dictionary is passed as details, the branch which planned every
+    move (see pyscurve.instrumentation) is stored under "branch" and the
+    seconds spent in the feasibility, profile and search stages are added
+    to the values under the stage names.
+    """
+    if details is not None:
+        for stage in ("feasibility", "profile", "search"):
+            details.setdefault(stage, 0.0)
+        t = time.perf_counter()
+
+    args = [q0, q1, v0, v1, v_max, a_max, j_max]
+    if T is not None:
+        args.append(T)
+
+    args = np.broadcast_arrays(*[np.asarray(x, dtype=np.float64)
+                                 for x in args])
+    shape = args[0].shape
+    args = [np.ravel(x) for x in args]
+    q0, q1, v0, v1, v_max, a_max, j_max = args[:7]
+
+    out = np.zeros(len(q0), dtype=PLAN_DTYPE)
+    status = out["status"]
+    params = np.zeros((5, len(q0)))
+
+    valid = np.logical_and.reduce([np.isfinite(x) for x in args])
+    valid &= (v_max > 0) & (a_max > 0) & (j_max > 0)
+    if T is not None:
+        T = args[7]
+        valid &= T > 0
+    status[~valid] = STATUS_INVALID
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        _q0, _q1, _v0, _v1, _v_max, _a_max, _j_max =\
+            sign_transforms(q0, q1, v0, v1, v_max, a_max, j_max)
+
+        if details is not None:
+            branch = np.full(len(q0), BRANCH_INFEASIBLE, dtype=object)
+
+        # Moves starting or ending faster than v_max in the direction of
+        # travel can not keep the limit
+        valid_speeds = (_v0 <= _v_max) & (_v1 <= _v_max)
+        status[valid & ~valid_speeds] = STATUS_INFEASIBLE
+
+        if T is None:
+            todo = valid & valid_speeds & check_possibility(
+                _q0, _q1, _v0, _v1, _a_max, _j_max)
+            status[valid & ~todo] = STATUS_INFEASIBLE
+
+            if details is not None:
+                t = _lap(details, "feasibility", t)
+
+            # Closed forms first, only the rest goes to the search
+            *p, ok = maximum_speed_reached(_q0, _q1, _v0, _v1,
+                                           _v_max, _a_max, _j_max)
+            ok &= todo
+            params[:, ok] = np.asarray(p)[:, ok]
+            todo &= ~ok
+            if details is not None:
+                branch[ok] = BRANCH_V_MAX_REACHED
+
+            # Without the cruise phase the peak speed is not bounded by
+            # v_max, e.g. when v0 or v1 exceeds it
+            *p, ok = maximum_speed_not_reached(_q0, _q1, _v0, _v1,
+                                               _a_max, _j_max)
+            p = np.asarray(p)
+            ok = _below(p, _v0, _v_max, _j_max, ok & todo)
+            params[:, ok] = p[:, ok]
+            todo &= ~ok
+            if details is not None:
+                branch[ok] = BRANCH_V_MAX_NOT_REACHED
+                t = _lap(details, "profile", t)
+        else:
+            # Lower the cruise speed first, the acceleration search is only
+            # used for moves without such a profile
+            *p, ok, it = fixed_time_profile(_q0, _q1, _v0, _v1, _v_max,
+                                            _a_max, _j_max, T,
+                                            dt_thresh=dt_thresh,
+                                            max_iter=max_iter)
+            ok &= valid & valid_speeds
+            params[:, ok] = np.asarray(p)[:, ok]
+            todo = valid & valid_speeds & ~ok
+            out["iterations"][ok | todo] = it[ok | todo]
+            if details is not None:
+                branch[ok] = BRANCH_FIXED_TIME
+                t = _lap(details, "profile", t)
+
+        idx = np.flatnonzero(todo)
+        if len(idx):
+            p, ok, it = search_planning(_q0[idx], _q1[idx], _v0[idx],
+                                        _v1[idx], _a_max[idx], _j_max[idx],
+                                        T=None if T is None else T[idx],
+                                        dt_thresh=dt_thresh,
+                                        max_iter=max_iter,
+                                        v_max=_v_max[idx])
+            params[:, idx[ok]] = p[:, ok]
+            out["iterations"][idx] += it
+            status[idx[~ok]] = STATUS_SEARCH_FAILED
+            if details is not None:
+                branch[idx[ok]] = (BRANCH_SEARCH if T is None else
+                                   BRANCH_FIXED_TIME_SEARCH)
+
+            if T is None:
+                # Moves which only speed up or slow down
+                idx = idx[~ok]
+                *p, ok = one_sided_profile(_q0[idx], _q1[idx], _v0[idx],
+                                           _v1[idx], _a_max[idx], _j_max[idx])
+                params[:, idx[ok]] = np.asarray(p)[:, ok]
+                status[idx[ok]] = STATUS_OK
+                if details is not None:
+                    branch[idx[ok]] = BRANCH_ONE_SIDED
+
+        if details is not None:
+            _lap(details, "search", t)
+            details["branch"] = branch.reshape(shape)
+
+    for name, p in zip(("Tj1", "Ta", "Tj2", "Td", "Tv"), params):
+        out[name] = p
+    out["T"] = params[1] + params[3] + params[4]
+
+    return out.reshape(shape)
+
+
+def _lap(details, stage, t):
+    now = time.perf_counter()
+    details[stage] += now - t
+    return now
+
+
+def phase_tables(plans, q0, q1, v0, v1, j_max):
+    """
+    Converts planned moves into piecewise cubic phase tables.
+
+    Returns breaks with shape (n, 8) and coefficients with shape (n, 7, 4)
+        as expected by Trajectory: the seven phases of every move with the
+        position, speed, half acceleration and a sixth of the jerk at the
+        start of each phase. Moves which were not planned get NaN
+        coefficients.
+    """
+    plans = np.asarray(plans)
+    q0, q1, v0, v1, j_max = [
+        np.ravel(np.broadcast_to(np.asarray(x, dtype=np.float64), plans.shape))
+        for x in (q0, q1, v0, v1, j_max)]
+    plans = np.ravel(plans)
+
+    # Moves of zero length are kept as they are
+    s = np.where(q1 == q0, 1, np.sign(q1 - q0))
+    q0, q1, v0, v1, j = s*q0, s*q1, s*v0, s*v1, np.abs(j_max)
+
+    Tj1, Ta = plans["Tj1"], plans["Ta"]
+    Tj2, Td = plans["Tj2"], plans["Td"]
+    Tv = plans["Tv"]
+    T = Ta + Td + Tv
+
+    a_lim_a = j*Tj1
+    a_lim_d = -j*Tj2
+    v_lim = v0 + (Ta - Tj1)*a_lim_a
+
+    breaks = np.stack([np.zeros_like(T), Tj1, Ta - Tj1, Ta, Ta + Tv,
+                       T - Td + Tj2, T - Tj2, T], axis=-1)
+
+    # Position, speed and acceleration at the start of every phase, taken
+    # from the closed form expressions of the book (page 79)
+    q_ta = q0 + (v_lim + v0)*Ta/2
+    q_td = q1 - (v_lim + v1)*Td/2
+    q = np.stack([q0,
+                  q0 + v0*Tj1 + j*Tj1**3/6,
+                  q_ta - v_lim*Tj1 + j*Tj1**3/6,
+                  q_ta,
+                  q_td,
+                  q_td + v_lim*Tj2 - j*Tj2**3/6,
+                  q1 - v1*Tj2 - j*Tj2**3/6], axis=-1)
+    v = np.stack([v0,
+                  v0 + j*Tj1**2/2,
+                  v_lim - j*Tj1**2/2,
+                  v_lim,
+                  v_lim,
+                  v_lim - j*Tj2**2/2,
+                  v1 + j*Tj2**2/2], axis=-1)
+    zero = np.zeros_like(T)
+    a = np.stack([zero, a_lim_a, a_lim_a, zero, zero, a_lim_d, a_lim_d],
+                 axis=-1)
+    jerk = j[:, None]*np.asarray([1, 0, -1, 0, -1, 0, 1])
+
+    coeffs = s[:, None, None]*np.stack([q, v, a/2, jerk/6], axis=-1)
+    coeffs[plans["status"] != STATUS_OK] = np.nan
+
+    return breaks, coeffs
+
+
+def _sqrt(x):
+    # NaN for negative arguments like np.sqrt, comparisons with it fail
+    return math.sqrt(x) if x >= 0 else math.nan
+
+
+def move_possible(q0, q1, v0, v1, a_max, j_max):
+    """
+    Scalar version of check_possibility for a single move with finite
+        arguments and positive limits
+    """
+    s = 1.0 if q1 > q0 else -1.0 if q1 < q0 else 0.0
+    v0, v1 = s*v0, s*v1
+
+    dv = abs(v1 - v0)
+    dq = abs(q1 - q0)
+    time_to_reach_max_a = a_max/j_max
+    time_to_set_speeds = math.sqrt(dv/j_max)
+    if time_to_reach_max_a <= time_to_set_speeds:
+        return dq > 0.5*(v0 + v1)*(time_to_reach_max_a + dv/a_max)
+
+    return dq > time_to_set_speeds*(v0 + v1)
+
+
+def plan_move(q0, q1, v0, v1, v_max, a_max, j_max):
+    """
+    Scalar version of plan_batch without T for a single move. Only the
+        closed forms are tried, with plain float arithmetic, which is much
+        cheaper than plan_batch for a few moves.
+
+    Returns Tj1, Ta, Tj2, Td, Tv or None if the move is infeasible, invalid
+        or needs the search, plan_batch handles those
+    """
+    if not (math.isfinite(q0 + q1 + v0 + v1 + v_max + a_max + j_max) and
+            v_max > 0 and a_max > 0 and j_max > 0 and q1 != q0):
+        return None
+
+    s = 1.0 if q1 > q0 else -1.0
+    q0, q1, v0, v1 = s*q0, s*q1, s*v0, s*v1
+    if (v0 > v_max or v1 > v_max or
+            not move_possible(q0, q1, v0, v1, a_max, j_max)):
+        return None
+
+    # maximum_speed_reached
+    if (v_max - v0)*j_max < a_max**2:
+        Tj1 = _sqrt((v_max - v0)/j_max)
+        Ta = 2*Tj1
+    else:
+        Tj1 = a_max/j_max
+        Ta = Tj1 + (v_max - v0)/a_max
+
+    if (v_max - v1)*j_max < a_max**2:
+        Tj2 = _sqrt((v_max - v1)/j_max)
+        Td = 2*Tj2
+    else:
+        Tj2 = a_max/j_max
+        Td = Tj2 + (v_max - v1)/a_max
+
+    Tv = (q1 - q0)/v_max - (Ta/2)*(1 + v0/v_max) - (Td/2)*(1 + v1/v_max)
+    if Tv >= 0:
+        return Tj1, Ta, Tj2, Td, Tv
+
+    # maximum_speed_not_reached
+    Tj = a_max/j_max
+    v = (a_max**2)/j_max
+    delta = ((a_max**4)/(j_max**2)) + 2*((v0**2) + (v1**2)) +\
+        a_max*(4*(q1 - q0) - 2*(a_max/j_max)*(v0 + v1))
+
+    Ta = (v - 2*v0 + _sqrt(delta))/(2*a_max)
+    Td = (v - 2*v1 + _sqrt(delta))/(2*a_max)
+    if (Ta - 2*Tj >= EPSILON and Td - 2*Tj >= EPSILON and
+            v0 + (Ta - Tj)*j_max*Tj <= v_max):
+        return Tj, Ta, Tj, Td, 0.0
+
+    return None
+
+
+def search_move(q0, q1, v0, v1, v_max, a_max, j_max,
+                dt_thresh=SEARCH_DT_THRESH, max_iter=SEARCH_MAX_ITER):
+    """
+    Scalar version of search_planning without T for a single feasible move
+        with q1 > q0 (see sign_transforms), evaluated step by step like
+        search_planning does.
+
+    Returns Tj1, Ta, Tj2, Td, Tv or None if no profile was found, and the
+        number of profile evaluations
+    """
+    iterations = 0
+
+    def margin(a):
+        nonlocal iterations
+        iterations += 1
+        Tj = a/j_max
+        v = (a**2)/j_max
+        delta = ((a**4)/(j_max**2)) + 2*((v0**2) + (v1**2)) +\
+            a*(4*(q1 - q0) - 2*(a/j_max)*(v0 + v1))
+        Ta = (v - 2*v0 + _sqrt(delta))/(2*a)
+        Td = (v - 2*v1 + _sqrt(delta))/(2*a)
+        return (Tj, Ta, Tj, Td, 0.0), min(Ta, Td) - 2*Tj - EPSILON
+
+    # Halve a_max until the profile becomes valid, or search for the
+    # window of valid accelerations once the margin falls again as in
+    # _window
+    lo, hi = float(a_max), math.inf
+    r_hi = math.nan
+    while True:
+        res, r_lo = margin(lo)
+        if r_lo >= 0:
+            break
+
+        if (-math.inf if math.isnan(r_lo) else r_lo) < r_hi:
+            a, c, r_c, b = lo, hi, r_hi, min(2*hi, a_max)
+            while True:
+                if not (iterations < max_iter and
+                        b - a > max(4*math.ulp(b), SEARCH_A_RTOL*b)):
+                    return None, iterations
+
+                if b - c > c - a:
+                    x = c + GOLDEN*(b - c)
+                else:
+                    x = c - GOLDEN*(c - a)
+                p, r = margin(x)
+                if r >= 0:
+                    res, lo, r_lo = p, x, r
+                    hi, r_hi = (c, r_c) if c > x else (b, math.nan)
+                    break
+
+                if r > r_c:
+                    a, b = (c, b) if x > c else (a, c)
+                    c, r_c = x, r
+                elif x > c:
+                    b = x
+                else:
+                    a = x
+            break
+
+        hi, r_hi = lo, r_lo
+        lo /= 2
+        if not (lo > EPSILON and iterations < max_iter):
+            return None, iterations
+
+    # Illinois regula falsi as in _refine
+    side = 0
+    while math.isfinite(hi) and r_lo > dt_thresh:
+        x = (lo + hi)/2
+        if math.isfinite(r_hi) and r_lo > r_hi:
+            x = lo + r_lo*(hi - lo)/(r_lo - r_hi)
+
+        p, r = margin(x)
+        if r >= 0:
+            res = p
+            if side == 1:
+                r_hi /= 2
+            lo, r_lo, side = x, r, 1
+        else:
+            if side == -1:
+                r_lo /= 2
+            hi, r_hi, side = x, r, -1
+
+        if (0 <= r <= dt_thresh or iterations >= max_iter or
+                abs(hi - lo) <= max(4*math.ulp(hi), SEARCH_A_RTOL*abs(hi))):
+            break
+
+    Tj1, Ta = res[0], res[1]
+    if v0 + (Ta - Tj1)*j_max*Tj1 > v_max:
+        return None, iterations
+
+    return res, iterations
+
+
+def phase_table(Tj1, Ta, Tj2, Td, Tv, q0, q1, v0, v1, j_max):
+    """
+    Scalar version of phase_tables for a single planned move
+
+    Returns list of the 8 breaks and list of the 7 coefficient rows
+    """
+    s = -1.0 if q1 < q0 else 1.0
+    q0, q1, v0, v1, j = s*q0, s*q1, s*v0, s*v1, abs(j_max)
+    T = Ta + Td + Tv
+
+    a_lim_a = j*Tj1
+    a_lim_d = -j*Tj2
+    v_lim = v0 + (Ta - Tj1)*a_lim_a
+
+    breaks = [0.0, Tj1, Ta - Tj1, Ta, Ta + Tv, T - Td + Tj2, T - Tj2, T]
+
+    q_ta = q0 + (v_lim + v0)*Ta/2
+    q_td = q1 - (v_lim + v1)*Td/2
+    q = (q0,
+         q0 + v0*Tj1 + j*Tj1**3/6,
+         q_ta - v_lim*Tj1 + j*Tj1**3/6,
+         q_ta,
+         q_td,
+         q_td + v_lim*Tj2 - j*Tj2**3/6,
+         q1 - v1*Tj2 - j*Tj2**3/6)
+    v = (v0,
+         v0 + j*Tj1**2/2,
+         v_lim - j*Tj1**2/2,
+         v_lim,
+         v_lim,
+         v_lim - j*Tj2**2/2,
+         v1 + j*Tj2**2/2)
+    a = (0.0, a_lim_a, a_lim_a, 0.0, 0.0, a_lim_d, a_lim_d)
+    jerk = (1, 0, -1, 0, -1, 0, 1)
+
+    coeffs = [[s*q[k], s*v[k], s*(a[k]/2), s*(j*jerk[k]/6)]
+              for k in range(7)]
+    return breaks, coeffs
@@ -0,0 +1,86 @@
+"""
+Benchmarks of import time, planning, evaluation, plotting and editor
+redraw latency.
+
+Run with python -m pyscurve.bench, results are printed (or written) as JSON
+so they can be compared between versions.
+"""
+import platform
+import statistics
+import time
+import timeit
+import numpy as np
+
+
+BENCH_VERSION = 1
+
+
+def measure(func, repeat=5, number=None):
+    """
+    Times func like timeit, returns best and median seconds per call
+    """
+    timer = timeit.Timer(func)
+    if number is None:
+        number = timer.autorange()[0]
+
+    per_call = [t/number for t in timer.repeat(repeat, number)]
+    return {"best_s": min(per_call),
+            "median_s": statistics.median(per_call),
+            "number": number,
+            "repeat": repeat}
+
+
+def latencies(samples):
+    """
+    Summary of a list of latencies in seconds
+    """
+    samples = np.asarray(samples)
+    return {"mean_s": float(samples.mean()),
+            "median_s": float(np.median(samples)),
+            "p95_s": float(np.percentile(samples, 95)),
+            "max_s": float(samples.max()),
+            "samples": len(samples)}
+
+
+def metadata():
+    return {"version": BENCH_VERSION,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z")}
+
+
+def run(groups=None, quick=False):
+    """
+    Runs the benchmark groups ("import", "plan", "eval", "plot", "editor"),
+    returns
+    dictionary with metadata and results keyed by benchmark name
+    """
+    from . import imports, planning, evaluation, plotting, editor
+
+    suites = {"import": imports.run,
+              "plan": planning.run,
+              "eval": evaluation.run,
+              "plot": plotting.run,
+              "editor": editor.run}
+    if groups is None:
+        groups = list(suites)
+
+    results = {}
+    for group in groups:
+        if group not in suites:
+            raise ValueError("Unknown benchmark group %s" % group)
+
+        for name, result in suites[group](quick).items():
+            results[group + "." + name] = result
+
+    return {"meta": metadata(), "results": results}
+
+
+def failed(report):
+    """
+    Names of the results which report a failed check (ok is False)
+    """
+    return sorted(name for name, result in report["results"].items()
+                  if result.get("ok") is False)
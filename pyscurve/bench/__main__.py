@@ -0,0 +1,43 @@
+import argparse
+import json
+import os
+import sys
+
+# Headless defaults, set before Qt or matplotlib are imported
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+from . import run, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m pyscurve.bench",
+        description="Benchmarks pyscurve and prints the results as JSON")
+    parser.add_argument("groups", nargs="*",
+                        help="import, plan, eval, plot and/or editor "
+                             "(default: all)")
+    parser.add_argument("-o", "--output", help="write JSON into this file")
+    parser.add_argument("--quick", action="store_true",
+                        help="fewer repeats and smaller inputs")
+    parser.add_argument("--check", action="store_true",
+                        help="exit with status 1 if a check such as the "
+                             "import time budget fails")
+    args = parser.parse_args(argv)
+
+    report = run(args.groups or None, quick=args.quick)
+    text = json.dumps(report, indent=2, sort_keys=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.check and failed(report):
+        sys.stderr.write("Failed: %s\n" % ", ".join(failed(report)))
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
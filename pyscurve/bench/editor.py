@@ -0,0 +1,62 @@
+import importlib.util
+import os
+import time
+from . import latencies
+
+
+EDITOR_FNAME = "motionProfileEditor.py"
+
+
+def load_editor(path=None):
+    """
+    Imports the editor script which lives next to the package
+    """
+    if path is None:
+        root = os.path.dirname(os.path.dirname(os.path.dirname(
+            os.path.abspath(__file__))))
+        path = os.path.join(root, EDITOR_FNAME)
+
+    if not os.path.exists(path):
+        raise ImportError("%s not found" % path)
+
+    spec = importlib.util.spec_from_file_location("motionProfileEditor", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run(quick=False, path=None):
+    """
+    Latency of a synchronous editor update (plan, sample, redraw) on Qt's
+    offscreen platform while dragging the velocity limit
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PyQt6.QtWidgets import QApplication
+        app = QApplication.instance() or QApplication([])
+        editor = load_editor(path)
+    except ImportError as e:
+        return {"update": {"skipped": str(e)}}
+
+    steps = 20 if quick else 100
+    results = {}
+    for blit in (True, False):
+        window = editor.TrajectoryPlanner(threaded=False, blit=blit)
+        window.resize(1400, 800)
+        window.show()
+        app.processEvents()
+
+        box = window.inputs[0]
+        start = box.value()
+        samples = []
+        for i in range(1, steps + 1):
+            t = time.perf_counter()
+            box.setValue(start - 10*i)
+            app.processEvents()
+            samples.append(time.perf_counter() - t)
+
+        window.close()
+        app.processEvents()
+        results["update." + ("blit" if blit else "full")] = latencies(samples)
+
+    return results
@@ -0,0 +1,35 @@
+import numpy as np
+from ..scurve import ScurvePlanner
+from . import measure
+
+
+def run(quick=False):
+    repeat = 3 if quick else 5
+    samples = 10000 if quick else 100000
+    results = {}
+
+    tr = ScurvePlanner().plan_trajectory([0, 0, 0], [10, 5, -3], [0, 0, 0],
+                                         [0, 0, 0], 1, 2, 10)
+    T = tr.time[0]
+    t = np.linspace(0, T, samples)
+
+    results["call.scalar"] = measure(lambda: tr(T/3), repeat)
+
+    for jerk in (False, True):
+        result = measure(lambda: tr(t, jerk=jerk), repeat)
+        result["samples"] = samples
+        result["per_sample_s"] = result["best_s"]/samples
+        results["call.array" + (".jerk" if jerk else "")] = result
+
+    dt = T/(samples - 1)
+    for chunk in (64, 4096):
+        def stream():
+            for _ in tr.stream(dt, chunk=chunk):
+                pass
+
+        result = measure(stream, repeat)
+        result["samples"] = samples
+        result["per_sample_s"] = result["best_s"]/samples
+        results["stream.chunk%d" % chunk] = result
+
+    return results
@@ -0,0 +1,46 @@
+import json
+import subprocess
+import sys
+
+
+# Wall time budget of a cold 'import pyscurve' and the only third party
+# package it may load
+IMPORT_BUDGET_S = 0.5
+ALLOWED_PACKAGES = ("numpy", "pyscurve")
+
+PROBE = """
+import json, logging, sys, time
+before = set(sys.modules)
+t = time.perf_counter()
+import pyscurve
+t = time.perf_counter() - t
+stdlib = getattr(sys, "stdlib_module_names", ())
+loaded = sorted({m.split(".")[0] for m in set(sys.modules) - before} -
+                set(stdlib) - set(sys.builtin_module_names))
+print(json.dumps({"time_s": t, "packages": loaded,
+                  "root_handlers": len(logging.getLogger().handlers),
+                  "root_level": logging.getLogger().level}))
+"""
+
+
+def run(quick=False):
+    """
+    Imports pyscurve in fresh interpreters and checks it stays within
+    IMPORT_BUDGET_S, loads nothing but NumPy and leaves logging alone
+    """
+    runs = []
+    for _ in range(3 if quick else 7):
+        out = subprocess.run([sys.executable, "-c", PROBE], check=True,
+                             capture_output=True, text=True).stdout
+        runs.append(json.loads(out))
+
+    result = min(runs, key=lambda r: r["time_s"])
+    extra = [p for p in result["packages"]
+             if not p.startswith("_") and p not in ALLOWED_PACKAGES]
+
+    result["budget_s"] = IMPORT_BUDGET_S
+    result["unexpected_packages"] = extra
+    result["ok"] = (result["time_s"] <= IMPORT_BUDGET_S and not extra and
+                    result["root_handlers"] == 0)
+
+    return {"pyscurve": result}
@@ -0,0 +1,63 @@
+import time
+import numpy as np
+from ..scurve import ScurvePlanner
+from ..batch import plan_batch
+from ..replan import replan
+from . import measure, latencies
+
+
+# One move per planning regime: q0, q1, v0, v1, v_max, a_max, j_max, T
+REGIMES = {
+    "v_max_reached": (0, 10, 0, 0, 1, 2, 10, None),
+    "a_max_not_reached": (0, 10, 0, 0, 1, 10, 10, None),
+    "search_fallback": (0, 1, 0, 0, 10, 10, 10, None),
+    "fixed_time": (0, 10, 0, 0, 1, 2, 10, 15.0),
+}
+
+
+def run(quick=False):
+    repeat = 3 if quick else 5
+    n = 1000 if quick else 10000
+    results = {}
+
+    for regime, (q0, q1, v0, v1, v_max, a_max, j_max, T) in REGIMES.items():
+        p = ScurvePlanner()
+
+        def plan():
+            p.plan_trajectory([q0], [q1], [v0], [v1], v_max, a_max, j_max,
+                              t=T)
+
+        plan()
+        result = measure(plan, repeat)
+        result["search_iterations"] = p.search_iterations
+        results["plan_trajectory." + regime] = result
+
+        # The same move n times in one batch
+        moves = [np.full(n, x, dtype=np.float64)
+                 for x in (q0, q1, v0, v1, v_max, a_max, j_max)]
+        T = None if T is None else np.full(n, T)
+
+        result = measure(lambda: plan_batch(*moves, T=T), repeat, number=1)
+        result["moves"] = n
+        result["per_move_s"] = result["best_s"]/n
+        results["plan_batch." + regime] = result
+
+    # Three DOF move, the usual editor/robot case
+    p = ScurvePlanner()
+    results["plan_trajectory.3dof"] = measure(
+        lambda: p.plan_trajectory([0, 0, 0], [10, 5, -3], [0, 0, 0],
+                                  [0, 0, 0], 1, 2, 10), repeat)
+
+    # Replanning from mid-motion states, the latency distribution over
+    # random states shows the worst case of a control cycle
+    rng = np.random.default_rng(0)
+    scale = np.array([5, 1, 2, 5])[:, None]
+    samples = []
+    for _ in range(100 if quick else 1000):
+        q, v, a, q1 = rng.uniform(-1, 1, (4, 3))*scale
+        start = time.perf_counter()
+        replan(q, v, a, q1, 0, 1, 2, 10)
+        samples.append(time.perf_counter() - start)
+    results["replan.3dof"] = latencies(samples)
+
+    return results
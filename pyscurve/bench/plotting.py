@@ -0,0 +1,35 @@
+import io
+from ..scurve import ScurvePlanner
+from . import measure
+
+
+def run(quick=False):
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError as e:
+        return {"plot_trajectory": {"skipped": str(e)}}
+
+    from ..plotting import plot_trajectory
+    from ..report import ProfileFigure
+
+    tr = ScurvePlanner().plan_trajectory([0, 0, 0], [10, 5, -3], [0, 0, 0],
+                                         [0, 0, 0], 1, 2, 10)
+
+    def plot():
+        plot_trajectory(tr, dt=tr.time[0]/1000)
+        plt.gcf().canvas.draw()
+        plt.close("all")
+
+    # Template built once, every call swaps the line data and rasterizes
+    figure = ProfileFigure(dof=tr.dof)
+    buf = io.BytesIO()
+
+    def render():
+        buf.seek(0)
+        figure.render(tr, buf, fmt="png")
+
+    return {"plot_trajectory": measure(plot, 3 if quick else 5, number=1),
+            "report_render_png": measure(render, 3 if quick else 5,
+                                         number=1)}
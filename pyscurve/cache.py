@@ -0,0 +1,112 @@
+import math
+from collections import OrderedDict, namedtuple
+
+
+CacheInfo = namedtuple("CacheInfo",
+                       ["hits", "misses", "evictions", "maxsize", "currsize"])
+
+# Order of the quantized parameters in a cache key
+KEY_PARAMS = ("q0", "q1", "v0", "v1", "v_max", "a_max", "j_max", "T")
+
+
+class PlanCache(object):
+    """
+    Bounded LRU cache of 1-D planning results.
+
+    Keys are move parameters rounded to multiples of quantum, which is
+    either a scalar shared by all parameters or a sequence with one value
+    per parameter in KEY_PARAMS order. Moves which differ by less than the
+    quantum share the result planned for the first of them.
+    """
+
+    def __init__(self, maxsize=1024, quantum=1e-9):
+        if maxsize <= 0:
+            raise ValueError("Cache size must be positive")
+
+        if isinstance(quantum, (int, float)):
+            quantum = (quantum,)*len(KEY_PARAMS)
+
+        if len(quantum) != len(KEY_PARAMS):
+            raise ValueError("Quantum must be a scalar or have %d values" %
+                             len(KEY_PARAMS))
+
+        self._maxsize = maxsize
+        self._quantum = tuple(float(q) for q in quantum)
+        self._data = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def maxsize(self):
+        return self._maxsize
+
+    @property
+    def quantum(self):
+        return self._quantum
+
+    def key(self, q0, q1, v0, v1, v_max, a_max, j_max, T=None):
+        """
+        Returns cache key for the given move or None if it can not be cached
+        """
+        params = (q0, q1, v0, v1, v_max, a_max, j_max,
+                  0.0 if T is None else T)
+        key = []
+        for p, q in zip(params, self._quantum):
+            p = float(p)
+            if not math.isfinite(p):
+                return None
+            key.append(round(p/q))
+
+        key.append(T is None)
+        return tuple(key)
+
+    def get(self, key):
+        """
+        Returns cached result for key or None, counting hits and misses
+        """
+        if key is None:
+            self._misses += 1
+            return None
+
+        res = self._data.get(key)
+        if res is None:
+            self._misses += 1
+        else:
+            self._hits += 1
+            self._data.move_to_end(key)
+
+        return res
+
+    def put(self, key, res):
+        """
+        Stores result under key, evicting the least recently used entries
+        """
+        if key is None:
+            return
+
+        self._data[key] = res
+        self._data.move_to_end(key)
+
+        while len(self._data) > self._maxsize:
+            self._data.popitem(last=False)
+            self._evictions += 1
+
+    def invalidate(self, key):
+        """
+        Drops a single entry, returns True if it was cached
+        """
+        return self._data.pop(key, None) is not None
+
+    def clear(self):
+        """
+        Drops all entries. Counters are kept
+        """
+        self._data.clear()
+
+    def info(self):
+        return CacheInfo(self._hits, self._misses, self._evictions,
+                         self._maxsize, len(self._data))
+
+    def __len__(self):
+        return len(self._data)
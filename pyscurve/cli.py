@@ -0,0 +1,275 @@
+"""
+Headless batch planning of move files, run with python -m pyscurve.
+
+Moves are read as CSV (with a header row) or JSON lines with the fields
+q0, q1 and optionally v0, v1, v_max, a_max, j_max and t. Missing speeds are
+zero, missing limits are taken from the command line and rows with t are
+planned to last t. Every move gives one output row with its row number,
+phase durations, total time and status (see pyscurve.batch).
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import numpy as np
+from .scurve import ScurvePlanner
+from .batch import STATUS_OK, PLAN_DTYPE
+
+
+MOVE_FIELDS = ("q0", "q1", "v0", "v1", "v_max", "a_max", "j_max", "t")
+OUTPUT_FIELDS = ("row", "Tj1", "Ta", "Tj2", "Td", "Tv", "T", "status")
+FORMATS = ("csv", "jsonl")
+
+# Planner of a worker process
+_worker = {}
+
+
+def _init_worker(planner_kwargs):
+    _worker["planner"] = ScurvePlanner(**planner_kwargs)
+
+
+def _float(x):
+    try:
+        return float(x)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _column(values, default):
+    """
+    Converts a list of strings into floats, empty strings take the value
+    default
+    """
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except ValueError:
+        return np.asarray([_float(x) if x.strip() else default
+                           for x in values], dtype=np.float64)
+
+
+def _json_move(line, defaults):
+    """
+    MOVE_FIELDS of a JSON line, lines which are not a JSON object give a
+    move of NaN
+    """
+    try:
+        move = json.loads(line)
+    except ValueError:
+        move = None
+    if not isinstance(move, dict):
+        return [np.nan]*len(MOVE_FIELDS)
+
+    return [_float(move[name]) if move.get(name) is not None else defaults[i]
+            for i, name in enumerate(MOVE_FIELDS)]
+
+
+def read_moves(f, fmt, defaults, chunk):
+    """
+    Yields (chunk, 8) arrays of the MOVE_FIELDS of at most chunk moves read
+    from the text stream f. Fields missing in a row take the values of
+    defaults, unparsable values become NaN and give STATUS_INVALID
+    """
+    if fmt == "csv":
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+
+        header = [name.strip() for name in header]
+        columns = [header.index(name) if name in header else None
+                   for name in MOVE_FIELDS]
+
+        def parse(rows):
+            moves = np.empty((len(rows), len(MOVE_FIELDS)))
+            for i, c in enumerate(columns):
+                if c is None:
+                    moves[:, i] = defaults[i]
+                else:
+                    moves[:, i] = _column([row[c] if c < len(row) else ""
+                                           for row in rows], defaults[i])
+            return moves
+        rows = reader
+    else:
+        def parse(lines):
+            return np.asarray([_json_move(line, defaults) for line in lines],
+                              dtype=np.float64)
+        rows = (line for line in f if line.strip())
+
+    while True:
+        chunk_rows = list(islice(rows, chunk))
+        if not chunk_rows:
+            return
+        yield parse(chunk_rows)
+
+
+def plan_moves(moves, planner=None):
+    """
+    Plans a (n, 8) array of moves, rows with a finite t are planned to
+    last t. Returns structured array of PLAN_DTYPE
+    """
+    if planner is None:
+        planner = _worker["planner"]
+
+    *args, t = moves.T
+    fixed = np.isfinite(t)
+
+    plans = np.zeros(len(moves), dtype=PLAN_DTYPE)
+    plans[~fixed] = planner.plan_batch(*[x[~fixed] for x in args])
+    if fixed.any():
+        plans[fixed] = planner.plan_batch(*[x[fixed] for x in args],
+                                          t=t[fixed])
+
+    return plans
+
+
+def format_plans(plans, start, fmt):
+    """
+    Returns OUTPUT_FIELDS of plans numbered from start as text
+    """
+    fields = [np.arange(start, start + len(plans))] +\
+        [plans[name] for name in OUTPUT_FIELDS[1:]]
+
+    if fmt == "csv":
+        columns = [map(str, x.tolist()) for x in fields]
+        return "".join(",".join(row) + "\n" for row in zip(*columns))
+
+    return "".join(json.dumps(dict(zip(OUTPUT_FIELDS, row))) + "\n"
+                   for row in zip(*[x.tolist() for x in fields]))
+
+
+def plan_chunk(moves, start, fmt, planner=None):
+    """
+    Plans moves numbered from start, returns the output text and the
+    number of failed moves. Formatting is done here so it runs in the
+    worker processes as well
+    """
+    plans = plan_moves(moves, planner)
+    failed = int(np.count_nonzero(plans["status"] != STATUS_OK))
+    return format_plans(plans, start, fmt), len(plans), failed
+
+
+def run(fin, fout, fmt, out_fmt, defaults, chunk=65536, workers=0,
+        planner_kwargs=None):
+    """
+    Plans every move of fin and writes the results into fout in input
+    order, at most 2*workers + 1 chunks are held in memory.
+
+    Returns number of rows, number of failed rows and seconds taken
+    """
+    planner_kwargs = planner_kwargs or {}
+    start = time.perf_counter()
+    rows = failed = 0
+
+    def write(result):
+        nonlocal rows, failed
+        fout.write(result[0])
+        rows += result[1]
+        failed += result[2]
+
+    chunks = read_moves(fin, fmt, defaults, chunk)
+    if not workers:
+        planner = ScurvePlanner(**planner_kwargs)
+        for moves in chunks:
+            write(plan_chunk(moves, rows, out_fmt, planner))
+    else:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_worker,
+                                 initargs=(planner_kwargs,)) as pool:
+            # Results are written in order, a couple of chunks per worker
+            # are in flight
+            pending = deque()
+            submitted = 0
+            for moves in chunks:
+                pending.append(pool.submit(plan_chunk, moves, submitted,
+                                           out_fmt))
+                submitted += len(moves)
+                if len(pending) > 2*workers:
+                    write(pending.popleft().result())
+
+            while pending:
+                write(pending.popleft().result())
+
+    return rows, failed, time.perf_counter() - start
+
+
+def _format(fname, default):
+    """
+    Format given by the extension of fname or default
+    """
+    if fname.endswith((".jsonl", ".json")):
+        return "jsonl"
+    if fname.endswith(".csv"):
+        return "csv"
+    return default
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m pyscurve",
+        description="Plans s-curve moves read from CSV or JSON lines")
+    parser.add_argument("input", nargs="?", default="-",
+                        help="move file (default: standard input)")
+    parser.add_argument("-o", "--output", default="-",
+                        help="result file (default: standard output)")
+    parser.add_argument("-f", "--format", choices=FORMATS,
+                        help="input format (default: from the file name, "
+                             "csv otherwise)")
+    parser.add_argument("--output-format", choices=FORMATS,
+                        help="output format (default: input format)")
+    parser.add_argument("--v-max", type=float, default=np.nan,
+                        help="speed limit of moves without v_max")
+    parser.add_argument("--a-max", type=float, default=np.nan,
+                        help="acceleration limit of moves without a_max")
+    parser.add_argument("--j-max", type=float, default=np.nan,
+                        help="jerk limit of moves without j_max")
+    parser.add_argument("--chunk", type=int, default=65536,
+                        help="moves planned per batch (default: 65536)")
+    parser.add_argument("-j", "--workers", type=int, default=0,
+                        help="worker processes, 0 plans in this process "
+                             "(default: 0)")
+    parser.add_argument("--dt-thresh", type=float,
+                        help="search time tolerance in seconds")
+    parser.add_argument("--max-iter", type=int,
+                        help="search evaluations per move")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="do not report throughput")
+    args = parser.parse_args(argv)
+
+    if args.chunk < 1 or args.workers < 0:
+        parser.error("chunk must be positive and workers not negative")
+
+    fmt = args.format or _format(args.input, "csv")
+    out_fmt = args.output_format or _format(args.output, fmt)
+    defaults = [np.nan, np.nan, 0.0, 0.0, args.v_max, args.a_max,
+                args.j_max, np.nan]
+
+    planner_kwargs = {}
+    if args.dt_thresh is not None:
+        planner_kwargs["dt_thresh"] = args.dt_thresh
+    if args.max_iter is not None:
+        planner_kwargs["max_iter"] = args.max_iter
+
+    fin = sys.stdin if args.input == "-" else open(args.input, newline="")
+    fout = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        if out_fmt == "csv":
+            fout.write(",".join(OUTPUT_FIELDS) + "\n")
+
+        rows, failed, seconds = run(fin, fout, fmt, out_fmt, defaults,
+                                    args.chunk, args.workers,
+                                    planner_kwargs)
+    finally:
+        if fin is not sys.stdin:
+            fin.close()
+        if fout is not sys.stdout:
+            fout.close()
+
+    if not args.quiet:
+        sys.stderr.write("Planned %d moves (%d failed) in %.3f s, %.0f "
+                         "moves/s\n" % (rows, failed, seconds,
+                                        rows/seconds if seconds else 0))
+    return 0
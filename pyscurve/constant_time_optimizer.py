@@ -1,54 +1,190 @@
-from scipy.optimize import minimize
+import numpy as np
+from .trajectory import PLAN_DTYPE, STATUS_OK, STATUS_SEARCH_FAILED
+
+
+# Newton steps per move and time tolerance (s) of the cruise speed solve
+CRUISE_MAX_ITER = 50
+CRUISE_DT_THRESH = 1e-9
+
+
+def speed_change(dv, a_max, j_max):
+    """
+    Jerk phase duration Tj and total duration of a jerk limited speed change
+        by dv >= 0 which starts and ends with zero acceleration. Works
+        elementwise on arrays, j_max may be infinite (trapezoidal profile).
+
+    returns Tj, duration
+    """
+    reached = dv*j_max >= a_max**2
+    Tj = np.where(reached, a_max/j_max, np.sqrt(dv/j_max))
+    return Tj, np.where(reached, Tj + dv/a_max, 2*Tj)
+
+
+def cruise_distance(vc, v0, v1, a_max, j_max, T):
+    """
+    Distance covered within time T when changing speed from v0 to vc,
+        cruising at vc and changing speed from vc to v1, and its derivative
+        with respect to vc. Only meaningful for vc >= max(v0, v1).
+
+    The distance grows with vc and is concave, the derivative equals the
+        cruise time plus terms of the jerk phases.
+    """
+    d0 = np.maximum(vc - v0, 0)
+    d1 = np.maximum(vc - v1, 0)
+    Tj1, Ta = speed_change(d0, a_max, j_max)
+    Tj2, Td = speed_change(d1, a_max, j_max)
+
+    # Distance lost against cruising at vc all the time
+    distance = vc*T - d0*Ta/2 - d1*Td/2
+    slope = T - np.where(Ta > 2*Tj1, Ta - Tj1/2, 0.75*Ta) -\
+        np.where(Td > 2*Tj2, Td - Tj2/2, 0.75*Td)
+
+    return distance, slope
+
+
+def cruise_speed(S, v0, v1, a_max, j_max, T, guess=None,
+                 dt_thresh=CRUISE_DT_THRESH, max_iter=CRUISE_MAX_ITER):
+    """
+    Cruise speed vc >= max(v0, v1) of the profile which covers S >= 0 in
+        time T. Works elementwise on arrays.
+
+    If both speed changes reach a_max the distance is quadratic in vc and
+        the root is taken directly, otherwise Newton steps start from that
+        root or from guess (e.g. the cruise speeds of a previous solve).
+        The distance is concave in vc, so the steps approach the root
+        monotonically after the first one.
+
+    returns vc, mask of moves which converged and the number of distance
+        evaluations per move
+    """
+    S, v0, v1, a_max, j_max, T = np.broadcast_arrays(
+        *[np.asarray(x, dtype=np.float64)
+          for x in (S, v0, v1, a_max, j_max, T)])
+    lo = np.maximum(v0, v1)
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        if guess is None:
+            # Root of vc**2 - b*vc + c with Tj = a_max/j_max on both sides
+            Tj = a_max/j_max
+            b = a_max*(T - Tj) + v0 + v1
+            c = a_max*S + (v0**2 + v1**2)/2 - a_max*Tj*(v0 + v1)/2
+            vc = (b - np.sqrt(b**2 - 4*c))/2
+            vc = np.where(np.isfinite(vc), vc, lo + S/T)
+        else:
+            vc = np.broadcast_to(np.asarray(guess, dtype=np.float64),
+                                 S.shape)
+        vc = np.maximum(vc, lo)
+
+        iterations = np.zeros(S.shape, dtype=np.int32)
+        converged = np.zeros(S.shape, dtype=bool)
+        idx = np.flatnonzero(np.isfinite(vc))
+        vc = vc.ravel().copy()
+        args = [x.ravel() for x in (v0, v1, a_max, j_max, T, S, lo)]
+        v0, v1, a_max, j_max, T, S, lo = args
+        it = iterations.ravel()
+        ok = converged.ravel()
+
+        while len(idx):
+            distance, slope = cruise_distance(vc[idx], v0[idx], v1[idx],
+                                              a_max[idx], j_max[idx], T[idx])
+            it[idx] += 1
+            r = distance - S[idx]
+
+            # Time the move arrives early (r > 0) or late at S
+            hit = np.abs(r) <= dt_thresh*np.maximum(vc[idx], dt_thresh)
+            ok[idx[hit]] = True
+
+            step = np.maximum(vc[idx] - r/slope, lo[idx])
+
+            # Below the lowest cruise speed the move covers S too early
+            stuck = (vc[idx] == lo[idx]) & (r > 0)
+            vc[idx] = np.where(np.isfinite(step), step, vc[idx])
+
+            idx = idx[~hit & ~stuck & (slope > 0) & (it[idx] < max_iter)]
+
+    return vc.reshape(S.shape), converged, iterations
+
+
+def fixed_time_profile(q0, q1, v0, v1, v_max, a_max, j_max, T, guess=None,
+                       dt_thresh=CRUISE_DT_THRESH, max_iter=CRUISE_MAX_ITER):
+    """
+    Array version of fixed time planning by lowering the cruise speed.
+        Expects sign transformed moves (q1 >= q0), keeps all limits.
+
+    The profile accelerates to vc, cruises and decelerates to v1 such that
+        the move lasts T. Moves which need a cruise speed above v_max or a
+        negative cruise time are not valid.
+
+    Returns Tj1, Ta, Tj2, Td, Tv, a mask of moves the profile is valid for
+        and the number of distance evaluations per move
+    """
+    vc, ok, iterations = cruise_speed(q1 - q0, v0, v1, a_max, j_max, T,
+                                      guess, dt_thresh, max_iter)
+
+    Tj1, Ta = speed_change(vc - v0, a_max, j_max)
+    Tj2, Td = speed_change(vc - v1, a_max, j_max)
+    Tv = T - Ta - Td
+
+    valid = ok & (vc <= v_max) & (Tv >= -dt_thresh)
+
+    return Tj1, Ta, Tj2, Td, np.maximum(Tv, 0), valid, iterations
 
 
-def optimization_function(S, v0, a_max, T):
-    def cost_func(x):
-        ta = x[0]
-        a = x[1]
-
-        return ((S - a*(ta**2) - 2*v0*ta - (v0+a*ta)*(T-2*ta))**2)
-
-    def cost_func_grad(x):
-        ta = x[0]
-        a = x[1]
-
-        # According to MATLAB (cost_gradient.m)
-        da = 2*((ta**2)*(T - 2*ta) + (ta**2)) * (2*ta*v0 - S +
-                                                 (a*(ta**2) + v0) *
-                                                 (T - 2*ta) + a*(ta**2))
-
-        dta = 2*(2*a*ta - 2*a*(ta**2) +
-                 2*a*ta*(T - 2*ta))*(2*ta*v0 - S + (a*(ta**2) + v0) *
-                                     (T - 2*ta) + a*(ta**2))
-
-        return [dta, da]
+def optimize_trajectory(S, v0, a_max, T):
+    """
+    Velocity trapezoid which covers S in time T: accelerate with a_max for
+        ta, cruise at v0 + a_max*ta and decelerate back to v0 for ta.
+        Solves S - v0*T = a_max*ta*(T - ta) for ta.
 
-    return cost_func, cost_func_grad
+    returns ta and a, NaN where no such trapezoid exists
+    """
+    S, v0, a_max, T = [np.asarray(x, dtype=np.float64)
+                       for x in (S, v0, a_max, T)]
 
+    with np.errstate(invalid='ignore'):
+        ta = (T - np.sqrt(T**2 - 4*(S - v0*T)/a_max))/2
 
-def optimize_trajectory(S, v0, a_max, T):
-    cost_func, cost_func_grad = optimization_function(S, v0, a_max, T)
+    ta = np.where((ta >= 0) & (ta <= T/2), ta, np.nan)
+    return ta, np.where(np.isnan(ta), np.nan, a_max)
 
-    # Initial guess
-    x0 = [T/4, a_max/2]
 
-    # Lower/upper bounds for ta and a
-    bounds = [(0, T/2), (0, a_max)]
+def plan_trajectory(S, v0, a_max, T, v1=None, j_max=np.inf, v_max=np.inf,
+                    guess=None):
+    """
+    Plans moves of length S which start with speed v0, end with speed v1
+        (v0 by default) and last exactly T. All arguments may be arrays
+        which are solved at once.
 
-    # Minimizing
-    results = minimize(cost_func, x0, bounds=bounds, method='SLSQP',
-                       jac=cost_func_grad)
+    guess may be the result of a previous call with the same shape, its
+        cruise speeds are used as starting point.
 
-    return results.x
+    returns structured array of PLAN_DTYPE, moves without a solution have
+        STATUS_SEARCH_FAILED
+    """
+    if v1 is None:
+        v1 = v0
 
+    S, v0, v1, v_max, a_max, j_max, T = np.broadcast_arrays(
+        *[np.asarray(x, dtype=np.float64)
+          for x in (S, v0, v1, v_max, a_max, j_max, T)])
+    s = np.where(S < 0, -1, 1)
 
-def plan_trajectory(S, v0, a_max, T):
-    result.x = optimize_trajectory(S, v0, a_max, T)
+    if guess is not None:
+        # Cruise speed reached after the acceleration period of the guess
+        a = np.where(guess["Tj1"] > 0, j_max*guess["Tj1"], a_max)
+        guess = s*v0 + (guess["Ta"] - guess["Tj1"])*a
 
-    ta = x[0]
-    a = x[1]
+    *params, ok, iterations = fixed_time_profile(
+        np.zeros_like(S), s*S, s*v0, s*v1, v_max, a_max, j_max, T, guess)
 
+    plans = np.zeros(S.shape, dtype=PLAN_DTYPE)
+    for name, p in zip(("Tj1", "Ta", "Tj2", "Td", "Tv"), params):
+        plans[name] = np.where(ok, p, 0)
+    plans["T"] = plans["Ta"] + plans["Td"] + plans["Tv"]
+    plans["status"] = np.where(ok, STATUS_OK, STATUS_SEARCH_FAILED)
+    plans["iterations"] = iterations
 
+    return plans
 
 
 if __name__ == "__main__":
@@ -58,3 +194,4 @@ if __name__ == "__main__":
     T = 10
 
     print(optimize_trajectory(S, v0, a_max, T))
+    print(plan_trajectory(S, v0, a_max, T + 1, j_max=5))
@@ -0,0 +1,107 @@
+from collections import namedtuple
+import numpy as np
+
+
+# Setpoint file: a HEADER_SIZE byte header followed by length rows of dof
+# rows of columns values, laid out like the result of Trajectory.__call__:
+# acceleration, speed, position (and jerk) at ACCELERATION_ID, SPEED_ID,
+# POSITION_ID (and JERK_ID). All values are little endian.
+SETPOINT_MAGIC = b"PYSCSETP"
+SETPOINT_VERSION = 1
+HEADER_SIZE = 64
+
+HEADER_DTYPE = np.dtype([("magic", "S8"),
+                         ("version", "<u4"),
+                         ("dof", "<u4"),
+                         ("columns", "<u4"),
+                         ("dtype", "S4"),
+                         ("length", "<u8"),
+                         ("dt", "<f8"),
+                         ("t0", "<f8"),
+                         ("reserved", "V16")])
+
+# Supported sample types
+SETPOINT_DTYPES = ("<f4", "<f8")
+
+# Setpoints of a file: (length, dof, columns) array (a read only memmap of
+# the file), time step and time of the first row
+SetpointTable = namedtuple("SetpointTable", ["data", "dt", "t0"])
+
+
+def export_setpoints(traj, fname, dt, dtype=np.float64, jerk=False,
+                     chunk=4096, t0=0.0, t_end=None):
+    """
+    Writes the setpoints of traj sampled every dt seconds from t0 up to
+    t_end (by default the end of the longest DOF) into a setpoint file.
+
+    Rows are produced by Trajectory.stream and written chunk rows at a
+    time, so memory does not depend on the length of the program. dtype
+    is float64 or float32. Returns the header as written.
+    """
+    dtype = np.dtype(dtype).newbyteorder("<")
+    if dtype.str not in SETPOINT_DTYPES:
+        raise ValueError("Setpoints must be float32 or float64")
+
+    header = np.zeros((), dtype=HEADER_DTYPE)
+    header["magic"] = SETPOINT_MAGIC
+    header["version"] = SETPOINT_VERSION
+    header["dof"] = traj.dof
+    header["columns"] = 4 if jerk else 3
+    header["dtype"] = dtype.str.encode()
+    header["dt"] = dt
+    header["t0"] = t0
+
+    length = 0
+    with open(fname, "wb") as f:
+        # The length is only known once the rows are written
+        f.write(header.tobytes())
+        for rows in traj.stream(dt, chunk=chunk, t0=t0, t_end=t_end,
+                                jerk=jerk):
+            f.write(rows.astype(dtype, copy=False).tobytes())
+            length += len(rows)
+
+        header["length"] = length
+        f.seek(0)
+        f.write(header.tobytes())
+
+    return header
+
+
+def read_header(fname):
+    """
+    Reads and checks the header of a setpoint file
+    """
+    header = np.fromfile(fname, dtype=HEADER_DTYPE, count=1)
+    if len(header) != 1 or header["magic"][0] != SETPOINT_MAGIC:
+        raise ValueError("%s is not a setpoint file" % fname)
+
+    header = header[0]
+    if header["version"] != SETPOINT_VERSION:
+        raise ValueError("Unsupported setpoint file version %d" %
+                         header["version"])
+
+    if header["dtype"].decode() not in SETPOINT_DTYPES:
+        raise ValueError("Unsupported setpoint type %s" %
+                         header["dtype"].decode())
+
+    return header
+
+
+def load_setpoints(fname, mode="r"):
+    """
+    Maps a setpoint file into memory without reading or copying it.
+
+    Returns SetpointTable whose data is a numpy.memmap with shape
+    (length, dof, columns), use mode="r+" to modify the file in place.
+    """
+    header = read_header(fname)
+    shape = (int(header["length"]), int(header["dof"]),
+             int(header["columns"]))
+
+    if not shape[0]:
+        data = np.zeros(shape, dtype=header["dtype"].decode())
+    else:
+        data = np.memmap(fname, dtype=header["dtype"].decode(), mode=mode,
+                         offset=HEADER_SIZE, shape=shape)
+
+    return SetpointTable(data, float(header["dt"]), float(header["t0"]))
@@ -0,0 +1,100 @@
+from collections import deque, namedtuple
+
+
+# Ways a 1-D plan can be obtained
+BRANCH_V_MAX_REACHED = "v_max_reached"
+BRANCH_V_MAX_NOT_REACHED = "v_max_not_reached"
+BRANCH_SEARCH = "search"
+BRANCH_ONE_SIDED = "one_sided"
+BRANCH_FIXED_TIME = "fixed_time"
+BRANCH_FIXED_TIME_SEARCH = "fixed_time_search"
+BRANCH_CACHED = "cached"
+BRANCH_INFEASIBLE = "infeasible"
+
+BRANCHES = (BRANCH_V_MAX_REACHED, BRANCH_V_MAX_NOT_REACHED, BRANCH_SEARCH,
+            BRANCH_ONE_SIDED, BRANCH_FIXED_TIME, BRANCH_FIXED_TIME_SEARCH,
+            BRANCH_CACHED, BRANCH_INFEASIBLE)
+
+# Stages wall time is measured for
+STAGES = ("feasibility", "profile", "search", "construction")
+
+# Record of a 1-D plan: DOF index, move parameters (q0, q1, v0, v1, v_max,
+# a_max, j_max, T), branch, search iterations and status (see pyscurve.batch)
+PlanRecord = namedtuple("PlanRecord", ["dof", "params", "branch",
+                                       "iterations", "status"])
+
+# Record of a plan_trajectory call: PlanRecords of all planned DOFs, seconds
+# per stage (summed over the plan_batch calls), total seconds and message of
+# the raised PlanningError
+TrajectoryRecord = namedtuple("TrajectoryRecord", ["plans", "stages", "time",
+                                                   "error"])
+
+
+class Instrumentation(object):
+    """
+    Cumulative counters and recent records of a planner.
+
+    Keeps the last history TrajectoryRecords and calls callback(record)
+    after every plan_trajectory call, including failed ones.
+    """
+
+    def __init__(self, history=128, callback=None):
+        self.callback = callback
+        self._records = deque(maxlen=history)
+        self.reset()
+
+    def reset(self):
+        """
+        Zeroes the counters and drops the kept records
+        """
+        self._calls = 0
+        self._failures = 0
+        self._plans = 0
+        self._iterations = 0
+        self._failed_plans = 0
+        self._branches = dict.fromkeys(BRANCHES, 0)
+        self._stages = dict.fromkeys(STAGES, 0.0)
+        self._time = 0.0
+        self._records.clear()
+
+    @property
+    def records(self):
+        return tuple(self._records)
+
+    @property
+    def last(self):
+        """
+        The most recent TrajectoryRecord or None
+        """
+        return self._records[-1] if self._records else None
+
+    def counters(self):
+        """
+        Returns dictionary of the cumulative counters
+        """
+        return {"calls": self._calls,
+                "failures": self._failures,
+                "plans": self._plans,
+                "iterations": self._iterations,
+                "failed_plans": self._failed_plans,
+                "branches": dict(self._branches),
+                "stages": dict(self._stages),
+                "time": self._time}
+
+    def add(self, record):
+        self._calls += 1
+        self._failures += record.error is not None
+        self._time += record.time
+
+        for plan in record.plans:
+            self._plans += 1
+            self._iterations += plan.iterations
+            self._failed_plans += plan.status != 0
+            self._branches[plan.branch] += 1
+
+        for stage, t in record.stages.items():
+            self._stages[stage] += t
+
+        self._records.append(record)
+        if self.callback is not None:
+            self.callback(record)
@@ -0,0 +1,52 @@
+import numpy as np
+from matplotlib import pyplot as plt
+from .trajectory import ACCELERATION_ID, SPEED_ID, POSITION_ID
+from .sampling import sample_times, SAMPLING_RTOL
+
+
+def plot_trajectory(traj, dt=None, rtol=SAMPLING_RTOL):
+    """
+    Plots the profiles of every DOF sampled every dt seconds or, without
+    dt, at the adaptive sample times of pyscurve.sampling
+    """
+    dof = traj.dof
+    if dt is None:
+        time = sample_times(traj, rtol, t0=0, t_end=max(traj.time))
+    else:
+        timesteps = int(max(traj.time) / dt)
+        time = np.linspace(0, max(traj.time), timesteps)
+
+    # profiles[t]           --- profiles for each DOF at time x[t]
+    # profiles[t][d]        --- profile for d DOF at time x[t]
+    # profiles[t][d][k]     --- accel/vel/pos profile for d DOF at time x[t]
+    profiles = traj(time)
+
+    # r_profiles[d]       --- profiles for each DOF 0 <= d <= DOF number
+    # r_profiles[d][k]    --- accel/vel/pos profile for DOF d
+    # r_profiles[d][k][t] --- accel/vel/pos at time x[t] for DOF d
+    r_profiles = np.transpose(profiles, (1, 2, 0))
+
+    fig = plt.figure(0)
+    # fig.suptitle("DOF profiles")
+
+    for i, profile in zip(range(dof), r_profiles):
+        plt.subplot(300 + dof*10 + (i+1))
+        plt.title("Acceleration profile")
+        plt.plot(time, profile[ACCELERATION_ID][:])
+        plt.xlim()
+        plt.ylim()
+
+        plt.subplot(300 + dof*10 + (i+1)+dof)
+        plt.title("Speed profile")
+        plt.plot(time, profile[SPEED_ID][:])
+        plt.xlim()
+        plt.ylim()
+
+        plt.subplot(300 + dof*10 + (i+1)+dof*2)
+        plt.title("Position profile")
+        plt.plot(time, profile[POSITION_ID][:])
+        plt.xlim()
+        plt.ylim()
+
+    plt.tight_layout()
+    plt.show()
@@ -0,0 +1,271 @@
+import math
+import numpy as np
+from .trajectory import Trajectory, PlanningError
+from .batch import plan_batch, phase_tables, PLAN_DTYPE, STATUS_OK
+from .batch import plan_move, move_possible, search_move, phase_table
+from .batch import one_sided_profile, SMALL_BATCH
+from .batch import STATUS_SEARCH_FAILED
+from .batch import SEARCH_DT_THRESH
+from .constant_time_optimizer import speed_change
+
+
+# Profile evaluations of the acceleration search per DOF, this bounds the
+# compute time of replanning. Moves stop searching with a slightly lower
+# acceleration than the optimal one
+REPLAN_MAX_ITER = 8
+
+# Phases of a replanned DOF: the acceleration ramp, a speed change (slowing
+# down to v_max or to a stop) and the move to the target
+REPLAN_PHASES = 15
+
+
+def brake(q0, v0, v1, a_max, j_max):
+    """
+    Jerk limited speed change from v0 to v1 which starts and ends with zero
+        acceleration, as plans of PLAN_DTYPE with only a deceleration
+        period. Works elementwise on arrays.
+
+    returns plans and the positions where the speed changes end
+    """
+    Tj, duration = speed_change(np.abs(v1 - v0), a_max, j_max)
+
+    plans = np.zeros(np.shape(duration), dtype=PLAN_DTYPE)
+    plans["Tj2"] = Tj
+    plans["Td"] = duration
+    plans["T"] = duration
+
+    return plans, q0 + (v0 + v1)*duration/2
+
+
+def rest_to_rest(q0, q1, v_max, a_max, j_max):
+    """
+    Plans of moves from rest to rest which reach neither v_max nor a_max.
+        Jerk phases last Tj = (|q1 - q0|/(2*j_max))**(1/3), the closed form
+        replaces the acceleration search for them. Moves which would exceed
+        a limit get STATUS_SEARCH_FAILED. Works elementwise on arrays.
+    """
+    Tj = np.cbrt(np.abs(q1 - q0)/(2*j_max))
+
+    plans = np.zeros(np.shape(Tj), dtype=PLAN_DTYPE)
+    plans["Tj1"] = plans["Tj2"] = Tj
+    plans["Ta"] = plans["Td"] = 2*Tj
+    plans["T"] = 4*Tj
+    plans["status"] = np.where((j_max*Tj <= a_max) & (j_max*Tj**2 <= v_max),
+                               STATUS_OK, STATUS_SEARCH_FAILED)
+
+    return plans
+
+
+def replan(q, v, a, q1, v1, v_max, a_max, j_max, dt_thresh=SEARCH_DT_THRESH,
+           max_iter=REPLAN_MAX_ITER):
+    """
+    Plans a jerk limited continuation from the current state (q, v, a) of
+    every DOF to the target q1 with speed v1.
+
+    Every DOF first brings its acceleration to zero with full jerk. If the
+    speed then exceeds v_max it is slowed down to v_max, and the move to
+    the target is planned from there. DOFs which can not reach the target
+    that way (it is too close or behind them) stop first and move from
+    rest. DOFs are not synchronized, each arrives as early as possible.
+    Targets with v1 != 0 which would need a run-up after stopping raise
+    PlanningError.
+
+    Up to SMALL_BATCH DOFs are planned one by one with the scalar closed
+    forms and acceleration search of pyscurve.batch. More DOFs, and the
+    few with invalid arguments, are planned together with a single
+    plan_batch call. Either way the search stops after max_iter profile
+    evaluations per DOF. Three DOFs take about 150 us, 300 us at the 99th
+    percentile (see bench.planning), the plan_batch path about 2 ms.
+
+    returns Trajectory starting at time zero with REPLAN_PHASES phases per
+        DOF
+    """
+    args = (q, v, a, q1, v1, v_max, a_max, j_max)
+    shape = np.broadcast(*args).shape
+    rows = np.empty((len(args),) + (shape or (1,)))
+    for row, x in zip(rows, args):
+        row[...] = x
+    rows[5:] = np.abs(rows[5:])
+    args = q, v, a, q1, v1, v_max, a_max, j_max = rows
+    n = len(q)
+
+    tables = [None]*n
+    if n <= SMALL_BATCH:
+        tables = [_replan_dof(*params, dt_thresh, max_iter)
+                  for params in zip(*[x.tolist() for x in args])]
+
+    breaks = np.empty((n, REPLAN_PHASES + 1))
+    coeffs = np.empty((n, REPLAN_PHASES, 4))
+    idx = [i for i, table in enumerate(tables) if table is not None]
+    if idx:
+        breaks[idx] = [b for b, _ in (tables[i] for i in idx)]
+        coeffs[idx] = [c for _, c in (tables[i] for i in idx)]
+
+    idx = np.asarray([i for i, table in enumerate(tables) if table is None],
+                     dtype=np.intp)
+    if len(idx):
+        b, c, failed = _replan_tables(*[x[idx] for x in args],
+                                      dt_thresh=dt_thresh, max_iter=max_iter)
+        if failed.any():
+            raise PlanningError("Failed to replan DOF %d" %
+                                idx[np.argmax(failed)])
+        breaks[idx], coeffs[idx] = b, c
+
+    return Trajectory(breaks, coeffs)
+
+
+def _speed_change(dv, a_max, j_max):
+    """
+    Scalar version of speed_change
+    """
+    if dv*j_max >= a_max**2:
+        Tj = a_max/j_max
+        return Tj, Tj + dv/a_max
+
+    Tj = math.sqrt(dv/j_max)
+    return Tj, 2*Tj
+
+
+def _plan_move(q0, q1, v0, v1, v_max, a_max, j_max, dt_thresh, max_iter):
+    """
+    Scalar version of the plan_batch call of _replan_tables for a single
+        move with finite arguments and positive limits
+
+    returns Tj1, Ta, Tj2, Td, Tv, False if the move is infeasible or None if
+        it is left to plan_batch
+    """
+    if q0 == q1 and v0 == 0 and v1 == 0:
+        return 0.0, 0.0, 0.0, 0.0, 0.0
+
+    plan = plan_move(q0, q1, v0, v1, v_max, a_max, j_max)
+    if plan is not None:
+        return plan
+    s = 1.0 if q1 > q0 else -1.0
+    if (s*v0 > v_max or s*v1 > v_max or
+            not move_possible(q0, q1, v0, v1, a_max, j_max)):
+        return False
+
+    q0, q1, v0, v1 = s*q0, s*q1, s*v0, s*v1
+    plan, _ = search_move(q0, q1, v0, v1, v_max, a_max, j_max, dt_thresh,
+                          max_iter)
+    if plan is not None:
+        return plan
+
+    # Moves which only slow down or speed up, rare enough for the array
+    # version
+    with np.errstate(divide='ignore', invalid='ignore'):
+        *plan, ok = one_sided_profile(q0, q1, v0, v1, a_max, j_max)
+    return tuple(float(x) for x in plan) if ok else None
+
+
+def _replan_dof(q, v, a, q1, v1, v_max, a_max, j_max, dt_thresh, max_iter):
+    """
+    Scalar version of _replan_tables for a single DOF
+
+    returns lists of the breaks and coefficient rows of the DOF, or None
+        if it has to be planned by _replan_tables
+    """
+    if not (math.isfinite(q + v + a + q1 + v1 + v_max + a_max + j_max) and
+            v_max > 0 and a_max > 0 and j_max > 0):
+        return None
+
+    Tr = abs(a)/j_max
+    jr = -j_max if a > 0 else j_max if a < 0 else 0.0
+    q_r = q + (v + (a/2 + jr*Tr/6)*Tr)*Tr
+    v_r = v + (a + jr*Tr/2)*Tr
+
+    # Continue from at most v_max, or stop if that is not possible
+    v_b = min(max(v_r, -v_max), v_max)
+    Tj, duration = _speed_change(abs(v_b - v_r), a_max, j_max)
+    q_b = q_r + (v_r + v_b)*duration/2
+
+    plan = _plan_move(q_b, q1, v_b, v1, v_max, a_max, j_max, dt_thresh,
+                      max_iter)
+    if plan is False:
+        v_b = 0.0
+        Tj, duration = _speed_change(abs(v_r), a_max, j_max)
+        q_b = q_r + v_r*duration/2
+
+        plan = _plan_move(q_b, q1, 0.0, v1, v_max, a_max, j_max, dt_thresh,
+                          max_iter)
+        if plan is None and v1 == 0:
+            plans = rest_to_rest(q_b, q1, v_max, a_max, j_max)
+            if plans["status"] == STATUS_OK:
+                plan = plans.item()[:5]
+
+    if not plan:
+        return None
+
+    b_slow, c_slow = phase_table(0.0, 0.0, Tj, duration, 0.0, q_r, q_b, v_r,
+                                 v_b, j_max)
+    b_move, c_move = phase_table(*plan, q_b, q1, v_b, v1, j_max)
+
+    start = Tr + duration
+    breaks = [0.0, Tr] + [Tr + t for t in b_slow[1:]] +\
+        [start + t for t in b_move[1:]]
+    return breaks, [[q, v, a/2, jr/6]] + c_slow + c_move
+
+
+def _replan_tables(q, v, a, q1, v1, v_max, a_max, j_max, dt_thresh,
+                   max_iter):
+    """
+    Plans replan with array operations, both alternatives of all DOFs with
+        a single plan_batch call
+
+    returns breaks, coefficients and the mask of the DOFs which could not
+        be planned, no tables if there are any
+    """
+    n = len(q)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Acceleration ramp to zero
+        Tr = np.abs(a)/j_max
+        jr = -np.sign(a)*j_max
+        q_r = q + (v + (a/2 + jr*Tr/6)*Tr)*Tr
+        v_r = v + (a + jr*Tr/2)*Tr
+
+        # Continue from at most v_max, or stop
+        v_b = np.clip(v_r, -v_max, v_max)
+        slow, q_b = brake(q_r, v_r, v_b, a_max, j_max)
+        stop, q_s = brake(q_r, v_r, np.zeros(n), a_max, j_max)
+
+        q0 = np.concatenate([q_b, q_s])
+        v0 = np.concatenate([v_b, np.zeros(n)])
+        plans = plan_batch(q0, np.tile(q1, 2), v0, np.tile(v1, 2),
+                           np.tile(v_max, 2), np.tile(a_max, 2),
+                           np.tile(j_max, 2), dt_thresh=dt_thresh,
+                           max_iter=max_iter)
+
+        # Short stops run out of search evaluations while lowering the
+        # acceleration, their profile is known
+        short = (plans["status"][n:] == STATUS_SEARCH_FAILED) & (v1 == 0)
+        plans[n:][short] = rest_to_rest(q_s[short], q1[short], v_max[short],
+                                      a_max[short], j_max[short])
+
+    # Standing still at the target is a move of zero length
+    still = (q0 == np.tile(q1, 2)) & (v0 == 0) & (np.tile(v1, 2) == 0)
+    plans[still] = 0
+
+    direct = plans["status"][:n] == STATUS_OK
+    failed = ~direct & (plans["status"][n:] != STATUS_OK)
+    if failed.any():
+        return None, None, failed
+
+    plans = np.where(direct, plans[:n], plans[n:])
+    speed_plans = np.where(direct, slow, stop)
+    q0 = np.where(direct, q_b, q_s)
+    v0 = np.where(direct, v_b, 0)
+
+    # Speed changes and moves of all DOFs in one table
+    breaks, coeffs = phase_tables(
+        np.concatenate([speed_plans, plans]), np.concatenate([q_r, q0]),
+        np.concatenate([q0, q1]), np.concatenate([v_r, v0]),
+        np.concatenate([v0, v1]), np.tile(j_max, 2))
+
+    start = Tr + speed_plans["T"]
+    breaks = np.concatenate([np.zeros((n, 1)), Tr[:, None],
+                             Tr[:, None] + breaks[:n, 1:],
+                             start[:, None] + breaks[n:, 1:]], axis=1)
+    coeffs = np.concatenate([np.stack([q, v, a/2, jr/6], axis=-1)[:, None],
+                             coeffs[:n], coeffs[n:]], axis=1)
+
+    return breaks, coeffs, failed
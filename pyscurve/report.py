@@ -0,0 +1,153 @@
+"""
+Headless rendering of trajectory reports.
+
+ProfileFigure builds the position/velocity/acceleration/jerk layout of the
+editor once on an Agg canvas and only swaps the line data for every
+trajectory, so rendering many moves costs rasterization and encoding but
+no figure construction. render_reports spreads the work over processes.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from .trajectory import ACCELERATION_ID, SPEED_ID, POSITION_ID, JERK_ID
+from .sampling import sample_times, SAMPLING_RTOL
+
+
+# Panels from top to bottom: state index, label and line color of a single
+# DOF (several DOFs use the default color cycle)
+PANELS = ((POSITION_ID, "Position", "#bf5af2"),
+          (SPEED_ID, "Velocity", "#0b84ff"),
+          (ACCELERATION_ID, "Acceleration", "#ff453a"),
+          (JERK_ID, "Jerk", "#ff9f0b"))
+
+# Figure of a worker process
+_worker = {}
+
+
+class ProfileFigure(object):
+    """
+    Reusable four panel profile figure.
+
+    Axes, labels, grid and legends are created once for up to dof DOFs.
+    render() evaluates a trajectory at the adaptive sample times of
+    pyscurve.sampling (exact phase boundaries, lines within rtol of the
+    profiles), replaces the data of the existing lines, adjusts the limits
+    and writes the image.
+    """
+
+    def __init__(self, dof=1, rtol=SAMPLING_RTOL, figsize=(6, 8), dpi=100,
+                 units=("degrees", "sec")):
+        self._rtol = rtol
+        self._dpi = dpi
+
+        self._fig = Figure(figsize=figsize, dpi=dpi)
+        self._canvas = FigureCanvasAgg(self._fig)
+        self._axes = self._fig.subplots(len(PANELS), 1, sharex=True)
+        self._fig.subplots_adjust(left=0.14, right=0.95, top=0.95,
+                                  bottom=0.08, hspace=0)
+
+        q, t = units
+        ylabels = (q, "%s/%s" % (q, t), "%s/%s²" % (q, t), "%s/%s³" % (q, t))
+        self._lines = []
+        for ax, (_, label, color), ylabel in zip(self._axes, PANELS, ylabels):
+            ax.set_ylabel(ylabel)
+            ax.grid(True, which="both", linestyle="--", linewidth=0.5,
+                    color="lightgray", alpha=0.5)
+
+            lines = []
+            for d in range(dof):
+                line, = ax.plot([], [], color=color if dof == 1 else
+                                "C%d" % (d % 10),
+                                label=label if dof == 1 else
+                                "%s %d" % (label, d),
+                                drawstyle="steps-post" if label == "Jerk"
+                                else "default")
+                lines.append(line)
+            ax.legend(loc="upper right")
+            self._lines.append(lines)
+
+        self._axes[-1].set_xlabel(t)
+        self._title = self._fig.suptitle("")
+
+    @property
+    def figure(self):
+        return self._fig
+
+    @property
+    def dof(self):
+        return len(self._lines[0])
+
+    def update(self, traj, title=""):
+        """
+        Replaces the line data with the profiles of traj
+        """
+        if traj.dof > self.dof:
+            raise ValueError("Figure was built for %d DOFs, trajectory has "
+                             "%d" % (self.dof, traj.dof))
+
+        end = max(max(traj.time), traj.breaks[:, -1].max(initial=0))
+        time = sample_times(traj, self._rtol, t0=0, t_end=end)
+        profiles = traj(time, jerk=True)
+
+        for ax, (idx, _, _), lines in zip(self._axes, PANELS, self._lines):
+            data = profiles[:, :, idx]
+            for d, line in enumerate(lines):
+                if d < traj.dof:
+                    line.set_data(time, data[:, d])
+                line.set_visible(d < traj.dof)
+
+            # Limits straight from the data instead of relim/autoscale
+            lo, hi = np.nanmin(data), np.nanmax(data)
+            pad = 0.1*(hi - lo) or max(abs(hi), 1)*0.1
+            ax.set_ylim(lo - pad, hi + pad)
+
+        self._axes[0].set_xlim(0, end or 1)
+        self._title.set_text(title)
+
+    def render(self, traj, fname, title="", fmt=None):
+        """
+        Draws traj and writes the image into fname, the format (png, svg,
+        ...) follows the extension unless fmt is given
+        """
+        self.update(traj, title)
+        self._fig.savefig(fname, format=fmt, dpi=self._dpi)
+
+
+def _init_worker(figure_kwargs):
+    _worker["figure"] = ProfileFigure(**figure_kwargs)
+
+
+def _render(job):
+    traj, fname, title = job
+    _worker["figure"].render(traj, fname, title)
+    return fname
+
+
+def render_reports(trajectories, out_dir, fmt="png", names=None,
+                   workers=0, chunksize=16, **figure_kwargs):
+    """
+    Renders every trajectory into out_dir/<name>.<fmt> (names default to
+    the index) with one ProfileFigure per process. workers=0 renders in
+    this process, None uses one process per CPU.
+
+    returns list of the written file names
+    """
+    trajectories = list(trajectories)
+    if names is None:
+        names = ["%06d" % i for i in range(len(trajectories))]
+
+    os.makedirs(out_dir, exist_ok=True)
+    figure_kwargs.setdefault("dof", max((tr.dof for tr in trajectories),
+                                        default=1))
+    jobs = [(tr, os.path.join(out_dir, "%s.%s" % (name, fmt)), str(name))
+            for tr, name in zip(trajectories, names)]
+
+    if workers == 0:
+        _init_worker(figure_kwargs)
+        return [_render(job) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(figure_kwargs,)) as pool:
+        return list(pool.map(_render, jobs, chunksize=chunksize))
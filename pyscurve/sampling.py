@@ -0,0 +1,77 @@
+import numpy as np
+
+
+# Default sampling error as a fraction of the range of every profile
+SAMPLING_RTOL = 1e-3
+
+# Upper bound of samples inside a single phase
+SAMPLING_MAX_PER_PHASE = 1000
+
+
+def phase_sample_counts(traj, rtol=SAMPLING_RTOL,
+                        max_per_phase=SAMPLING_MAX_PER_PHASE):
+    """
+    Number of equal segments every phase of traj is split into, an array
+    with shape (dof, P).
+
+    Drawing straight lines between the samples deviates from a profile f
+    by at most (h/n)**2*max|f''|/8 in a phase of length h split into n
+    segments. The count keeps this below rtol times the range of the
+    position and velocity profiles of the DOF. Acceleration is linear and
+    jerk constant within a phase, so they are exact with the phase
+    boundaries alone, as is the position of constant velocity phases.
+    """
+    breaks, coeffs = traj.breaks, traj.coeffs
+    h = np.diff(breaks, axis=1)
+    c0, c1, c2, c3 = np.moveaxis(coeffs, -1, 0)
+
+    # Second derivatives are linear (position) or constant (velocity) in a
+    # phase, so their largest magnitude is found at the phase ends
+    curvature = (np.maximum(np.abs(2*c2), np.abs(2*c2 + 6*c3*h)),
+                 np.abs(6*c3))
+
+    q_end = ((c3*h + c2)*h + c1)*h + c0
+    v_end = (3*c3*h + 2*c2)*h + c1
+
+    n = np.ones(h.shape)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for k, start, end in zip(curvature, (c0, c1), (q_end, v_end)):
+            values = np.concatenate([start, end], axis=1)
+            span = np.nanmax(values, axis=1, initial=-np.inf) -\
+                np.nanmin(values, axis=1, initial=np.inf)
+            count = np.ceil(h*np.sqrt(k/(8*rtol*span[:, None])))
+            n = np.fmax(n, np.where(np.isfinite(count), count, 1))
+
+    return np.clip(n, 1, max_per_phase).astype(np.int64)
+
+
+def sample_times(traj, rtol=SAMPLING_RTOL, t0=None, t_end=None,
+                 max_per_phase=SAMPLING_MAX_PER_PHASE):
+    """
+    Sorted sample times for drawing or exporting traj.
+
+    Contains the exact phase boundaries of every DOF (where jerk jumps and
+    acceleration has corners) plus evenly spaced points inside the curved
+    phases, see phase_sample_counts. Samples cover t0 (default: start of
+    the motion) to t_end (default: end of the longest DOF).
+    """
+    breaks = traj.breaks
+    if t0 is None:
+        t0 = breaks[:, 0].min(initial=0)
+    if t_end is None:
+        t_end = max(max(traj.time), breaks[:, -1].max(initial=0))
+
+    n = phase_sample_counts(traj, rtol, max_per_phase).ravel()
+    start = breaks[:, :-1].ravel()
+    step = (np.diff(breaks, axis=1).ravel())/n
+
+    # Points 1 ... n - 1 of every phase
+    inner = n - 1
+    phase = np.repeat(np.arange(len(n)), inner)
+    offset = np.arange(len(phase)) - np.repeat(np.cumsum(inner) - inner,
+                                               inner) + 1
+    t = np.concatenate([breaks.ravel(), start[phase] + offset*step[phase],
+                        [t0, t_end]])
+
+    t = np.unique(t[np.isfinite(t)])
+    return t[(t >= t0) & (t <= t_end)]
@@ -1,12 +1,20 @@
 import numpy as np
-from .trajectory import Trajectory, PlanningError, EPSILON
-from .trajectory import ACCELERATION_ID, SPEED_ID, POSITION_ID
+from .trajectory import Trajectory, PlanningError
 from .planner import TrajectoryPlanner
+from .batch import plan_batch, phase_tables, PLAN_DTYPE
+from .batch import plan_move, phase_table, SMALL_BATCH
+from .batch import STATUS_OK, STATUS_INFEASIBLE, STATUS_INVALID
+from .batch import SEARCH_DT_THRESH, SEARCH_MAX_ITER
+from .cache import PlanCache
+from .sequence import plan_sequence
+from .replan import replan, REPLAN_MAX_ITER
+from .instrumentation import Instrumentation, PlanRecord, TrajectoryRecord
+from .instrumentation import STAGES, BRANCH_CACHED
+from . import tracing
 import logging
+import time
 
 
-logging.basicConfig(format='%(message)s', level=logging.DEBUG)
-
 planning_logger = logging.getLogger(__name__)
 
 # create console handler and set level to debug
@@ -18,433 +26,386 @@ planning_logger = logging.getLogger(__name__)
 
 class ScurvePlanner(TrajectoryPlanner):
 
-    def __init__(self, debug=False):
+    def __init__(self, debug=False, dt_thresh=SEARCH_DT_THRESH,
+                 max_iter=SEARCH_MAX_ITER, cache_size=0, cache_quantum=1e-9,
+                 instrument=False, on_plan=None):
         if debug:
             planning_logger.setLevel(logging.DEBUG)
         else:
             planning_logger.setLevel(logging.CRITICAL)
             
         self.s = 1
-
-    def __scurve_check_possibility(self, q0, q1, v0, v1, v_max, a_max, j_max):
+        self.dt_thresh = dt_thresh
+        self.max_iter = max_iter
+        self._search_iterations = 0
+
+        # Opt-in LRU cache of 1-D planning results
+        self._cache = None
+        if cache_size:
+            self._cache = PlanCache(cache_size, cache_quantum)
+
+        # Opt-in per call records and counters, see pyscurve.instrumentation
+        self._instrumentation = None
+        if instrument or on_plan is not None:
+            self._instrumentation = Instrumentation(callback=on_plan)
+
+    @property
+    def search_iterations(self):
         """
-        Check whether trajectory is feasible. If not raises PlanningError
+        Number of profile evaluations used by the last search planning
         """
-        dv = np.abs(v1 - v0)
-        dq = np.abs(q1 - q0)
-
-        time_to_reach_max_a = a_max/j_max
-        time_to_set_set_speeds = np.sqrt(dv/j_max)
-
-        Tj = min(time_to_reach_max_a, time_to_set_set_speeds)
-
-        if Tj == time_to_reach_max_a:
-            return dq > 0.5*(v0 + v1)*(Tj+dv/a_max)
+        return self._search_iterations
 
-        elif Tj < time_to_reach_max_a:
-            return dq > Tj*(v0+v1)
-
-        else:
-            raise PlanningError("Something went wrong")
-
-    def __compute_maximum_speed_reached(self, q0, q1, v0, v1,
-                                        v_max, a_max, j_max):
+    @property
+    def cache(self):
         """
-        For explanation look at page 79 of
-            'Trajectory planning for automatic machines and robots(2008)'
+        PlanCache used by the planner or None if caching is disabled
         """
-        planning_logger.info("Computing maximum speed reached profile")
+        return self._cache
 
-        # Acceleration period
-        if (v_max-v0)*j_max < a_max**2:
-            # a_max is not reached
-            Tj1 = np.sqrt((v_max-v0)/j_max)
-            Ta = 2*Tj1
-        else:
-            # a_max is reached
-            Tj1 = a_max/j_max
-            Ta = Tj1 + (v_max-v0)/a_max
-
-        # Deceleration period
-        if (v_max-v1)*j_max < a_max**2:
-            # a_min is not reached
-            Tj2 = np.sqrt((v_max-v1)/j_max)
-            Td = 2*Tj2
-        else:
-            # a_min is reached
-            Tj2 = a_max/j_max
-            Td = Tj2 + (v_max-v1)/a_max
-
-        Tv = (q1-q0)/v_max - (Ta/2)*(1+v0/v_max)-(Td/2)*(1+v1/v_max)
-
-        if Tv < 0:
-            raise PlanningError("Maximum velocity is not reached. "
-                                "Failed to plan trajectory")
-
-        return Tj1, Ta, Tj2, Td, Tv
-
-    def __compute_maximum_speed_not_reached(self, q0, q1, v0, v1,
-                                            v_max, a_max, j_max):
+    @property
+    def instrumentation(self):
         """
-        For explanation look at page 79 of
-            'Trajectory planning for automatic machines and robots(2008)'
+        Instrumentation with records and counters of the plan_trajectory
+            calls or None if instrumentation is disabled
         """
-        # Assuming that a_max/a_min is reached
-        planning_logger.info("Computing maximum speed not reached profile")
-
-        Tj1 = Tj2 = Tj = a_max/j_max
-        Tv = 0
-
-        v = (a_max**2)/j_max
-        delta = ((a_max**4)/(j_max**2)) + 2*((v0**2)+(v1**2)) +\
-            a_max*(4*(q1-q0)-2*(a_max/j_max)*(v0+v1))
-
-        Ta = (v - 2*v0 + np.sqrt(delta))/(2*a_max)
-        Td = (v - 2*v1 + np.sqrt(delta))/(2*a_max)
-
-        if (Ta - 2*Tj < EPSILON) or (Td - 2*Tj < EPSILON):
-            raise PlanningError("Maximum acceletaion is not reached. Failed to"
-                                " plan trajectory")
-
-        return Tj1, Ta, Tj2, Td, Tv
+        return self._instrumentation
 
-    def __scurve_search_planning(self, q0, q1, v0, v1, v_max, a_max,
-                                 j_max, l=0.99, max_iter=2000,
-                                 dt_thresh=0.01, T=None):
+    def cache_info(self):
         """
-        Trying to achieve requirements with iteratively decreasing maximum
-            possible acceleration.
-
-        Look at 'Trajectory planning for automatic machines and robots(2008)'
-        """
-        planning_logger.info("Starting search planning")
-
-        _a_max = a_max
-        it = 0
-
-        while (it < max_iter) and (_a_max > EPSILON):
-            try:
-                Tj1, Ta, Tj2, Td, Tv =\
-                    self.__compute_maximum_speed_not_reached(q0, q1, v0, v1,
-                                                             v_max, _a_max,
-                                                             j_max)
-
-                if T is None:
-                    return Tj1, Ta, Tj2, Td, Tv
-
-                if abs(T - Ta - Td - Tv) <= dt_thresh:
-                    return Tj1, Ta, Tj2, Td, Tv
-                else:
-                    _a_max *= l
-                    it += 1
-
-            except PlanningError:
-                it += 1
-                _a_max *= l
-
-        raise PlanningError("Failed to find appropriate a_max")
-
-    def __sign_transforms(self, q0, q1, v0, v1, v_max, a_max, j_max):
-        """
-        Sign transforms for being able to calculate trajectory with q1 < q0
-
-        Look at 'Trajectory planning for automatic machines and robots(2008)'
+        Returns hits, misses, evictions, maximum and current size of the
+            plan cache or None if caching is disabled
         """
-        v_min = -v_max
-        a_min = -a_max
-        j_min = -j_max
-
-        s = np.sign(q1-q0)
-        vs1 = (s+1)/2
-        vs2 = (s-1)/2
-
-        _q0 = s*q0
-        _q1 = s*q1
-        _v0 = s*v0
-        _v1 = s*v1
-        _v_max = vs1*v_max + vs2*v_min
-        _a_max = vs1*a_max + vs2*a_min
-        _j_max = vs1*j_max + vs2*j_min
+        if self._cache is None:
+            return None
 
-        return _q0, _q1, _v0, _v1, _v_max, _a_max, _j_max
+        return self._cache.info()
 
-    def __point_sign_transform(self, q0, q1, p):
+    def cache_clear(self):
         """
-        Transforms point back to the original sign
+        Drops all cached plans. Needed after changing dt_thresh or max_iter
         """
-        s = np.sign(q1-q0)
-        return s*p
+        if self._cache is not None:
+            self._cache.clear()
 
-    def __get_trajectory_func(self, Tj1, Ta, Tj2, Td, Tv,
-                              q0, q1, v0, v1, v_max, a_max, j_max):
+    def cache_invalidate(self, q0, q1, v0, v1, v_max, a_max, j_max, t=None):
         """
-        Returns function of time given trajectory parameters
+        Drops the cached plan of a single 1-D move, returns True if it was
+            cached
         """
-        T = Ta + Td + Tv
-        a_lim_a = j_max*Tj1
-        a_lim_d = -j_max*Tj2
-        v_lim = v0 + (Ta-Tj1)*a_lim_a
-
-        def trajectory(t):
-            """
-            Returns numpy array with shape (3,) which contains acceleration,
-            speed and position for a given time t.
-            """
-            
-            # Acceleration phase (Increasing acceleration)
-            if 0 <= t < Tj1:
-                a = j_max * t  # Acceleration increases linearly
-                v = v0 + j_max * (t**2) / 2  # Velocity follows quadratic increase
-                q = q0 + v0 * t + j_max * (t**3) / 6  # Position follows cubic trajectory
-
-            # Acceleration phase (Constant acceleration)
-            elif Tj1 <= t < Ta - Tj1:
-                a = a_lim_a  # Constant acceleration
-                v = v0 + a_lim_a * (t - Tj1 / 2)  # Velocity increases linearly
-                q = q0 + v0 * t + a_lim_a * (3 * (t**2) - 3 * Tj1 * t + Tj1**2) / 6  # Position update
-
-            # Acceleration phase (Decreasing acceleration)
-            elif Ta - Tj1 <= t < Ta:
-                tt = Ta - t  # Time remaining in this phase
-
-                a = j_max * tt  # Acceleration decreases linearly
-                v = v_lim - j_max * (tt**2) / 2  # Velocity follows quadratic decrease
-                q = q0 + (v_lim + v0) * Ta / 2 - v_lim * tt + j_max * (tt**3) / 6  # Position update
-
-            # Constant velocity phase (Cruise phase)
-            elif Ta <= t < Ta + Tv:
-                a = 0  # No acceleration
-                v = v_lim  # Velocity remains constant
-                q = q0 + (v_lim + v0) * Ta / 2 + v_lim * (t - Ta)  # Position update
-
-            # Deceleration phase (Increasing deceleration)
-            elif T - Td <= t < T - Td + Tj2:
-                tt = t - T + Td  # Time elapsed in this phase
-
-                a = -j_max * tt  # Acceleration decreases linearly (negative jerk)
-                v = v_lim - j_max * (tt**2) / 2  # Velocity follows quadratic decrease
-                q = q1 - (v_lim + v1) * Td / 2 + v_lim * tt - j_max * (tt**3) / 6  # Position update
-
-            # Deceleration phase (Constant deceleration)
-            elif T - Td + Tj2 <= t < T - Tj2:
-                tt = t - T + Td  # Time elapsed in this phase
-
-                a = a_lim_d  # Constant negative acceleration
-                v = v_lim + a_lim_d * (tt - Tj2 / 2)  # Velocity decreases linearly
-                q = q1 - (v_lim + v1) * Td / 2 + v_lim * tt + a_lim_d * (3 * (tt**2) - 3 * Tj2 * tt + Tj2**2) / 6  # Position update
-
-            # Deceleration phase (Decreasing deceleration)
-            elif T - Tj2 <= t < T:
-                tt = T - t  # Time remaining in this phase
-
-                a = -j_max * tt  # Acceleration increases towards zero (negative jerk)
-                v = v1 + j_max * (tt**2) / 2  # Velocity follows quadratic increase (negative direction)
-                q = q1 - v1 * tt - j_max * (tt**3) / 6  # Position update
-
-            # Final state (Rest or end of trajectory)
-            else:
-                a = 0  # No acceleration
-                v = v1  # Final velocity
-                q = q1  # Final position
-
-            # Store values in the output array
-            point = np.zeros((3,), dtype=np.float32)
-            point[ACCELERATION_ID] = a
-            point[SPEED_ID] = v
-            point[POSITION_ID] = q
-
-            return point
+        if self._cache is None:
+            return False
 
-        return trajectory
+        return self._cache.invalidate(
+            self._cache.key(q0, q1, v0, v1, v_max, a_max, j_max, t))
 
-    def __get_trajectory_function(self, q0, q1, v0, v1, v_max, a_max, j_max,
-                                  Tj1, Ta, Tj2, Td, Tv):
+    def __plan_moves(self, args, T, dofs, records, details):
         """
-        Returns function wich wrapps trajectory function with sign transforms
-        """
-        zipped_args = self.__sign_transforms(q0, q1, v0, v1, v_max, a_max,
-                                             j_max)
-
-        traj_func = self.__get_trajectory_func(Tj1, Ta, Tj2,
-                                               Td, Tv, *zipped_args)
-
-        def sign_back_transformed(t):
-            return self.__point_sign_transform(q0, q1, traj_func(t))
-
-        return sign_back_transformed
-
-    def __scurve_profile_no_opt(self, q0, q1, v0, v1, v_max, a_max, j_max):
-        """
-        Computes s-curve trajectory parameters which are:
-            Tj1     --- non-zero constant jerk period while accelerating
-            Ta      --- total acceleration period time
-            Tj2     --- non-zero constant jerk period while decelerating
-            Td      --- total deceleration time
-            Tv      --- constant speed time
-        """
-        if self.__scurve_check_possibility(q0, q1, v0, v1, v_max, a_max, j_max):
-            try:
-                Tj1, Ta, Tj2, Td, Tv =\
-                    self.__compute_maximum_speed_reached(q0, q1, v0, v1,
-                                                         v_max, a_max, j_max)
-            except PlanningError as e:
-                planning_logger.warn(e)
-
-                try:
-                    Tj1, Ta, Tj2, Td, Tv =\
-                        self.__compute_maximum_speed_not_reached(q0, q1, v0, v1,
-                                                                 v_max, a_max,
-                                                                 j_max)
-                except PlanningError as e:
-                    planning_logger.warn(e)
-
-                    try:
-                        Tj1, Ta, Tj2, Td, Tv =\
-                            self.__scurve_search_planning(q0, q1, v0, v1, v_max,
-                                                          a_max, j_max)
-                    except PlanningError as e:
-                        planning_logger.warn(e)
-                        raise PlanningError("Trajectory is infeasible")
-
-            return np.asarray([Tj1, Ta, Tj2, Td, Tv], dtype=np.float32)
-
-        else:
-            raise PlanningError("Trajectory is not feasible")
-
-    def __put_params(self, params_list, params, dof):
-        for i in range(len(params_list)):
-            params_list[i][dof] = params[i]
-
-    def __get_dof_time(self, params_list, dof):
-        return params_list[1][dof] + params_list[3][dof] + params_list[4][dof]
-
-    def __get_traj_params_containers(self, sh):
-        T = np.zeros(sh)
-        Ta = np.zeros(sh)
-        Tj1 = np.zeros(sh)
-        Td = np.zeros(sh)
-        Tj2 = np.zeros(sh)
-        Tv = np.zeros(sh)
-
-        return T, Tj1, Ta, Tj2, Td, Tv
+        Plans the 1-D moves of the DOFs dofs with a single plan_batch call,
+            moves found in the cache are not planned again. A few moves
+            without T are tried with the scalar closed forms first
 
-    def __plan_trajectory_1D(self, q0, q1, v0, v1, v_max, a_max, j_max, T=None):
+        returns structured array of PLAN_DTYPE, raises PlanningError if any
+            of the moves failed
         """
-        Computes optimal time scurve trajectory or trying to fit it in time T
-
-        returns list of trajecotry parameters
-        """
-        zipped_args = self.__sign_transforms(q0, q1, v0, v1, v_max, a_max,
-                                             j_max)
-
-        planning_logger.info("Planning trajectory with given parameters")
-        planning_logger.info("%f %f %f %f %f %f %f" %
-                             (q0, q1, v0, v1, v_max, a_max, j_max) +
-                             str(T))
-        planning_logger.debug("Sign transform result")
-        planning_logger.debug("{} {} {} {} {} {} {}".format(*zipped_args))
-
-        if T is None:
-            planning_logger.info("Computing Optimal time profile")
-            res = self.__scurve_profile_no_opt(*zipped_args)
-        else:
-            planning_logger.info("Computing constant time profile")
-            res = self.__scurve_search_planning(*zipped_args, T=T)
-
-        T = res[1] + res[3] + res[4]
-        a_max_c = res[0]*j_max
-        a_min_c = a_max_c - res[2]*j_max
-        planning_logger.info(
-            "Planning results:\r\n\t"
-            "Maximum acceleration: {}\r\n\t"
-            "Minimum acceleration: {}\r\n\t"
-            "T: {}\r\n\t"
-            "Tj1: {}\r\n\t"
-            "Ta: {}\r\n\t"
-            "Tj2: {}\r\n\t"
-            "Td: {}\r\n\t"
-            "Tv: {}\r\n\r\n".format(a_max_c, a_min_c, T, *res))
-
-        return res
+        args = [x[dofs] for x in args]
+        n = len(dofs)
+        if T is not None:
+            T = np.full(n, T, dtype=np.float64)
+
+        plans = np.zeros(n, dtype=PLAN_DTYPE)
+        branch = np.full(n, BRANCH_CACHED, dtype=object)
+        todo = np.ones(n, dtype=bool)
+
+        if self._cache is not None:
+            keys = [self._cache.key(*params, T=None if T is None else T[i])
+                    for i, params in enumerate(zip(*args))]
+            for i, key in enumerate(keys):
+                res = self._cache.get(key)
+                if res is not None:
+                    plans[i] = res
+                    todo[i] = False
+        elif T is None and details is None and n <= SMALL_BATCH:
+            for i, params in enumerate(zip(*[x.tolist() for x in args])):
+                res = plan_move(*params)
+                if res is not None:
+                    plans[i] = res + (res[1] + res[3] + res[4], STATUS_OK, 0)
+                    todo[i] = False
+
+        idx = np.flatnonzero(todo)
+        if len(idx):
+            planning_logger.info("Computing %s profile of DOFs %s",
+                                 "optimal time" if T is None else
+                                 "constant time", dofs[idx])
+            plans[idx] = plan_batch(*[x[idx] for x in args],
+                                    T=None if T is None else T[idx],
+                                    dt_thresh=self.dt_thresh,
+                                    max_iter=self.max_iter, details=details)
+            if details is not None:
+                branch[idx] = details.pop("branch")
+
+            if self._cache is not None:
+                for i in idx[plans["status"][idx] == STATUS_OK]:
+                    self._cache.put(keys[i], plans[i].item())
+
+        self._search_iterations = max(self._search_iterations,
+                                      int(plans["iterations"].max()))
+
+        if records is not None:
+            for i, dof in enumerate(dofs):
+                params = tuple(float(x[i]) for x in args)
+                records.append(PlanRecord(
+                    int(dof), params + (None if T is None else float(T[i]),),
+                    branch[i], int(plans["iterations"][i]),
+                    int(plans["status"][i])))
+
+        if tracing.tracer is not None:
+            tracing.tracer.event("plan", dofs=dofs, params=np.asarray(args),
+                                 T=T, result=plans.tolist())
+
+        status = plans["status"][plans["status"] != STATUS_OK]
+        if len(status):
+            raise _planning_error(status[0], T is not None)
+
+        return plans
 
     def plan_trajectory(self, q0, q1, v0, v1, v_max, a_max, j_max, t=None):
         """
         Plan scurve trajectory with give constraints
 
-        returns function of time which returns acceleration, velocity and
+        v_max, a_max and j_max are scalars shared by all DOFs or have one
+            value per DOF. All DOFs are planned with array operations, so
+            the cost hardly grows with their number.
+
+        returns Trajectory which returns acceleration, velocity and
             position for time t
         """
+        if self._instrumentation is None:
+            return self.__plan_trajectory(q0, q1, v0, v1, v_max, a_max, j_max,
+                                          t, None, None)
+
+        records = []
+        details = dict.fromkeys(STAGES, 0.0)
+        start = time.perf_counter()
+        error = None
+        try:
+            return self.__plan_trajectory(q0, q1, v0, v1, v_max, a_max, j_max,
+                                          t, records, details)
+        except PlanningError as e:
+            error = str(e)
+            raise
+        finally:
+            self._instrumentation.add(TrajectoryRecord(
+                tuple(records), details, time.perf_counter() - start, error))
+
+    def __plan_trajectory(self, q0, q1, v0, v1, v_max, a_max, j_max, t,
+                          records, details):
 
         planning_logger.info("********************************************"
                              "\r\n\t"
                              "NEW TRAJECTORY\r\n"
                              "********************************************")
         sh = self._check_shape(q0, q1, v0, v1)
-        ndof = sh[0]
+        self._search_iterations = 0
 
-        # Easy slices with numpy
-        task_list = np.asarray([q0, q1, v0, v1, [v_max]*ndof,
-                               [a_max]*ndof, [j_max]*ndof],
-                               dtype=np.float32)
+        q0, q1, v0, v1 = [np.asarray(x, dtype=np.float64)
+                          for x in (q0, q1, v0, v1)]
+        v_max, a_max, j_max = [np.broadcast_to(np.asarray(x, np.float64), sh)
+                               for x in (v_max, a_max, j_max)]
+        args = (q0, q1, v0, v1, v_max, a_max, j_max)
 
-        # Get arrays to save results into
-        T, Tj1, Ta, Tj2, Td, Tv = self.__get_traj_params_containers(sh)
-        trajectory_params = np.asarray([Tj1, Ta, Tj2, Td, Tv], dtype=np.float32)
-        trajectory_funcs = []
-
-        # Calculating params for the longest trajectory
-        dq = np.subtract(q1, q0)
-        max_displacement_id = np.argmax(np.abs(dq))
+        # The DOF which needs the most time at its speed limit sets the time
+        # of the DOFs which have to arrive together with it
+        with np.errstate(divide='ignore', invalid='ignore'):
+            max_displacement_id = np.argmax(np.abs(q1 - q0)/np.abs(v_max))
 
         planning_logger.info("Computing the longest DOF trajectory with id"
-                             " %d" % max_displacement_id)
+                             " %d", max_displacement_id)
+
+        # In case if final velocity is non-zero we need to synchronize the
+        # DOF in time with the longest trajectory, otherwise we do not need
+        # to worry about syncronization
+        synchronized = v1 != 0
+        synchronized[max_displacement_id] = t is not None
+
+        plans = np.zeros(sh, dtype=PLAN_DTYPE)
+        dofs = np.flatnonzero(~synchronized)
+        if len(dofs):
+            plans[dofs] = self.__plan_moves(args, None, dofs, records,
+                                            details)
+
+        T = plans["T"][max_displacement_id] if t is None else t
+        dofs = np.flatnonzero(synchronized)
+        if len(dofs):
+            plans[dofs] = self.__plan_moves(args, T, dofs, records, details)
+
+        if planning_logger.isEnabledFor(logging.INFO):
+            planning_logger.info(
+                "Planning results:\r\n\t"
+                "Maximum acceleration: %s\r\n\t"
+                "Minimum acceleration: %s\r\n\t"
+                "T: %s\r\n\t"
+                "Tj1: %s\r\n\t"
+                "Ta: %s\r\n\t"
+                "Tj2: %s\r\n\t"
+                "Td: %s\r\n\t"
+                "Tv: %s\r\n\r\n", plans["Tj1"]*j_max,
+                (plans["Tj1"] - plans["Tj2"])*j_max, plans["T"],
+                plans["Tj1"], plans["Ta"], plans["Tj2"], plans["Td"],
+                plans["Tv"])
+
+        # Piecewise cubic representation of every DOF
+        if details is not None:
+            start = time.perf_counter()
+
+        if sh[0] <= SMALL_BATCH:
+            tables = [phase_table(*p[:5], *x) for p, *x in zip(
+                plans.tolist(), q0.tolist(), q1.tolist(), v0.tolist(),
+                v1.tolist(), j_max.tolist())]
+            breaks = np.array([b for b, _ in tables]).reshape(sh[0], 8)
+            coeffs = np.array([c for _, c in tables]).reshape(sh[0], 7, 4)
+        else:
+            breaks, coeffs = phase_tables(plans, q0, q1, v0, v1, j_max)
+        tr = Trajectory(breaks, coeffs, time=plans["T"][max_displacement_id])
 
-        max_displacement_params =\
-            self.__plan_trajectory_1D(*task_list[:, max_displacement_id], T=t)
+        if details is not None:
+            details["construction"] += time.perf_counter() - start
 
-        self.__put_params(trajectory_params,
-                          max_displacement_params,
-                          max_displacement_id)
+        return tr
+
+    def plan_trajectories(self, moves):
+        """
+        Plan several trajectories at once
 
-        max_displacement_time = self.__get_dof_time(trajectory_params,
-                                                    max_displacement_id)
-        T[max_displacement_id] = max_displacement_time
+        moves is a sequence of (q0, q1, v0, v1, v_max, a_max, j_max, t)
+            tuples holding the arguments of plan_trajectory. The DOFs of all
+            moves are planned with two plan_batch calls in total, the cache
+            and instrumentation are not used.
 
-        for _q0, _q1, _v0, _v1, ii in zip(q0, q1, v0, v1, range(ndof)):
-            if ii == max_displacement_id:
+        returns list with the Trajectory of every move, or the exception
+            (PlanningError, ValueError) plan_trajectory would raise
+        """
+        results = [None]*len(moves)
+        valid = []
+        for i, move in enumerate(moves):
+            try:
+                q0, q1, v0, v1, v_max, a_max, j_max, t = move
+                sh = self._check_shape(q0, q1, v0, v1)
+                if not sh[0]:
+                    raise ValueError("At least one DOF is required")
+
+                arrays = [np.asarray(x, dtype=np.float64).reshape(sh)
+                          for x in (q0, q1, v0, v1)] +\
+                    [np.broadcast_to(np.asarray(x, np.float64), sh)
+                     for x in (v_max, a_max, j_max)]
+                t = np.nan if t is None else float(t)
+            except (TypeError, ValueError) as e:
+                results[i] = e
                 continue
 
-            planning_logger.info("Computing %d DOF trajectory" % ii)
+            valid.append((i, arrays, t))
+
+        if not valid:
+            return results
+
+        sizes = [len(arrays[0]) for _, arrays, _ in valid]
+        bounds = np.cumsum([0] + sizes)
+        args = [np.concatenate([arrays[k] for _, arrays, _ in valid])
+                for k in range(7)]
+        q0, q1, v0, v1, v_max, a_max, j_max = args
+        move = np.repeat(np.arange(len(valid)), sizes)
+        t = np.asarray([t for _, _, t in valid])
+        fixed = np.isfinite(t)
+
+        # Reference DOF and synchronized DOFs of every move as in
+        # plan_trajectory
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.abs(q1 - q0)/np.abs(v_max)
+        ref = np.asarray([lo + np.argmax(ratio[lo:hi])
+                          for lo, hi in zip(bounds[:-1], bounds[1:])])
+        synchronized = v1 != 0
+        synchronized[ref] = fixed
+
+        plans = np.zeros(len(q0), dtype=PLAN_DTYPE)
+        free = ~synchronized
+        plans[free] = plan_batch(*[x[free] for x in args],
+                                 dt_thresh=self.dt_thresh,
+                                 max_iter=self.max_iter)
+
+        T = np.where(fixed, t, plans["T"][ref])
+        if synchronized.any():
+            plans[synchronized] = plan_batch(
+                *[x[synchronized] for x in args],
+                T=T[move[synchronized]], dt_thresh=self.dt_thresh,
+                max_iter=self.max_iter)
+
+        self._search_iterations = int(plans["iterations"].max())
+        breaks, coeffs = phase_tables(plans, q0, q1, v0, v1, j_max)
+
+        for j, (i, _, _) in enumerate(valid):
+            lo, hi = bounds[j], bounds[j + 1]
+            status = plans["status"][lo:hi]
+            failed = (status != STATUS_OK) & free[lo:hi]
+            if not failed.any():
+                failed = status != STATUS_OK
+            if failed.any():
+                k = np.argmax(failed)
+                results[i] = _planning_error(status[k],
+                                             synchronized[lo + k])
+            else:
+                results[i] = Trajectory(breaks[lo:hi], coeffs[lo:hi],
+                                        time=plans["T"][ref[j]])
 
-            # In case if final velocity is non-zero
-            # We need to synchronize it in time with the trajectory with
-            # the longest execution time
-            if _v1 != 0:
-                traj_params =\
-                    self.__plan_trajectory_1D(_q0, _q1, _v0, _v1, v_max,
-                                              a_max, j_max,
-                                              T=max_displacement_time)
+        return results
 
-            # if final velocity is zero we do not need to worry about
-            # syncronization
-            else:
-                traj_params = self.__plan_trajectory_1D(_q0, _q1, _v0, _v1,
-                                                        v_max, a_max, j_max)
+    def plan_batch(self, q0, q1, v0, v1, v_max, a_max, j_max, t=None):
+        """
+        Plan many independent 1-D moves with one call
 
-            T[ii] = Ta[ii] + Td[ii] + Tv[ii]
-            self.__put_params(trajectory_params, traj_params, ii)
+        All parameters may be arrays (or scalars shared by all moves). Phase
+            durations are computed with masked array operations instead of
+            one Python call per move.
 
-        # Getting trajectory functions
-        for dof in range(ndof):
-            tr_func = self.__get_trajectory_function(q0[dof], q1[dof],
-                                                     v0[dof], v1[dof], v_max,
-                                                     a_max, j_max,
-                                                     *trajectory_params[:, dof])
-            trajectory_funcs.append(tr_func)
+        returns structured array with fields Tj1, Ta, Tj2, Td, Tv, T and
+            status, see pyscurve.batch for the status codes
+        """
+        return plan_batch(q0, q1, v0, v1, v_max, a_max, j_max, T=t,
+                          dt_thresh=self.dt_thresh, max_iter=self.max_iter)
 
-        tr = Trajectory()
-        tr.time = (T[max_displacement_id],)
-        tr.trajectory = trajectory_funcs
-        tr.dof = ndof
+    def plan_sequence(self, waypoints, v_max, a_max, j_max, v_start=0,
+                      v_end=0, synchronize=True):
+        """
+        Plan trajectory through waypoints with shape (N,) or (N, dof)
+            without stopping at them, see pyscurve.sequence
 
-        return tr
+        returns Trajectory made of N - 1 s-curve moves per DOF
+        """
+        return plan_sequence(waypoints, v_max, a_max, j_max, v_start=v_start,
+                             v_end=v_end, synchronize=synchronize,
+                             dt_thresh=self.dt_thresh, max_iter=self.max_iter)
+
+    def replan(self, q, v, a, q1, v1, v_max, a_max, j_max,
+               max_iter=REPLAN_MAX_ITER):
+        """
+        Plan jerk limited continuation from the current state (q, v, a) to
+            q1 with speed v1 with a bounded number of search evaluations,
+            see pyscurve.replan
+
+        returns Trajectory starting at time zero
+        """
+        return replan(q, v, a, q1, v1, v_max, a_max, j_max,
+                      dt_thresh=self.dt_thresh, max_iter=max_iter)
+
+
+def _planning_error(status, fixed_time):
+    """
+    PlanningError describing a plan_batch status code
+    """
+    if status == STATUS_INFEASIBLE:
+        return PlanningError("Trajectory is not feasible")
+    elif status == STATUS_INVALID:
+        return PlanningError("Invalid trajectory parameters")
+    elif not fixed_time:
+        return PlanningError("Trajectory is infeasible")
+    else:
+        return PlanningError("Failed to find appropriate a_max")
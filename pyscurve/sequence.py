@@ -0,0 +1,204 @@
+import numpy as np
+from .trajectory import Trajectory, PlanningError
+from .batch import plan_batch, phase_tables, PLAN_DTYPE, STATUS_OK
+from .batch import STATUS_INFEASIBLE, SEARCH_DT_THRESH, SEARCH_MAX_ITER
+
+
+# Hand-off speed changes are kept this much below the reachable ones so the
+# segments stay strictly feasible
+HANDOFF_MARGIN = 1e-3
+
+# Failed segments halve their hand-off speeds at most this many times, below
+# HANDOFF_MIN*v_max they are set to zero
+HANDOFF_ROUNDS = 16
+HANDOFF_MIN = 1e-3
+
+
+def reachable_speed(v0, dq, a_max, j_max):
+    """
+    Highest speed reachable from speed v0 >= 0 within distance dq >= 0 when
+    accelerating with a jerk limited profile which starts and ends with zero
+    acceleration. Works elementwise on arrays.
+
+    If a_max is not reached the time Tj of the jerk phases solves
+        j_max*Tj**3 + 2*v0*Tj - dq = 0
+    which has a single real root (Cardano), otherwise the speed solves
+        v**2 + v*a_max**2/j_max - v0**2 + v0*a_max**2/j_max - 2*a_max*dq = 0
+    """
+    v0, dq, a_max, j_max = np.broadcast_arrays(
+        *[np.asarray(x, dtype=np.float64) for x in (v0, dq, a_max, j_max)])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = 2*v0/j_max
+        q = -dq/j_max
+        u = np.cbrt(-q/2 + np.sqrt((q/2)**2 + (p/3)**3))
+        Tj = np.where(u > 0, u - p/(3*u), 0)
+        v_not_reached = v0 + j_max*Tj**2
+
+        b = a_max**2/j_max
+        v_reached = (np.sqrt(b**2 + 4*(v0**2 - v0*b + 2*a_max*dq)) - b)/2
+
+    return np.where(v_not_reached - v0 <= b, v_not_reached, v_reached)
+
+
+def handoff_velocities(waypoints, v_max, a_max, j_max, v_start=0, v_end=0):
+    """
+    Computes velocities at the waypoints of a (N, dof) path.
+
+    The robot keeps moving through a waypoint only if both adjacent segments
+    go in the same direction. A forward pass limits every speed to the speed
+    reachable from the previous waypoint, a backward pass to the speed from
+    which the next waypoint can still be reached, so every segment can be
+    planned without exceeding the limits.
+    """
+    d = np.diff(waypoints, axis=0)
+    direction = np.sign(d)
+    dq = np.abs(d)
+    n = len(waypoints)
+
+    v_max, a_max, j_max = [np.abs(x) for x in (v_max, a_max, j_max)]
+
+    def reachable(v, dq):
+        return v + (1 - HANDOFF_MARGIN)*(
+            reachable_speed(v, dq, a_max, j_max) - v)
+
+    # Speeds in the direction of motion of the adjacent segments
+    cap = np.zeros(waypoints.shape)
+    cap[1:-1] = np.where((direction[:-1] == direction[1:]) &
+                         (direction[1:] != 0), v_max, 0)
+    speed = np.zeros(waypoints.shape)
+    speed[0] = np.maximum(v_start*direction[0], 0)
+    speed[-1] = np.maximum(v_end*direction[-1], 0)
+
+    for i in range(1, n - 1):
+        speed[i] = np.minimum(cap[i], reachable(speed[i - 1], dq[i - 1]))
+
+    for i in range(n - 2, 0, -1):
+        speed[i] = np.minimum(speed[i], reachable(speed[i + 1], dq[i]))
+
+    v = np.empty(waypoints.shape)
+    v[0] = v_start
+    v[-1] = v_end
+    v[1:-1] = speed[1:-1]*direction[1:]
+
+    return v
+
+
+def plan_sequence(waypoints, v_max, a_max, j_max, v_start=0, v_end=0,
+                  synchronize=True, dt_thresh=SEARCH_DT_THRESH,
+                  max_iter=SEARCH_MAX_ITER):
+    """
+    Plans a trajectory through a list of waypoints without stopping at them.
+
+    waypoints has shape (N,) or (N, dof), limits and boundary velocities are
+    scalars or have one value per DOF. Hand-off velocities are computed by
+    handoff_velocities and all segments are planned with one plan_batch
+    call. Segments which can not be planned halve their hand-off velocities
+    and are planned again. With synchronize=True the faster DOFs of every
+    segment are planned again with plan_batch and the time of the slowest
+    one, so all of them pass a waypoint together.
+
+    Returns Trajectory with 7*(N - 1) phases per DOF. Its plans property
+    holds the (dof, N - 1) segment plans. The cost is linear in N.
+    """
+    waypoints = np.asarray(waypoints, dtype=np.float64)
+    if waypoints.ndim == 1:
+        waypoints = waypoints[:, None]
+
+    if waypoints.ndim != 2 or len(waypoints) < 2:
+        raise ValueError("At least two waypoints are required")
+
+    dof = waypoints.shape[1]
+    v_max, a_max, j_max, v_start, v_end = [
+        np.broadcast_to(np.asarray(x, dtype=np.float64), (dof,))
+        for x in (v_max, a_max, j_max, v_start, v_end)]
+
+    q0, q1 = waypoints[:-1], waypoints[1:]
+    still = q0 == q1
+    v = handoff_velocities(waypoints, v_max, a_max, j_max, v_start, v_end)
+
+    plans = np.zeros(q0.shape, dtype=PLAN_DTYPE)
+    rows = np.arange(len(q0))
+    for _ in range(HANDOFF_ROUNDS + 1):
+        # Only segments next to changed hand-off velocities are planned again
+        p = plan_batch(q0[rows], q1[rows], v[rows], v[rows + 1], v_max,
+                       a_max, j_max, dt_thresh=dt_thresh, max_iter=max_iter)
+
+        # Standing still is planned as a zero length cruise
+        s = still[rows]
+        p[s] = 0
+        p["status"][s & ((v[rows] != 0) | (v[rows + 1] != 0))] =\
+            STATUS_INFEASIBLE
+
+        if synchronize and dof > 1:
+            _synchronize(p, q0[rows], q1[rows], v[rows], v[rows + 1],
+                         v_max, a_max, j_max, s, dt_thresh, max_iter)
+        plans[rows] = p
+
+        failed = plans["status"] != STATUS_OK
+        if not failed.any():
+            break
+
+        # Slow down at both ends of the failed segments
+        slow = np.zeros(v.shape, dtype=bool)
+        slow[:-1] |= failed
+        slow[1:] |= failed
+        slow[0] = slow[-1] = False
+        if not slow.any():
+            break
+
+        v[slow] *= 0.5
+        v[slow & (np.abs(v) < HANDOFF_MIN*v_max)] = 0
+
+        slow = slow.any(axis=1)
+        rows = np.flatnonzero(slow[:-1] | slow[1:])
+
+    if failed.any():
+        segment, axis = np.argwhere(failed)[0]
+        raise PlanningError("Failed to plan segment %d of DOF %d" %
+                            (segment, axis))
+
+    breaks, coeffs = phase_tables(plans.T, q0.T, q1.T, v[:-1].T, v[1:].T,
+                                  j_max[:, None])
+    return concatenate_phases(breaks.reshape(dof, -1, 8),
+                              coeffs.reshape(dof, -1, 7, 4))
+
+
+def _synchronize(plans, q0, q1, v0, v1, v_max, a_max, j_max, still,
+                 dt_thresh, max_iter):
+    """
+    Stretches every segment of every DOF to the duration of the slowest DOF
+    """
+    T = plans["T"].max(axis=1, keepdims=True)
+    short = (plans["T"] < T - dt_thresh) & (plans["status"] == STATUS_OK)
+
+    plans["Tv"][still] = np.broadcast_to(T, still.shape)[still]
+    plans["T"][still] = plans["Tv"][still]
+    short &= ~still
+
+    if short.any():
+        seg, axis = np.nonzero(short)
+        plans[seg, axis] = plan_batch(q0[seg, axis], q1[seg, axis],
+                                      v0[seg, axis], v1[seg, axis],
+                                      v_max[axis], a_max[axis], j_max[axis],
+                                      T=T[seg, 0], dt_thresh=dt_thresh,
+                                      max_iter=max_iter)
+
+
+def concatenate_phases(breaks, coeffs):
+    """
+    Chains the phase tables of consecutive moves into one Trajectory.
+
+    breaks has shape (dof, moves, P + 1) and coeffs (dof, moves, P, 4), each
+    move starting at time zero. Every move is shifted to start at the end
+    of the previous one.
+    """
+    dof, moves = breaks.shape[:2]
+    duration = breaks[..., -1] - breaks[..., 0]
+    start = np.cumsum(duration, axis=1) - duration
+
+    shifted = breaks[..., :-1] - breaks[..., :1] + start[..., None]
+    end = (start[:, -1] + duration[:, -1])[:, None]
+
+    return Trajectory(np.concatenate([shifted.reshape(dof, -1), end], axis=1),
+                      coeffs.reshape(dof, -1, 4))
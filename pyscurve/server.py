@@ -0,0 +1,373 @@
+"""
+Local planning service, run with python -m pyscurve.server.
+
+Clients connect to a Unix domain socket or a localhost TCP port and send
+JSON lines holding the arguments of ScurvePlanner.plan_trajectory (the
+MOVE_FIELDS, q0, q1, v0 and v1 are lists with one value per DOF, v0, v1
+and t are optional) and an id that is copied into the answer. Requests
+arriving within window seconds of the first queued one are planned
+together with ScurvePlanner.plan_trajectories, so concurrent callers
+share the vectorized planning cost.
+
+Every request is answered with the phase table of its trajectory,
+{"id", "time", "breaks", "coeffs"} (see Trajectory), or {"id", "error"}.
+Answers on one connection may be out of order when requests are
+pipelined. The line {"op": "stats"} is answered with the statistics of
+the server: queue depth, batch sizes and latency percentiles.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from .scurve import ScurvePlanner
+from .trajectory import Trajectory, PlanningError
+
+
+MOVE_FIELDS = ("q0", "q1", "v0", "v1", "v_max", "a_max", "j_max", "t")
+
+# Seconds to wait for more requests after the first one of a batch
+BATCH_WINDOW = 0.002
+
+# Most requests planned in one batch
+BATCH_MAX = 1024
+
+# Number of batches and requests kept for the statistics
+STATS_HISTORY = 4096
+
+LATENCY_PERCENTILES = (50, 95, 99)
+
+# Longest accepted request line in bytes
+LINE_LIMIT = 1 << 20
+
+# Pending connections, many controllers may connect at the same time
+BACKLOG = 1024
+
+
+def _move(request):
+    """
+    plan_trajectory arguments of a request, missing speeds are zero
+    """
+    for name in ("q0", "q1", "v0", "v1"):
+        if not isinstance(request.get(name, []), list):
+            raise TypeError("%s must be a list with one value per DOF" %
+                            name)
+
+    q0 = request["q0"]
+    zeros = [0.0]*len(q0)
+    return (q0, request["q1"], request.get("v0", zeros),
+            request.get("v1", zeros), request["v_max"], request["a_max"],
+            request["j_max"], request.get("t"))
+
+
+def _answer(result):
+    """
+    Answer of a plan_trajectories result
+    """
+    if isinstance(result, Exception):
+        return {"error": str(result)}
+
+    return {"time": float(result.time[0]),
+            "breaks": result.breaks.tolist(),
+            "coeffs": result.coeffs.tolist()}
+
+
+class PlanningServer(object):
+    """
+    asyncio planning service with micro-batching.
+
+    The batches are planned one at a time in a worker thread, so the event
+    loop keeps accepting requests (which form the next batch) while a batch
+    is planned. The planner is only used from that thread.
+    """
+
+    def __init__(self, planner=None, window=BATCH_WINDOW,
+                 max_batch=BATCH_MAX, history=STATS_HISTORY):
+        self._planner = planner or ScurvePlanner()
+        self._window = window
+        self._max_batch = max_batch
+
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._queue = None
+        self._server = None
+        self._batcher = None
+        self._address = None
+
+        self._requests = 0
+        self._batches = 0
+        self._errors = 0
+        self._batch_sizes = deque(maxlen=history)
+        self._latencies = deque(maxlen=history)
+
+    @property
+    def address(self):
+        """
+        Socket path or (host, port) the server listens on
+        """
+        return self._address
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self, path=None, host="127.0.0.1", port=0):
+        """
+        Listens on the Unix domain socket path, or on host:port when no
+        path is given (port 0 picks a free port, see address)
+        """
+        self._queue = asyncio.Queue()
+        if path is not None:
+            self._server = await asyncio.start_unix_server(
+                self.__handle, path=path, limit=LINE_LIMIT,
+                backlog=BACKLOG)
+            self._address = path
+        else:
+            self._server = await asyncio.start_server(
+                self.__handle, host=host, port=port, limit=LINE_LIMIT,
+                backlog=BACKLOG)
+            self._address = self._server.sockets[0].getsockname()[:2]
+
+        self._batcher = asyncio.ensure_future(self.__plan_batches())
+        return self
+
+    def close(self):
+        self._server.close()
+        self._batcher.cancel()
+
+    async def wait_closed(self):
+        await self._server.wait_closed()
+        try:
+            await self._batcher
+        except asyncio.CancelledError:
+            pass
+
+        self._executor.shutdown()
+        if isinstance(self._address, str) and os.path.exists(self._address):
+            os.unlink(self._address)
+
+    async def serve_forever(self):
+        try:
+            await self._server.serve_forever()
+        finally:
+            self.close()
+            await self.wait_closed()
+
+    def stats(self):
+        """
+        Queue depth, request, batch and error counts, batch size summary
+        and latency percentiles in seconds of the last requests
+        """
+        sizes = np.asarray(self._batch_sizes)
+        latencies = np.asarray(self._latencies)
+
+        stats = {"queue_depth": self.queue_depth,
+                 "requests": self._requests,
+                 "batches": self._batches,
+                 "errors": self._errors,
+                 "batch_size": {"mean": float(sizes.mean()) if len(sizes)
+                                else 0.0,
+                                "max": int(sizes.max(initial=0))},
+                 "latency": {}}
+
+        if len(latencies):
+            values = np.percentile(latencies, LATENCY_PERCENTILES)
+            stats["latency"] = {"p%d" % p: float(v)
+                                for p, v in zip(LATENCY_PERCENTILES, values)}
+
+        return stats
+
+    def __plan(self, moves):
+        return [_answer(result)
+                for result in self._planner.plan_trajectories(moves)]
+
+    async def __plan_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            await asyncio.sleep(self._window)
+            while len(batch) < self._max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            try:
+                answers = await loop.run_in_executor(
+                    self._executor, self.__plan,
+                    [move for move, _, _ in batch])
+            except Exception as e:
+                answers = [{"error": str(e)}]*len(batch)
+
+            done = time.perf_counter()
+            self._batches += 1
+            self._batch_sizes.append(len(batch))
+            for (_, future, received), answer in zip(batch, answers):
+                self._latencies.append(done - received)
+                if not future.done():
+                    future.set_result(answer)
+
+    async def __answer(self, line):
+        request = {}
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise TypeError("expected a JSON object")
+            if request.get("op") == "stats":
+                answer = self.stats()
+            else:
+                self._requests += 1
+                future = asyncio.get_running_loop().create_future()
+                self._queue.put_nowait((_move(request), future,
+                                        time.perf_counter()))
+                answer = await future
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            answer = {"error": "Invalid request: %s" % e}
+
+        if "error" in answer:
+            self._errors += 1
+        if isinstance(request, dict) and "id" in request:
+            answer = dict(answer, id=request["id"])
+
+        return (json.dumps(answer) + "\n").encode()
+
+    async def __handle(self, reader, writer):
+        # Every line is answered by its own task, so the requests pipelined
+        # on one connection can join the same batch
+        pending = set()
+
+        async def respond(line):
+            writer.write(await self.__answer(line))
+            await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    task = asyncio.ensure_future(respond(line))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            for task in pending:
+                task.cancel()
+            writer.close()
+
+
+class PlanningClient(object):
+    """
+    Blocking client of a PlanningServer sending one request at a time
+    """
+
+    def __init__(self, path=None, host="127.0.0.1", port=None,
+                 timeout=None):
+        if path is not None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(timeout)
+            sock.connect(path)
+        else:
+            sock = socket.create_connection((host, port), timeout=timeout)
+
+        self._sock = sock
+        self._file = sock.makefile("rwb")
+        self._id = 0
+
+    def request(self, message):
+        """
+        Sends a JSON message and returns the decoded answer
+        """
+        self._file.write((json.dumps(message) + "\n").encode())
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("Planning server closed the connection")
+        return json.loads(line)
+
+    def plan(self, q0, q1, v0, v1, v_max, a_max, j_max, t=None):
+        """
+        Plans like ScurvePlanner.plan_trajectory on the server
+
+        returns Trajectory
+        """
+        self._id += 1
+        message = dict(zip(MOVE_FIELDS, (q0, q1, v0, v1, v_max, a_max,
+                                         j_max, t)), id=self._id)
+        message = {k: np.asarray(v).tolist() for k, v in message.items()
+                   if v is not None}
+
+        answer = self.request(message)
+        if "error" in answer:
+            raise PlanningError(answer["error"])
+
+        return Trajectory(np.asarray(answer["breaks"], dtype=np.float64),
+                          np.asarray(answer["coeffs"], dtype=np.float64),
+                          time=answer["time"])
+
+    def stats(self):
+        return self.request({"op": "stats"})
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m pyscurve.server",
+        description="Serves s-curve plans to local clients over JSON lines")
+    parser.add_argument("--unix", metavar="PATH",
+                        help="listen on a Unix domain socket")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="TCP address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=0,
+                        help="TCP port (default: any free port)")
+    parser.add_argument("--window", type=float, default=BATCH_WINDOW,
+                        help="seconds to gather a batch (default: %g)" %
+                             BATCH_WINDOW)
+    parser.add_argument("--max-batch", type=int, default=BATCH_MAX,
+                        help="requests per batch (default: %d)" % BATCH_MAX)
+    parser.add_argument("--dt-thresh", type=float,
+                        help="search time tolerance in seconds")
+    parser.add_argument("--max-iter", type=int,
+                        help="search evaluations per move")
+    args = parser.parse_args(argv)
+
+    if args.window < 0 or args.max_batch < 1:
+        parser.error("window must not be negative and max-batch positive")
+
+    planner_kwargs = {}
+    if args.dt_thresh is not None:
+        planner_kwargs["dt_thresh"] = args.dt_thresh
+    if args.max_iter is not None:
+        planner_kwargs["max_iter"] = args.max_iter
+
+    async def serve():
+        server = PlanningServer(ScurvePlanner(**planner_kwargs),
+                                args.window, args.max_batch)
+        await server.start(args.unix, args.host, args.port)
+        sys.stderr.write("Planning server listening on %s\n" %
+                         (server.address,))
+        await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
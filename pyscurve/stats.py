@@ -0,0 +1,146 @@
+import numpy as np
+from .batch import STATUS_OK
+
+
+STATS_FIELDS = ("total_time",
+                "peak_velocity",
+                "peak_acceleration",
+                "peak_deceleration",
+                "time_at_max_velocity",
+                "time_at_max_acceleration",
+                "time_at_max_deceleration",
+                "time_at_max_jerk",
+                "time_at_min_jerk",
+                "rms_acceleration",
+                "rms_jerk")
+
+
+class TrajectoryStats(object):
+    """
+    Closed-form statistics of planned s-curve moves.
+
+    Everything is computed from the phase durations of the plans (as
+    returned by plan_batch or kept in Trajectory.plans) without sampling,
+    so it costs O(1) per move and works on whole batches at once. All
+    parameters are broadcast against each other.
+
+    Values are given relative to the direction of motion: acceleration
+    means speeding up towards q1, deceleration slowing down. A move dwells
+    at a limit if its peak is within rtol of that limit. Moves which were
+    not planned successfully get NaN everywhere.
+    """
+
+    def __init__(self, plans, q0, q1, v0, v1, v_max, a_max, j_max,
+                 rtol=1e-3):
+        plans = np.asarray(plans)
+        s = np.sign(np.subtract(q1, q0))
+        v0 = s*np.asarray(v0, dtype=np.float64)
+        j_max = np.abs(np.asarray(j_max, dtype=np.float64))
+
+        Tj1, Ta = plans["Tj1"], plans["Ta"]
+        Tj2, Td = plans["Tj2"], plans["Td"]
+        Tv, T = plans["Tv"], plans["T"]
+        ok = plans["status"] == STATUS_OK
+
+        a_lim_a = j_max*Tj1
+        a_lim_d = j_max*Tj2
+        v_lim = v0 + (Ta - Tj1)*a_lim_a
+
+        at_v_max = v_lim >= np.abs(v_max)*(1 - rtol)
+        at_a_max = a_lim_a >= np.abs(a_max)*(1 - rtol)
+        at_a_min = a_lim_d >= np.abs(a_max)*(1 - rtol)
+
+        # Acceleration ramps contribute a^2*Tj/3 each, plateaus a^2*duration
+        int_a2 = (a_lim_a**2)*(Ta - 2*Tj1 + 2*Tj1/3) +\
+            (a_lim_d**2)*(Td - 2*Tj2 + 2*Tj2/3)
+        int_j2 = (j_max**2)*2*(Tj1 + Tj2)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = (T,
+                      v_lim,
+                      a_lim_a,
+                      a_lim_d,
+                      np.where(at_v_max, Tv, 0),
+                      np.where(at_a_max, Ta - 2*Tj1, 0),
+                      np.where(at_a_min, Td - 2*Tj2, 0),
+                      Tj1 + Tj2,
+                      Tj1 + Tj2,
+                      np.sqrt(int_a2/T),
+                      np.sqrt(int_j2/T))
+
+        for name, value in zip(STATS_FIELDS, values):
+            value = np.where(ok, value, np.nan)
+            setattr(self, "_" + name, value)
+
+    @property
+    def total_time(self):
+        return self._total_time
+
+    @property
+    def peak_velocity(self):
+        """
+        Highest speed towards q1, reached at the end of the acceleration
+        """
+        return self._peak_velocity
+
+    @property
+    def peak_acceleration(self):
+        return self._peak_acceleration
+
+    @property
+    def peak_deceleration(self):
+        return self._peak_deceleration
+
+    @property
+    def time_at_max_velocity(self):
+        return self._time_at_max_velocity
+
+    @property
+    def time_at_max_acceleration(self):
+        return self._time_at_max_acceleration
+
+    @property
+    def time_at_max_deceleration(self):
+        return self._time_at_max_deceleration
+
+    @property
+    def time_at_max_jerk(self):
+        """
+        Time spent at +j_max (relative to the direction of motion)
+        """
+        return self._time_at_max_jerk
+
+    @property
+    def time_at_min_jerk(self):
+        """
+        Time spent at -j_max (relative to the direction of motion)
+        """
+        return self._time_at_min_jerk
+
+    @property
+    def rms_acceleration(self):
+        return self._rms_acceleration
+
+    @property
+    def rms_jerk(self):
+        return self._rms_jerk
+
+    def percent(self, dwell_time):
+        """
+        Returns dwell time as a percentage of the total time
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return 100*np.asarray(dwell_time)/self._total_time
+
+    def to_records(self):
+        """
+        Returns all statistics as a structured array
+        """
+        values = [np.asarray(getattr(self, name)) for name in STATS_FIELDS]
+        shape = np.broadcast_shapes(*[v.shape for v in values])
+        records = np.zeros(shape, dtype=[(name, np.float64)
+                                         for name in STATS_FIELDS])
+        for name, value in zip(STATS_FIELDS, values):
+            records[name] = value
+
+        return records
@@ -0,0 +1,178 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import numpy as np
+from .scurve import ScurvePlanner
+from .stats import TrajectoryStats, STATS_FIELDS
+
+
+SWEEP_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+SHARD_NAME = "shard_%06d.npz"
+
+# Grid axes in the order of the flat row index, moves vary slowest
+GRID_AXES = ("move", "v_max", "a_max", "j_max")
+COLUMNS = GRID_AXES + ("status",) + STATS_FIELDS
+
+# Parameters of the current sweep in a worker process
+_worker = {}
+
+
+def _init_worker(moves, grids, planner_kwargs):
+    _worker["moves"] = moves
+    _worker["grids"] = grids
+    _worker["planner"] = ScurvePlanner(**planner_kwargs)
+
+
+def _run_shard(shard, start, stop, path):
+    """
+    Plans rows start...stop of the grid and writes them into path
+    """
+    moves, grids = _worker["moves"], _worker["grids"]
+    shape = (len(moves),) + tuple(len(g) for g in grids)
+    move, iv, ia, ij = np.unravel_index(np.arange(start, stop), shape)
+
+    q0, q1, v0, v1 = moves[move].T
+    v_max, a_max, j_max = grids[0][iv], grids[1][ia], grids[2][ij]
+
+    plans = _worker["planner"].plan_batch(q0, q1, v0, v1,
+                                          v_max, a_max, j_max)
+    stats = TrajectoryStats(plans, q0, q1, v0, v1, v_max, a_max, j_max)
+
+    columns = {"move": move, "v_max": v_max, "a_max": a_max,
+               "j_max": j_max, "status": plans["status"]}
+    for name in STATS_FIELDS:
+        columns[name] = getattr(stats, name)
+
+    # Shards only appear once completely written, so a resumed sweep never
+    # reads a partial one
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, **columns)
+    os.replace(tmp, path)
+
+    return shard, stop - start
+
+
+def sweep(moves, v_max, a_max, j_max, out_dir, shard_size=65536,
+          workers=None, progress=None, resume=True, dt_thresh=None,
+          max_iter=None):
+    """
+    Plans every move for every combination of the v_max, a_max and j_max
+    values and stores the statistics of the planned moves in out_dir.
+
+    moves is a sequence of (q0, q1, v0, v1) tuples. The grid is split into
+    shards of shard_size rows which are planned by a pool of worker
+    processes (or in this process if workers is 0) and written as
+    shard_NNNNNN.npz files with one column per name in COLUMNS next to a
+    manifest.json describing the sweep. With resume=True shards found in
+    out_dir are kept, so an interrupted sweep continues where it stopped.
+
+    progress is called as progress(rows_done, rows_total) after every
+    shard. Returns the manifest, use load_sweep to read the results.
+    """
+    moves = np.atleast_2d(np.asarray(moves, dtype=np.float64))
+    if moves.shape[1] != 4:
+        raise ValueError("Moves must be given as (q0, q1, v0, v1)")
+
+    grids = tuple(np.atleast_1d(np.asarray(g, dtype=np.float64)).ravel()
+                  for g in (v_max, a_max, j_max))
+    total = len(moves)*int(np.prod([len(g) for g in grids]))
+    shards = -(-total//shard_size)
+
+    planner_kwargs = {}
+    if dt_thresh is not None:
+        planner_kwargs["dt_thresh"] = dt_thresh
+    if max_iter is not None:
+        planner_kwargs["max_iter"] = max_iter
+
+    manifest = {"version": SWEEP_VERSION,
+                "columns": list(COLUMNS),
+                "moves": moves.tolist(),
+                "v_max": grids[0].tolist(),
+                "a_max": grids[1].tolist(),
+                "j_max": grids[2].tolist(),
+                "planner": planner_kwargs,
+                "rows": total,
+                "shard_size": shard_size,
+                "shards": shards}
+
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    if resume and os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            if json.load(f) != manifest:
+                raise ValueError("%s holds a sweep with different parameters"
+                                 % out_dir)
+    else:
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f)
+
+    todo = []
+    done = 0
+    for shard in range(shards):
+        start = shard*shard_size
+        stop = min(start + shard_size, total)
+        path = os.path.join(out_dir, SHARD_NAME % shard)
+        if resume and os.path.exists(path):
+            done += stop - start
+        else:
+            todo.append((shard, start, stop, path))
+
+    if progress is not None:
+        progress(done, total)
+
+    if workers == 0:
+        _init_worker(moves, grids, planner_kwargs)
+        for task in todo:
+            done += _run_shard(*task)[1]
+            if progress is not None:
+                progress(done, total)
+        return manifest
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(moves, grids, planner_kwargs)) as pool:
+        # Keep a couple of shards per worker in flight
+        limit = 2*workers
+        todo = iter(todo)
+        pending = set()
+        while True:
+            for task in todo:
+                pending.add(pool.submit(_run_shard, *task))
+                if len(pending) >= limit:
+                    break
+
+            if not pending:
+                break
+
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                done += future.result()[1]
+                if progress is not None:
+                    progress(done, total)
+
+    return manifest
+
+
+def load_sweep(out_dir, columns=None):
+    """
+    Reads the results of a sweep into a dictionary of column arrays in row
+    order. Shards which were not written yet are skipped.
+    """
+    with open(os.path.join(out_dir, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+
+    columns = manifest["columns"] if columns is None else list(columns)
+    parts = {name: [] for name in columns}
+    for shard in range(manifest["shards"]):
+        path = os.path.join(out_dir, SHARD_NAME % shard)
+        if not os.path.exists(path):
+            continue
+
+        with np.load(path) as data:
+            for name in columns:
+                parts[name].append(data[name])
+
+    return {name: np.concatenate(p) if p else np.zeros(0)
+            for name, p in parts.items()}
@@ -0,0 +1,142 @@
+import json
+import time
+from collections import deque
+import numpy as np
+
+
+# Evaluated trajectory samples kept by a Tracer
+SAMPLE_DTYPE = np.dtype([("seq", np.int64),
+                         ("dof", np.int32),
+                         ("t", np.float64),
+                         ("acceleration", np.float64),
+                         ("speed", np.float64),
+                         ("position", np.float64)])
+
+# Tracer used by the planner and trajectories, None while tracing is off.
+# Call sites only compare it with None, so disabled tracing costs nothing
+tracer = None
+
+
+class Tracer(object):
+    """
+    Bounded in-memory record of trajectory samples and planning events.
+
+    Samples are written into a preallocated ring buffer of SAMPLE_DTYPE
+    records, events (planning steps with their parameters) into a bounded
+    deque. Both keep the most recent entries only, nothing is formatted
+    until the trace is dumped.
+    """
+
+    def __init__(self, samples=65536, events=4096):
+        self._samples = np.zeros(samples, dtype=SAMPLE_DTYPE)
+        self._events = deque(maxlen=events)
+        self._seq = 0
+        self._event_seq = 0
+
+    @property
+    def capacity(self):
+        return len(self._samples), self._events.maxlen
+
+    def samples(self, dof, t, points):
+        """
+        Records points[:, (ACCELERATION_ID, SPEED_ID, POSITION_ID)] of DOF
+        dof evaluated at times t
+        """
+        n = len(t)
+        size = len(self._samples)
+        if n > size:
+            t, points = t[-size:], points[-size:]
+            self._seq += n - size
+            n = size
+
+        idx = (self._seq + np.arange(n)) % size
+        rec = self._samples
+        rec["seq"][idx] = self._seq + np.arange(n)
+        rec["dof"][idx] = dof
+        rec["t"][idx] = t
+        rec["acceleration"][idx] = points[:, 0]
+        rec["speed"][idx] = points[:, 1]
+        rec["position"][idx] = points[:, 2]
+        self._seq += n
+
+    def event(self, kind, **fields):
+        """
+        Records a planning event, fields must be JSON serializable once
+        converted with float/int/list
+        """
+        self._events.append((self._event_seq, time.time(), kind, fields))
+        self._event_seq += 1
+
+    def get_samples(self):
+        """
+        Returns the kept samples in recording order
+        """
+        size = len(self._samples)
+        if self._seq <= size:
+            return self._samples[:self._seq].copy()
+
+        start = self._seq % size
+        return np.concatenate([self._samples[start:], self._samples[:start]])
+
+    def get_events(self):
+        """
+        Returns the kept events as dictionaries in recording order
+        """
+        return [dict(fields, seq=seq, time=t, kind=kind)
+                for seq, t, kind, fields in self._events]
+
+    def clear(self):
+        self._seq = 0
+        self._event_seq = 0
+        self._events.clear()
+
+    def dump_npz(self, fname):
+        """
+        Saves samples (one array per field) and events (as JSON lines) into
+        a .npz file
+        """
+        samples = self.get_samples()
+        arrays = {name: samples[name] for name in SAMPLE_DTYPE.names}
+        arrays["events"] = np.asarray(
+            [json.dumps(e, default=_to_json) for e in self.get_events()],
+            dtype=str)
+        np.savez(fname, **arrays)
+
+    def dump_jsonl(self, fname, samples=True):
+        """
+        Writes events and optionally samples as JSON lines
+        """
+        with open(fname, "w") as f:
+            for e in self.get_events():
+                f.write(json.dumps(e, default=_to_json) + "\n")
+
+            if samples:
+                for s in self.get_samples().tolist():
+                    f.write(json.dumps(dict(zip(SAMPLE_DTYPE.names, s),
+                                            kind="sample")) + "\n")
+
+
+def _to_json(x):
+    if isinstance(x, np.ndarray):
+        return x.tolist()
+    if isinstance(x, np.generic):
+        return x.item()
+    raise TypeError("%r is not JSON serializable" % (x,))
+
+
+def enable(samples=65536, events=4096):
+    """
+    Starts tracing into a new Tracer and returns it
+    """
+    global tracer
+    tracer = Tracer(samples, events)
+    return tracer
+
+
+def disable():
+    """
+    Stops tracing, returns the Tracer which was used
+    """
+    global tracer
+    old, tracer = tracer, None
+    return old
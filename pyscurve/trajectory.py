@@ -1,16 +1,30 @@
 import numpy as np
-import logging
-from matplotlib import pyplot as plt
+from . import tracing
 
 
 ACCELERATION_ID = 0
 SPEED_ID = 1
 POSITION_ID = 2
+JERK_ID = 3
 
 OPTIMIZER_THRESHOLD = 0.01
 EPSILON = 0.0001
 
-trajectory_logger = logging.getLogger("trajectory_logger")
+# Phase durations of a planned 1-D move
+PLAN_DTYPE = np.dtype([("Tj1", np.float64),
+                       ("Ta", np.float64),
+                       ("Tj2", np.float64),
+                       ("Td", np.float64),
+                       ("Tv", np.float64),
+                       ("T", np.float64),
+                       ("status", np.int8),
+                       ("iterations", np.int32)])
+
+# Per-move status codes of the status field in place of PlanningError
+STATUS_OK = 0
+STATUS_INFEASIBLE = 1
+STATUS_SEARCH_FAILED = 2
+STATUS_INVALID = 3
 
 
 class PlanningError(Exception):
@@ -20,13 +34,44 @@ class PlanningError(Exception):
 
 
 class Trajectory(object):
+    """
+    Piecewise cubic trajectory of one or more DOFs.
+
+    Every DOF consists of P phases. breaks[d] holds the P start times of
+    the phases followed by the end time of the motion and coeffs[d, k] the
+    coefficients c0..c3 of the position
+
+        q(t) = c0 + c1*tau + c2*tau**2 + c3*tau**3,  tau = t - breaks[d, k]
+
+    within phase k. Both are contiguous float64 arrays with shapes
+    (dof, P + 1) and (dof, P, 4), so a trajectory costs 40 bytes per phase.
+    Before the start and after the end of the motion every DOF stays in
+    its initial/final state with zero jerk.
+    """
+
+    __slots__ = ("_debug", "_breaks", "_coeffs", "_time", "_position_index")
+
+    def __init__(self, breaks=None, coeffs=None, *, time=None, debug=True):
+        if isinstance(breaks, bool):
+            raise TypeError("Trajectory takes breaks and coeffs, debug has "
+                            "to be passed as keyword")
+        if breaks is None:
+            breaks = np.zeros((0, 1))
+            coeffs = np.zeros((0, 0, 4))
+
+        self._breaks = np.ascontiguousarray(breaks, dtype=np.float64)
+        self._coeffs = np.ascontiguousarray(coeffs, dtype=np.float64)
+
+        if self._breaks.ndim != 2 or self._coeffs.shape !=\
+                self._breaks.shape[:1] + (self._breaks.shape[1] - 1, 4):
+            raise ValueError("Breaks and coefficients shapes do not match")
+
+        if time is None:
+            time = self._breaks[:, -1].max() if len(self._breaks) else 0
 
-    def __init__(self, debug=True):
         self._debug = debug
-        self._trajectory = None
-        self._time = 0
-        self._dof = 0
-        self._p_logged = 0
+        self._time = time
+        self._position_index = {}
 
     @property
     def debug(self):
@@ -38,86 +83,415 @@ class Trajectory(object):
 
     @property
     def time(self):
-        return self._time
+        return (self._time,)
 
     @time.setter
     def time(self, v):
-        self._time = v
+        self._time = v[0] if isinstance(v, tuple) else v
 
     @property
     def dof(self):
-        return self._dof
+        return self._breaks.shape[0]
 
-    @dof.setter
-    def dof(self, v):
-        self._dof = v
+    @property
+    def breaks(self):
+        return self._breaks
 
     @property
-    def trajectory(self):
-        return self._trajectory
-
-    @trajectory.setter
-    def trajectory(self, v):
-        self._trajectory = v
-
-    def __call__(self, time):
-        point = np.zeros((self.dof, 3), dtype=np.float32)
-        for t, dof in zip(self.trajectory, range(self.dof)):
-            dof_point = t(time)
-            np.put(point[dof], range(3), dof_point)
-
-            if self.debug:
-                trajectory_logger.debug(
-                    "DOF {} point number: {}: {}:{}:{}".format(dof,
-                                                               self._p_logged,
-                                                               *point[dof]))
-            self._p_logged += 1
+    def coeffs(self):
+        return self._coeffs
+
+    @property
+    def plans(self):
+        """
+        Phase durations of every DOF as a structured array with the fields
+        of PLAN_DTYPE. Only available for trajectories made of 7-phase
+        s-curve moves; with several moves per DOF the shape is (dof, moves)
+        """
+        dof, phases = self._coeffs.shape[:2]
+        if phases % 7:
+            raise ValueError("Trajectory does not consist of s-curve moves")
+
+        b = self._breaks[:, :-1].reshape(dof, -1, 7)
+        end = np.concatenate([b[:, 1:, 0], self._breaks[:, -1:]], axis=1)
+
+        plans = np.zeros(b.shape[:2], dtype=PLAN_DTYPE)
+        plans["Tj1"] = b[..., 1] - b[..., 0]
+        plans["Ta"] = b[..., 3] - b[..., 0]
+        plans["Tv"] = b[..., 4] - b[..., 3]
+        plans["Tj2"] = b[..., 5] - b[..., 4]
+        plans["Td"] = end - b[..., 4]
+        plans["T"] = end - b[..., 0]
+        plans["status"][np.isnan(self._coeffs[:, ::7, 0])] =\
+            STATUS_INFEASIBLE
+
+        return plans[:, 0] if plans.shape[1] == 1 else plans
+
+    def __len__(self):
+        return self.dof
+
+    def __getitem__(self, key):
+        """
+        Returns trajectory of the selected DOFs, e.g. tr[0] or tr[1:3]
+        """
+        if isinstance(key, (int, np.integer)):
+            key = slice(key, key + 1 if key != -1 else None)
+
+        return Trajectory(self._breaks[key], self._coeffs[key],
+                          time=self._time, debug=self._debug)
+
+    def to_arrays(self):
+        """
+        Returns dictionary of arrays describing the trajectory, see from_arrays
+        """
+        return {"breaks": self._breaks, "coeffs": self._coeffs,
+                "time": np.float64(self._time)}
+
+    @classmethod
+    def from_arrays(cls, breaks, coeffs, time=None, **kwargs):
+        return cls(breaks, coeffs, time=time, **kwargs)
+
+    def save(self, fname):
+        """
+        Saves trajectory into a .npz file
+        """
+        np.savez(fname, **self.to_arrays())
+
+    @classmethod
+    def load(cls, fname):
+        with np.load(fname) as data:
+            return cls.from_arrays(data["breaks"], data["coeffs"],
+                                   float(data["time"]))
+
+    def _evaluate(self, dof, t, out, jerk=False):
+        """
+        Fills out[:, ID] with the state of DOF dof at times t
+        """
+        breaks = self._breaks[dof]
+        tc = np.clip(t, breaks[0], breaks[-1])
+
+        # Phase of every time sample in one pass
+        k = np.searchsorted(breaks, tc, side='right') - 1
+        np.clip(k, 0, len(breaks) - 2, out=k)
+
+        tau = tc - breaks[k]
+        c0, c1, c2, c3 = self._coeffs[dof, k].T
+
+        out[:, POSITION_ID] = ((c3*tau + c2)*tau + c1)*tau + c0
+        out[:, SPEED_ID] = (3*c3*tau + 2*c2)*tau + c1
+        out[:, ACCELERATION_ID] = np.where(t < breaks[-1], 6*c3*tau + 2*c2, 0)
+        if jerk:
+            out[:, JERK_ID] = np.where((t >= breaks[0]) & (t < breaks[-1]),
+                                       6*c3, 0)
+
+    def stream(self, dt, chunk=1024, t0=0.0, t_end=None, jerk=False):
+        """
+        Generates fixed rate setpoints for times t0, t0 + dt, ... up to t_end
+        (by default the end of the longest DOF) in chunks of chunk samples.
+
+        Every chunk is a view of the same preallocated (chunk, dof, 3|4)
+        buffer laid out like the result of __call__, so copy it if it has to
+        outlive the next iteration. Samples are assigned to phases by index,
+        each phase is evaluated with its own polynomial, memory does not
+        depend on the length of the move.
+        """
+        if dt <= 0 or chunk < 1:
+            raise ValueError("Time step and chunk size must be positive")
+
+        if t_end is None:
+            t_end = max(self._time, self._breaks[:, -1].max(initial=0))
+
+        n = 4 if jerk else 3
+        total = int(np.floor((t_end - t0)/dt + EPSILON)) + 1
+        if total <= 0:
+            return
+
+        out = np.zeros((chunk, self.dof, n))
+        idx = np.arange(chunk, dtype=np.float64)
+        tau = np.empty(chunk)
+
+        # Index of the first sample of every phase and states held before
+        # the start and after the end of the motion
+        starts = np.clip(np.ceil((self._breaks - t0)/dt), 0, total)
+        starts = starts.astype(np.int64)
+        hold = self(np.asarray([self._breaks.min(initial=0) - 1,
+                                self._breaks.max(initial=0) + 1]), jerk)
+
+        for i0 in range(0, total, chunk):
+            i1 = min(i0 + chunk, total)
+            for dof in range(self.dof):
+                self._stream_dof(dof, starts[dof], hold[:, dof], i0, i1, dt,
+                                 t0, idx, tau, out[:, dof, :])
+
+            yield out[:i1 - i0]
+
+    def _stream_dof(self, dof, starts, hold, i0, i1, dt, t0, idx, tau, out):
+        """
+        Fills out[:i1 - i0] with the samples i0...i1 of DOF dof
+        """
+        breaks = self._breaks[dof]
+        coeffs = self._coeffs[dof]
+
+        first = min(starts[0], i1)
+        if first > i0:
+            out[:first - i0] = hold[0]
+
+        last = max(starts[-1], i0)
+        if last < i1:
+            out[last - i0:i1 - i0] = hold[1]
+
+        k0 = max(np.searchsorted(starts, i0, side='right') - 1, 0)
+        k1 = min(np.searchsorted(starts, i1, side='left'), len(coeffs))
+        for k in range(k0, k1):
+            lo = max(starts[k], i0) - i0
+            hi = min(starts[k + 1], i1) - i0
+            if lo >= hi:
+                continue
+
+            c0, c1, c2, c3 = coeffs[k]
+            t = tau[lo:hi]
+            np.add(idx[lo:hi], i0, out=t)
+            t *= dt
+            t += t0 - breaks[k]
+
+            q = out[lo:hi, POSITION_ID]
+            np.multiply(t, c3, out=q)
+            q += c2
+            q *= t
+            q += c1
+            q *= t
+            q += c0
+
+            v = out[lo:hi, SPEED_ID]
+            np.multiply(t, 3*c3, out=v)
+            v += 2*c2
+            v *= t
+            v += c1
+
+            a = out[lo:hi, ACCELERATION_ID]
+            np.multiply(t, 6*c3, out=a)
+            a += 2*c2
+
+            if out.shape[1] > JERK_ID:
+                out[lo:hi, JERK_ID] = 6*c3
+
+    def __call__(self, time, jerk=False):
+        """
+        Returns acceleration, speed and position of every DOF at a given time.
+
+        For a scalar time the result has shape (dof, 3). For an array of
+        times the whole array is evaluated at once and the result has shape
+        time.shape + (dof, 3), i.e. (N, dof, 3) for a 1-D array. With
+        jerk=True the last axis has size 4 and point[..., JERK_ID] holds the
+        exact piecewise constant jerk.
+        """
+        n = 4 if jerk else 3
+        time = np.asarray(time, dtype=np.float64)
+        if not time.ndim:
+            return self.__call_scalar(float(time), n)
+
+        t = time.ravel()
+        point = np.zeros((t.size, self.dof, n))
+        for dof in range(self.dof):
+            self._evaluate(dof, t, point[:, dof, :], jerk)
+
+            if self.debug and tracing.tracer is not None:
+                tracing.tracer.samples(dof, t, point[:, dof, :3])
+        return point.reshape(time.shape + (self.dof, n))
+
+    def __call_scalar(self, t, n):
+        """
+        State of every DOF at the single time t, evaluated for all DOFs at
+        once instead of one searchsorted per DOF
+        """
+        breaks = self._breaks
+        point = np.zeros((self.dof, n))
+        if not self.dof:
+            return point
+
+        tc = np.minimum(np.maximum(t, breaks[:, 0]), breaks[:, -1])
+        k = np.count_nonzero(breaks[:, 1:-1] <= tc[:, None], axis=1)
+
+        rows = np.arange(self.dof)
+        tau = tc - breaks[rows, k]
+        c0, c1, c2, c3 = self._coeffs[rows, k].T
+
+        moving = t < breaks[:, -1]
+        point[:, POSITION_ID] = ((c3*tau + c2)*tau + c1)*tau + c0
+        point[:, SPEED_ID] = (3*c3*tau + 2*c2)*tau + c1
+        point[:, ACCELERATION_ID] = np.where(moving, 6*c3*tau + 2*c2, 0)
+        if n > JERK_ID:
+            point[:, JERK_ID] = np.where((t >= breaks[:, 0]) & moving,
+                                         6*c3, 0)
+
+        if self.debug and tracing.tracer is not None:
+            for dof in range(self.dof):
+                tracing.tracer.samples(dof, np.asarray([t]),
+                                       point[dof:dof + 1, :3])
         return point
 
+    def time_at_position(self, q, dof=0):
+        """
+        Returns the first time DOF dof reaches every position of q, NaN for
+        positions it never reaches. The result has the shape of q.
+
+        The motion is split into monotonic pieces at the phase boundaries
+        and at the zeros of the speed, the piece of every position is found
+        with a binary search over the positions at the piece boundaries and
+        the cubic of its phase is solved analytically. Positions at piece
+        boundaries give the boundary time exactly.
+        """
+        q = np.asarray(q, dtype=np.float64)
+        x = q.ravel()
+        t = np.full(x.shape, np.nan)
+
+        starts, positions, phases, runs = self.__get_position_index(dof)
+        if not len(phases):
+            return t.reshape(q.shape)
+
+        # Position held before the start of the motion
+        first = x == positions[0]
+        t[first] = starts[0]
+        todo = np.flatnonzero(~first & np.isfinite(x))
+
+        for i0, i1, d in runs:
+            if not len(todo):
+                break
+
+            lo, hi = sorted((positions[i0], positions[i1]))
+            inside = (x[todo] >= lo) & (x[todo] <= hi)
+            idx = todo[inside]
+            todo = todo[~inside]
+
+            # Piece i with d*positions[i] <= d*x <= d*positions[i + 1]
+            i = i0 + np.searchsorted(d*positions[i0 + 1:i1], d*x[idx],
+                                     side='left')
+            k = phases[i]
+            start = self._breaks[dof, k]
+            c0, c1, c2, c3 = self._coeffs[dof, k].T
+            tau = _cubic_root(c0 - x[idx], c1, c2, c3, starts[i] - start,
+                              starts[i + 1] - start)
+            t[idx] = start + tau
+
+            # Positions of piece boundaries are reached at the boundary
+            t[idx] = np.where(x[idx] == positions[i + 1], starts[i + 1],
+                              np.where(x[idx] == positions[i], starts[i],
+                                       t[idx]))
+
+        return t.reshape(q.shape)
+
+    def __get_position_index(self, dof):
+        """
+        Start times, positions at the start times and phases of the
+        monotonic pieces of DOF dof, and (first, last, direction) of the
+        runs of pieces moving in the same direction
+        """
+        index = self._position_index.get(dof)
+        if index is not None:
+            return index
+
+        breaks = self._breaks[dof]
+        c0, c1, c2, c3 = self._coeffs[dof].T
+        h = np.diff(breaks)
+
+        # Zeros of the speed 3*c3*tau**2 + 2*c2*tau + c1 inside the phases
+        with np.errstate(divide='ignore', invalid='ignore'):
+            root = np.sqrt(4*c2**2 - 12*c3*c1)
+            zeros = np.stack([np.zeros_like(h),
+                              (-2*c2 + root)/(6*c3),
+                              (-2*c2 - root)/(6*c3),
+                              np.where(c3 == 0, -c1/(2*c2), np.nan)], axis=1)
+        keep = np.zeros(zeros.shape, dtype=bool)
+        keep[:, 0] = True
+        keep[:, 1:] = (zeros[:, 1:] > 0) & (zeros[:, 1:] < h[:, None])
+
+        phases, column = np.nonzero(keep)
+        tau = zeros[phases, column]
+        order = np.lexsort((tau, phases))
+        phases, tau = phases[order], tau[order]
+
+        starts = np.append(breaks[phases] + tau, breaks[-1])
+        a0, a1, a2, a3 = self._coeffs[dof, phases].T
+        positions = np.append(((a3*tau + a2)*tau + a1)*tau + a0,
+                              np.polyval(self._coeffs[dof, -1, ::-1], h[-1])
+                              if len(h) else np.nan)
+
+        # Pieces without motion or without coefficients split the runs
+        with np.errstate(invalid='ignore'):
+            direction = np.sign(np.diff(positions))
+        direction[np.isnan(direction)] = 0
+        change = np.flatnonzero(np.diff(direction)) + 1
+        runs = []
+        for i0, i1 in zip(np.r_[0, change], np.r_[change, len(direction)]):
+            if i1 > i0 and direction[i0] != 0:
+                runs.append((i0, i1, direction[i0]))
+
+        index = (starts, positions, phases, runs)
+        self._position_index[dof] = index
+        return index
+
+
+def _cubic_root(c0, c1, c2, c3, lo, hi):
+    """
+    Root of c0 + c1*tau + c2*tau**2 + c3*tau**3 within [lo, hi] where the
+    polynomial is monotonic, elementwise on arrays. The closed form roots
+    are polished with Newton steps kept inside the interval
+    """
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        # Depressed cubic tau = y - c2/(3*c3), y**3 + p*y + r = 0
+        b, c, d = c2/c3, c1/c3, c0/c3
+        p = c - b**2/3
+        r = 2*b**3/27 - b*c/3 + d
+        disc = (r/2)**2 + (p/3)**3
+
+        sq = np.sqrt(np.maximum(disc, 0))
+        single = np.cbrt(-r/2 + sq) + np.cbrt(-r/2 - sq)
+        m = 2*np.sqrt(np.maximum(-p/3, 0))
+        phi = np.arccos(np.clip(3*r/(p*m), -1, 1))/3
+        roots = np.stack([single,
+                          m*np.cos(phi),
+                          m*np.cos(phi - 2*np.pi/3),
+                          m*np.cos(phi - 4*np.pi/3)], axis=-1) - b[:, None]/3
+        roots[disc >= 0, 1:] = np.nan
+        roots[disc < 0, 0] = np.nan
+
+        # Quadratic and linear phases
+        quadratic = c3 == 0
+        sq = np.sqrt(c1**2 - 4*c2*c0)
+        roots[quadratic] = np.stack([(-c1 + sq)/(2*c2), (-c1 - sq)/(2*c2),
+                                     -c0/c1, np.full_like(c0, np.nan)],
+                                    axis=-1)[quadratic]
+        roots[quadratic & (c2 != 0), 2] = np.nan
+
+        # Near multiple roots the closed forms lose most of their digits
+        # and may land outside the interval. Of the roots moved into it and
+        # the interval ends, take the one with the smallest residual
+        roots = np.clip(np.concatenate([roots, lo[:, None], hi[:, None]],
+                                       axis=-1), lo[:, None], hi[:, None])
+        f = np.abs(((c3[:, None]*roots + c2[:, None])*roots +
+                    c1[:, None])*roots + c0[:, None])
+        f[np.isnan(f)] = np.inf
+        tau = roots[np.arange(len(roots)), np.argmin(f, axis=1)]
+        f = f[np.arange(len(roots)), np.argmin(f, axis=1)]
+
+        # Newton steps which stay inside and lower the residual
+        for _ in range(3):
+            step = (((c3*tau + c2)*tau + c1)*tau + c0)/((3*c3*tau +
+                                                          2*c2)*tau + c1)
+            new = np.clip(tau - step, lo, hi)
+            f_new = np.abs(((c3*new + c2)*new + c1)*new + c0)
+            better = f_new < f
+            tau = np.where(better, new, tau)
+            f = np.where(better, f_new, f)
+
+    return tau
+
+
+def __getattr__(name):
+    # plot_trajectory moved to pyscurve.plotting, matplotlib is only
+    # imported when it is actually used
+    if name == "plot_trajectory":
+        from .plotting import plot_trajectory
+        return plot_trajectory
 
-def plot_trajectory(traj, dt):
-    dof = traj.dof
-    timesteps = int(max(traj.time) / dt)
-    time = np.linspace(0, max(traj.time), timesteps)
-
-    # NOW
-    # profiles[t]           --- profiles for each DOF at time x[t]
-    # profiles[t][d]        --- profile for d DOF at time x[t]
-    # profiles[t][d][k]     --- accel/vel/pos profile for d DOF at time x[t]
-    p_list = [traj(t) for t in time]
-    profiles = np.asarray(p_list)
-
-    # NEED
-    # profiles[d]       --- profiles for each DOF 0 <= d <= DOF number
-    # profiles[d][k]    --- accel/vel/pos profile for DOF d where j
-    # profiles[d][k][t] --- accel/vel/pos at time x[k] for DOF i
-    # profiles = np.reshape(profiles, (dof, 3, timesteps))
-    r_profiles = np.zeros((dof, 3, timesteps))
-    for d in range(dof):
-        for p in range(3):
-            r_profiles[d, p, :] = profiles[:, d, p]
-
-    fig = plt.figure(0)
-    # fig.suptitle("DOF profiles")
-
-    for i, profile in zip(range(dof), r_profiles):
-        plt.subplot(300 + dof*10 + (i+1))
-        plt.title("Acceleration profile")
-        plt.plot(time, profile[ACCELERATION_ID][:])
-        plt.xlim()
-        plt.ylim()
-
-        plt.subplot(300 + dof*10 + (i+1)+dof)
-        plt.title("Speed profile")
-        plt.plot(time, profile[SPEED_ID][:])
-        plt.xlim()
-        plt.ylim()
-
-        plt.subplot(300 + dof*10 + (i+1)+dof*2)
-        plt.title("Position profile")
-        plt.plot(time, profile[POSITION_ID][:])
-        plt.xlim()
-        plt.ylim()
-
-    plt.tight_layout()
-    plt.show()
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
@@ -0,0 +1,194 @@
+import numpy as np
+from pyscurve import Trajectory
+from pyscurve.batch import plan_batch, phase_tables, search_move
+from pyscurve.batch import sign_transforms, maximum_speed_not_reached
+from pyscurve.batch import check_possibility, move_possible, plan_move
+from pyscurve.batch import phase_table
+from pyscurve.batch import STATUS_OK, STATUS_INFEASIBLE, STATUS_INVALID
+from pyscurve.batch import STATUS_SEARCH_FAILED, SEARCH_DT_THRESH
+from pyscurve.trajectory import ACCELERATION_ID, SPEED_ID, POSITION_ID
+from pyscurve.trajectory import JERK_ID, EPSILON
+from pyscurve.instrumentation import BRANCH_SEARCH, BRANCH_V_MAX_REACHED
+from pyscurve.instrumentation import BRANCH_V_MAX_NOT_REACHED
+from pyscurve.instrumentation import BRANCH_FIXED_TIME_SEARCH
+
+
+def _random_moves(n, seed=0):
+    rng = np.random.default_rng(seed)
+    v_max = rng.uniform(0.5, 3, n)
+    moves = (rng.uniform(-5, 5, n), rng.uniform(-5, 5, n),
+             np.where(rng.random(n) < 0.5, rng.uniform(-1, 1, n)*v_max, 0),
+             np.where(rng.random(n) < 0.5, rng.uniform(-1, 1, n)*v_max, 0),
+             v_max, rng.uniform(0.5, 5, n), rng.uniform(1, 30, n))
+    return moves
+
+
+def _check_planned(plans, q0, q1, v0, v1, v_max, a_max, j_max):
+    """
+    Checks the end state and the limits of the planned moves
+    """
+    ok = plans["status"] == STATUS_OK
+    traj = Trajectory(*phase_tables(plans, q0, q1, v0, v1, j_max))
+    for i in np.flatnonzero(ok):
+        t = np.linspace(0, plans["T"][i], 501)
+        point = np.zeros((len(t), 4))
+        traj._evaluate(i, t, point, True)
+
+        np.testing.assert_allclose(point[0, [SPEED_ID, POSITION_ID]],
+                                   [v0[i], q0[i]], atol=1e-9)
+        np.testing.assert_allclose(point[-1, [SPEED_ID, POSITION_ID]],
+                                   [v1[i], q1[i]], atol=1e-6)
+        assert np.abs(point[:, SPEED_ID]).max() <= v_max[i]*(1 + 1e-6)
+        assert np.abs(point[:, ACCELERATION_ID]).max() <= a_max[i]*(1 + 1e-6)
+        assert np.abs(point[:, JERK_ID]).max() <= j_max[i]*(1 + 1e-9)
+
+    return ok
+
+
+def test_plan_batch_end_state_and_limits():
+    moves = _random_moves(2000)
+    plans = plan_batch(*moves)
+
+    ok = _check_planned(plans, *moves)
+    assert ok.mean() > 0.9
+    assert (plans["status"][~ok] != STATUS_OK).all()
+    np.testing.assert_allclose(plans["T"], plans["Ta"] + plans["Td"] +
+                               plans["Tv"])
+
+
+def test_plan_batch_status():
+    # Plain move, a move too short to stop from v0, a non-finite position
+    # and non-positive limits
+    plans = plan_batch([0, 0, np.nan, 0, 0], [1, 0.01, 1, 1, 1],
+                       [0, 1, 0, 0, 0], 0, [1, 1, 1, -1, 1],
+                       [2, 2, 2, 2, 0], 10)
+
+    assert plans["status"].tolist() == [STATUS_OK, STATUS_INFEASIBLE,
+                                         STATUS_INVALID, STATUS_INVALID,
+                                         STATUS_INVALID]
+    assert plans["T"][0] > 0
+    assert (plans[1:][["Tj1", "Ta", "Tj2", "Td", "Tv", "T"]].tolist() ==
+            [(0.0,)*6]*4)
+
+
+def test_plan_batch_broadcasts_scalar_limits():
+    plans = plan_batch([[0, 1], [2, 3]], 5, 0, 0, 1, 2, 10)
+
+    assert plans.shape == (2, 2)
+    assert (plans["status"] == STATUS_OK).all()
+
+
+def test_plan_batch_speed_above_v_max_is_infeasible():
+    # The profile without cruise phase used to peak at 5.9 * v_max
+    move = (4.1357, -4.9923, -0.9362, 0, 0.6465, 4.366, 11.5643)
+
+    assert plan_batch(*move)["status"] == STATUS_INFEASIBLE
+    assert plan_batch(*move, T=20.0)["status"] == STATUS_INFEASIBLE
+    assert plan_batch(0, 1, 0, 0.9, 0.5, 2, 10)["status"] ==\
+        STATUS_INFEASIBLE
+
+
+def test_search_finds_fastest_valid_profile():
+    moves = _random_moves(2000, seed=1)
+    details = {}
+    plans = plan_batch(*moves, details=details)
+    searched = np.flatnonzero(details["branch"] == BRANCH_SEARCH)
+    assert len(searched) > 10
+
+    moves = [x[searched] for x in moves]
+    plans = plans[searched]
+    _check_planned(plans, *moves)
+
+    # Fastest valid profile among densely sampled accelerations
+    q0, q1, v0, v1, v_max, a_max, j_max = [
+        x[:, None] for x in sign_transforms(*moves)]
+    a = a_max*np.geomspace(1e-3, 1, 20000)
+    with np.errstate(invalid="ignore"):
+        Tj, Ta, _, Td, _, _ = maximum_speed_not_reached(q0, q1, v0, v1, a,
+                                                        j_max)
+        valid = (np.minimum(Ta, Td) - 2*Tj >= EPSILON) &\
+            (v0 + (Ta - Tj)*j_max*Tj <= v_max)
+    fastest = np.where(valid, Ta + Td, np.inf).min(axis=1)
+
+    np.testing.assert_allclose(plans["T"], fastest, rtol=2e-3)
+
+
+def test_search_finds_window_of_valid_accelerations():
+    # Valid accelerations lie within about 0.74 to 1.1, halving a_max
+    # tests 4.8, 2.4, 1.2 and 0.6
+    move = (-0.3071, -1.0926, -0.8553, 0, 2.4156, 4.7996, 7.9956)
+    plans = plan_batch(*move)
+
+    assert plans["status"] == STATUS_OK
+    assert plans["T"] < 1.33
+    s = -1
+    plan, _ = search_move(*[s*x for x in move[:4]], *move[4:])
+    np.testing.assert_allclose(plan, plans[["Tj1", "Ta", "Tj2", "Td",
+                                            "Tv"]].item(), rtol=1e-12)
+
+
+def test_scalar_versions_match_batch():
+    # Random moves, rest to rest moves whose profile without cruise phase
+    # is just above and just below EPSILON margin, and the moves of the
+    # regression tests above
+    e = np.array([1.5, 0.5])*EPSILON
+    dq = ((3*2**2/10 + 2*2*e)**2 - 2**4/10**2)/(4*2)
+    edges = np.array([(0, dq[0], 0, 0, 1, 2, 10), (0, dq[1], 0, 0, 1, 2, 10),
+                      (-0.3071, -1.0926, -0.8553, 0, 2.4156, 4.7996, 7.9956),
+                      (4.1357, -4.9923, -0.9362, 0, 0.6465, 4.366, 11.5643)])
+    moves = [np.concatenate([x, y]) for x, y in
+             zip(_random_moves(2000, seed=2), edges.T)]
+    details = {}
+    plans = plan_batch(*moves, details=details)
+    breaks, coeffs = phase_tables(plans, *moves[:4], moves[6])
+    transformed = sign_transforms(*moves)
+    possible = check_possibility(*transformed[:4], *transformed[5:])
+    fields = ["Tj1", "Ta", "Tj2", "Td", "Tv"]
+
+    searched = 0
+    for i, branch in enumerate(details["branch"]):
+        q0, q1, v0, v1, v_max, a_max, j_max = [float(x[i]) for x in moves]
+        assert move_possible(q0, q1, v0, v1, a_max, j_max) == possible[i]
+
+        plan = plan_move(q0, q1, v0, v1, v_max, a_max, j_max)
+        if branch in (BRANCH_V_MAX_REACHED, BRANCH_V_MAX_NOT_REACHED):
+            np.testing.assert_allclose(plan, plans[fields][i].item(),
+                                       rtol=1e-12, atol=1e-15)
+        else:
+            assert plan is None
+
+        if branch == BRANCH_SEARCH:
+            plan, iterations = search_move(*[float(x[i])
+                                             for x in transformed])
+            np.testing.assert_allclose(plan, plans[fields][i].item(),
+                                       rtol=1e-12, atol=1e-15)
+            assert iterations == plans["iterations"][i]
+            searched += 1
+
+        if plans["status"][i] == STATUS_OK:
+            b, c = phase_table(*plans[fields][i].item(), q0, q1, v0, v1,
+                               j_max)
+            np.testing.assert_allclose(b, breaks[i], rtol=1e-12, atol=1e-15)
+            np.testing.assert_allclose(c, coeffs[i], rtol=1e-12, atol=1e-12)
+
+    assert searched > 10
+
+
+def test_fixed_time_accuracy():
+    moves = _random_moves(2000, seed=3)
+    fastest = plan_batch(*moves)
+    ok = fastest["status"] == STATUS_OK
+    moves = [x[ok] for x in moves]
+    T = fastest["T"][ok]*np.random.default_rng(3).uniform(1, 3, ok.sum())
+
+    details = {}
+    plans = plan_batch(*moves, T=T, details=details)
+    planned = _check_planned(plans, *moves)
+    np.testing.assert_allclose(plans["T"][planned], T[planned], rtol=0,
+                               atol=SEARCH_DT_THRESH)
+    assert (details["branch"] == BRANCH_FIXED_TIME_SEARCH).any()
+
+    # The cruise speed can not go below the boundary speeds, only moves
+    # from rest to rest can last any time
+    assert planned[(moves[2] == 0) & (moves[3] == 0)].all()
+    assert (plans["status"][~planned] == STATUS_SEARCH_FAILED).all()
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+from pyscurve import ScurvePlanner, export_setpoints, load_setpoints
+from pyscurve.export import HEADER_SIZE
+
+
+@pytest.mark.parametrize("dtype,jerk", [(np.float64, True),
+                                        (np.float32, False)])
+def test_export_load_round_trip(tmp_path, dtype, jerk):
+    traj = ScurvePlanner().plan_trajectory([0, 1], [3, -1], [0.5, 0], [0, 0],
+                                           2, 4, 10)
+    fname = tmp_path / "setpoints.bin"
+    header = export_setpoints(traj, fname, 1e-3, dtype=dtype, jerk=jerk,
+                              chunk=100, t0=-0.01)
+    table = load_setpoints(fname)
+
+    t = table.t0 + table.dt*np.arange(len(table.data))
+    assert table.dt == 1e-3 and table.t0 == -0.01
+    assert table.data.shape == (header["length"], 2, 4 if jerk else 3)
+    assert table.data.dtype == dtype
+    assert fname.stat().st_size == HEADER_SIZE + table.data.nbytes
+    assert t[-1] <= traj.breaks[:, -1].max() < t[-1] + table.dt
+
+    expected = np.concatenate([rows.copy() for rows in
+                               traj.stream(1e-3, t0=-0.01, jerk=jerk)])
+    np.testing.assert_array_equal(table.data, expected.astype(dtype))
+
+
+def test_load_rejects_other_files(tmp_path):
+    fname = tmp_path / "other.bin"
+    fname.write_bytes(b"\0"*HEADER_SIZE)
+
+    with pytest.raises(ValueError, match="not a setpoint file"):
+        load_setpoints(fname)
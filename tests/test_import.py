@@ -0,0 +1,9 @@
+from pyscurve.bench import imports
+
+
+def test_import_budget():
+    result = imports.run(quick=True)["pyscurve"]
+
+    assert result["time_s"] <= imports.IMPORT_BUDGET_S
+    assert not result["unexpected_packages"]
+    assert result["root_handlers"] == 0
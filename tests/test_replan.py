@@ -0,0 +1,35 @@
+import numpy as np
+from pyscurve import replan
+from pyscurve.batch import SMALL_BATCH
+from pyscurve.trajectory import PlanningError
+
+
+def test_scalar_path_matches_plan_batch():
+    rng = np.random.default_rng(0)
+    n = 4*SMALL_BATCH
+    q, v, a, q1 = rng.uniform(-1, 1, (4, n))*np.array([[5], [1.5], [3], [5]])
+    q1[:8] = q[:8] + rng.uniform(-0.1, 0.1, 8)
+    v1 = np.where(rng.random(n) < 0.2, rng.uniform(-0.5, 0.5, n), 0)
+
+    # Only the DOFs of plannable states are compared, every state is
+    # planned alone on the scalar path
+    states = [i for i in range(n) if _plannable(q[i], v[i], a[i], q1[i],
+                                                v1[i])]
+    batch = replan(q[states], v[states], a[states], q1[states], v1[states],
+                   1, 2, 10)
+    assert len(states) > SMALL_BATCH
+
+    for k, i in enumerate(states):
+        single = replan(q[i], v[i], a[i], q1[i], v1[i], 1, 2, 10)
+        np.testing.assert_allclose(single.breaks[0], batch.breaks[k],
+                                   rtol=0, atol=1e-12)
+        np.testing.assert_allclose(single.coeffs[0], batch.coeffs[k],
+                                   rtol=0, atol=1e-12)
+
+
+def _plannable(*state):
+    try:
+        replan(*state, 1, 2, 10)
+    except PlanningError:
+        return False
+    return True
@@ -0,0 +1,32 @@
+import numpy as np
+from pyscurve.batch import SEARCH_DT_THRESH
+from pyscurve.sequence import plan_sequence
+from pyscurve.trajectory import ACCELERATION_ID, SPEED_ID, POSITION_ID
+
+
+def test_plan_sequence_continuity():
+    rng = np.random.default_rng(0)
+    waypoints = np.cumsum(rng.uniform(-1, 3, (8, 3)), axis=0)
+    v_max, a_max, j_max = np.array([2, 1.5, 3]), 4, 10
+    traj = plan_sequence(waypoints, v_max, a_max, j_max, v_start=[0.5, 0, 0])
+
+    # Synchronized DOFs reach every waypoint together, each segment within
+    # dt_thresh of the slowest DOF
+    handoffs = traj.breaks[:, ::7]
+    slowest = np.broadcast_to(handoffs.max(axis=0), handoffs.shape)
+    np.testing.assert_allclose(handoffs, slowest, rtol=0,
+                               atol=len(waypoints)*SEARCH_DT_THRESH)
+
+    for dof, t in enumerate(handoffs):
+        np.testing.assert_allclose(traj(t)[:, dof, POSITION_ID],
+                                   waypoints[:, dof], rtol=0, atol=1e-9)
+
+        # No jumps of position, speed or acceleration at the hand-offs
+        before = traj(t[1:-1] - 1e-9)[:, dof]
+        after = traj(t[1:-1] + 1e-9)[:, dof]
+        np.testing.assert_allclose(before, after, rtol=0, atol=1e-6)
+    np.testing.assert_allclose(traj(0.0)[:, SPEED_ID], [0.5, 0, 0], atol=1e-9)
+
+    points = traj(np.linspace(0, handoffs.max(), 20001))
+    assert (np.abs(points[..., SPEED_ID]) <= v_max*(1 + 1e-6)).all()
+    assert (np.abs(points[..., ACCELERATION_ID]) <= a_max*(1 + 1e-6)).all()
@@ -0,0 +1,68 @@
+import asyncio
+import json
+import socket
+import threading
+import numpy as np
+import pytest
+from pyscurve import ScurvePlanner
+from pyscurve.server import PlanningServer, PlanningClient
+from pyscurve.trajectory import PlanningError
+
+
+GOOD = {"q0": [0.0, 1.0], "q1": [1.0, -1.0], "v_max": 2, "a_max": 4,
+        "j_max": 10}
+
+
+@pytest.fixture
+def server(tmp_path):
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    # A long window puts all pipelined requests into one batch
+    server = asyncio.run_coroutine_threadsafe(
+        PlanningServer(window=0.05).start(str(tmp_path / "plan.sock")),
+        loop).result()
+    yield server
+
+    loop.call_soon_threadsafe(server.close)
+    asyncio.run_coroutine_threadsafe(server.wait_closed(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+def test_bad_requests_do_not_fail_the_batch(server):
+    requests = [dict(GOOD, id=0), dict(GOOD, id=1, t="abc"),
+                dict(GOOD, id=2, t=[1, 2]), dict(GOOD, id=3, q0=0.0),
+                dict(GOOD, id=4, t=3.0), dict(GOOD, id=5)]
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(server.address)
+    with sock, sock.makefile("rwb") as f:
+        f.write("".join(json.dumps(r) + "\n" for r in requests).encode())
+        f.flush()
+        answers = {a["id"]: a for a in
+                   (json.loads(f.readline()) for _ in requests)}
+
+    for i in (0, 4, 5):
+        assert "error" not in answers[i]
+    for i in (1, 2, 3):
+        assert "error" in answers[i]
+    assert answers[3]["error"].startswith("Invalid request")
+    assert answers[4]["time"] == pytest.approx(3.0)
+    assert server.stats()["batches"] == 1
+
+
+def test_client_plan(server):
+    expected = ScurvePlanner().plan_trajectory(
+        GOOD["q0"], GOOD["q1"], [0, 0], [0, 0], 2, 4, 10)
+
+    with PlanningClient(server.address) as client:
+        traj = client.plan(GOOD["q0"], GOOD["q1"], [0, 0], [0, 0], 2, 4, 10)
+
+        with pytest.raises(PlanningError, match="Invalid request"):
+            client.plan(0.0, 1.0, 0.0, 0.0, 2, 4, 10)
+
+    np.testing.assert_allclose(traj.breaks, expected.breaks)
+    np.testing.assert_allclose(traj.coeffs, expected.coeffs)
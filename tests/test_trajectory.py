@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from pyscurve import ScurvePlanner, Trajectory
+from pyscurve.trajectory import POSITION_ID, JERK_ID
+
+
+def _positions(traj, t):
+    return traj(t)[..., 0, POSITION_ID]
+
+
+def test_time_at_position_final_position():
+    traj = ScurvePlanner().plan_trajectory([-3.5204], [-2.9011], [0], [0],
+                                           2, 4, 10)
+
+    assert traj.time_at_position(-2.9011) == traj.breaks[0, -1]
+
+
+def test_time_at_position_round_trip():
+    planner = ScurvePlanner()
+    rng = np.random.default_rng(0)
+    for i in range(200):
+        q0, q1 = rng.uniform(-5, 5, 2)
+        v0 = rng.uniform(-2, 2) if i % 2 else 0.0
+        traj = planner.plan_trajectory([q0], [q1], [v0], [0], 2, 4, 10)
+
+        breaks = traj.breaks[0]
+        t = np.concatenate([breaks, np.linspace(breaks[0], breaks[-1], 50)])
+        q = _positions(traj, t)
+        t_q = traj.time_at_position(q)
+
+        assert not np.isnan(t_q).any()
+        np.testing.assert_allclose(_positions(traj, t_q), q, rtol=0,
+                                   atol=1e-12)
+
+
+def test_debug_is_keyword_only():
+    with pytest.raises(TypeError):
+        Trajectory(False)
+
+    traj = Trajectory(debug=False)
+    assert traj.dof == 0
+    assert not traj.debug
+
+
+def test_stream_matches_call():
+    traj = ScurvePlanner().plan_trajectory([0, 1, -2], [3, -1, -2.5],
+                                           [0, 0.5, 0], [0, 0, 0.2],
+                                           2, 4, 10)
+    dt, t0, t_end = 1e-3, -0.05, traj.breaks[:, -1].max() + 0.05
+
+    # Starts before and ends after the motion, the last chunk is partial
+    chunks = [c.copy() for c in traj.stream(dt, chunk=100, t0=t0,
+                                            t_end=t_end, jerk=True)]
+    samples = np.concatenate(chunks)
+    t = t0 + dt*np.arange(len(samples))
+
+    assert t[-1] <= t_end < t[-1] + dt
+    assert len(chunks[-1]) < 100
+    expected = traj(t, True)
+    np.testing.assert_allclose(samples[..., :3], expected[..., :3], rtol=0,
+                               atol=1e-9)
+
+    # The jerk steps at the breaks, samples rounded onto a break may be
+    # assigned to either side of it
+    near = (np.abs(t[:, None, None] - traj.breaks[None]) < 1e-9).any(axis=2)
+    np.testing.assert_array_equal(samples[..., JERK_ID][~near],
+                                  expected[..., JERK_ID][~near])